@@ -1,15 +1,37 @@
-from flask import Flask, render_template, request, send_file
-from modules.pdf_generator import generar_pdf
-from modules.pdf_generator_ferragro import generar_pdf_ferragro
-from modules.calculos_solar import calcular_proyecto
-from modules.calculadora_ia import extraer_texto_factura, analizar_factura_con_openai
+from flask import Flask, Response, jsonify, render_template, request, send_file, stream_with_context, url_for
+from modules.archivo_pdf import archivar_pdf
+from modules.cache_facturas import estadisticas_cache_facturas
+from modules.capacidades import CapacidadNoDisponible, capacidad, estado_capacidades
+from modules.cargas import MAX_FACTURA_MB, FacturaMuyGrande, SolicitudCargas, liberar_facturas, recibir_factura
+from modules.compartimentos import CompartimentoLleno, compartimento_facturas
+from modules.errores_llm import ErrorLLM
+from modules.cotizacion_pdf import TEMAS, generar_cotizacion_pdf
+from modules.calculos_solar import ENERGIA_PANEL_POR_ZONA, calcular_proyecto, estadisticas_cache_proyectos
+from modules.municipios import DEPARTAMENTOS_POR_ZONA
+from modules.numeracion import AsignadorCotizaciones
+from modules.lote import leer_filas, zip_lote
+from modules.trabajos import ColaLlena, encolar, leer_estado, profundidad_cola, ruta_resultado
+from io import BytesIO
+from datetime import datetime
 import json
+import logging
+import math
 import os
-from datetime import datetime
+import queue
 import subprocess
+import time
 
 
+# Avisos de los módulos (capacidades cargadas, PDFs que no se archivaron) en la salida del proceso
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
 app = Flask(__name__)
+# Las facturas subidas quedan en memoria (ver modules/cargas.py) y la petición tiene un tamaño máximo
+app.request_class = SolicitudCargas
+
+@app.errorhandler(413)
+def solicitud_muy_grande(_error):
+    return f"Las facturas superan el tamaño máximo de {MAX_FACTURA_MB:g} MB cada una.", 413
 
 @app.route('/check_tesseract')
 def check_tesseract():
@@ -22,18 +44,14 @@ def check_tesseract():
     except Exception as e:
         return f"Error al ejecutar el comando de Tesseract: {str(e)}"
 
-# 🗕 LOGICA DEL NUMERO DE COTIZACIÓN
-def cargar_cotizacion():
-    if os.path.exists("cotizacion.json"):
-        with open("cotizacion.json", "r") as file:
-            return json.load(file).get("cotizacion", 0)
-    return 0
+# Cada cuánto se manda un comentario en los flujos de eventos mientras no hay etapas nuevas (segundos)
+LATIDO_SSE = 15
 
-def guardar_cotizacion(numero):
-    with open("cotizacion.json", "w") as file:
-        json.dump({"cotizacion": numero}, file)
+# Retry-After cuando el modelo falla sin que el circuito diga cuánto esperar (segundos)
+REINTENTO_MODELO = 10
 
-cotizacion_contador = cargar_cotizacion()
+# 🗕 LOGICA DEL NUMERO DE COTIZACIÓN
+asignador_cotizaciones = AsignadorCotizaciones()
 
 # --------------------- RUTAS ------------------------------
 
@@ -47,7 +65,8 @@ def calculadora_solar():
 
 @app.route('/calculadora_ia')
 def calculadora_solar_ia():
-    return render_template('calculadora_ia.html')
+    departamentos = sorted(departamento for departamentos in DEPARTAMENTOS_POR_ZONA.values() for departamento in departamentos)
+    return render_template('calculadora_ia.html', departamentos=departamentos)
 
 @app.route('/calculadora_equipos')
 def calculadora_equipos():
@@ -57,12 +76,15 @@ def calculadora_equipos():
 def calculadora_equipos_ferragro():
     return render_template('calculadora_equipos_ferragro.html')
 
-@app.route('/generar_pdf', methods=['POST'])
-def generar_pdf_route():
-    global cotizacion_contador
-    cotizacion_contador += 1
-    guardar_cotizacion(cotizacion_contador)
+def proyecto_cotizacion(ubicacion, potencia, costo):
+    """ Proyecto con el ahorro y las baterías de la simulación hora a hora; sin NumPy, el cálculo con promedios. """
+    try:
+        return capacidad('simulacion').calcular_proyecto_horario(ubicacion, potencia, costo)
+    except CapacidadNoDisponible:
+        return calcular_proyecto(ubicacion, potencia, costo)
 
+def generar_cotizacion(marca):
+    """ Genera la cotización en PDF de la marca con los datos del formulario. """
     try:
         cliente = request.form['cliente']
         proyecto = request.form['proyecto']
@@ -76,123 +98,326 @@ def generar_pdf_route():
 
         fecha_cotizacion = datetime.now().strftime("%d/%m/%Y")
 
-        datos_proyecto = calcular_proyecto(ubicacion, potencia, costo)
+        datos_proyecto = proyecto_cotizacion(ubicacion, potencia, costo)
+        numero_cotizacion = asignador_cotizaciones.siguiente()
+        nombre_pdf = f'cotizacion_{numero_cotizacion}.pdf'
 
-        pdf_path = generar_pdf(
-            cotizacion_contador, fecha_cotizacion, cliente, proyecto, celular,
+        argumentos_pdf = (
+            marca, numero_cotizacion, fecha_cotizacion, cliente, proyecto, celular,
             correo, correo_asesor, ubicacion, potencia, costo, area, datos_proyecto
         )
 
-        return send_file(pdf_path, as_attachment=True)
+        if modo_asincrono():
+            trabajo_id = encolar('cotizacion', generar_cotizacion_pdf, *argumentos_pdf, datos={"archivo": nombre_pdf})
+            return respuesta_trabajo(trabajo_id)
+
+        pdf = generar_cotizacion_pdf(*argumentos_pdf)
+        archivar_pdf(nombre_pdf, pdf)
+
+        return send_file(BytesIO(pdf), mimetype='application/pdf', as_attachment=True, download_name=nombre_pdf)
     except KeyError as e:
         return f"Error: Falta el campo {str(e)} en el formulario", 400
     except ValueError:
         return "Error: Verifica que los campos numéricos sean correctos.", 400
+    except ColaLlena:
+        return cola_llena()
+
+@app.route('/generar_pdf', methods=['POST'])
+def generar_pdf_route():
+    return generar_cotizacion('solartech')
 
 @app.route('/generar_pdf_ferragro', methods=['POST'])
 def generar_pdf_ferragro_route():
-    global cotizacion_contador
-    cotizacion_contador += 1
-    guardar_cotizacion(cotizacion_contador)
-
-    try:
-        cliente = request.form['cliente']
-        proyecto = request.form['proyecto']
-        celular = request.form['celular']
-        correo_asesor = request.form['correo_asesor']
-        correo = request.form['correo']
-        ubicacion = request.form['ubicacion']
-        potencia = float(request.form['potencia'])
-        costo = float(request.form['costo'])
-        area = float(request.form['area'])
+    return generar_cotizacion('ferragro')
 
-        fecha_cotizacion = datetime.now().strftime("%d/%m/%Y")
+@app.route('/generar_lote', methods=['POST'])
+def generar_lote_route():
+    """ Genera un ZIP con las cotizaciones de todas las filas del CSV o JSON enviado. """
+    archivo = request.files.get('archivo')
+    if archivo is None or archivo.filename == '':
+        return "No se adjuntó el archivo del lote.", 400
 
-        datos_proyecto = calcular_proyecto(ubicacion, potencia, costo)
+    marca = request.form.get('marca', 'solartech')
+    if marca not in TEMAS:
+        return f"Error: Marca {marca} no encontrada.", 400
 
-        pdf_path = generar_pdf_ferragro(
-            cotizacion_contador, fecha_cotizacion, cliente, proyecto, celular,
-            correo, correo_asesor, ubicacion, potencia, costo, area, datos_proyecto
+    try:
+        filas = leer_filas(archivo.read(), archivo.filename)
+    except ValueError as e:
+        return f"Error: {str(e)}", 400
+
+    numeros = [asignador_cotizaciones.siguiente() for _ in filas]
+
+    return Response(
+        stream_with_context(zip_lote(marca, filas, numeros)),
+        mimetype='application/zip',
+        headers={"Content-Disposition": "attachment; filename=cotizaciones.zip"},
+    )
+
+@app.route('/sensibilidad', methods=['GET', 'POST'])
+def sensibilidad_route():
+    """ Bandas de percentiles de ahorro y recuperación para el proyecto bajo incertidumbre (JSON). """
+    datos = request.get_json(silent=True) or request.values
+    try:
+        sensibilidad = capacidad('sensibilidad')
+    except CapacidadNoDisponible as e:
+        return jsonify({"error": str(e)}), 503
+    try:
+        escenarios = int(numero_finito(datos.get('escenarios', sensibilidad.ESCENARIOS_SENSIBILIDAD), 'escenarios'))
+        if not 0 < escenarios <= sensibilidad.MAX_ESCENARIOS:
+            raise ValueError(f"La cantidad de escenarios debe estar entre 1 y {sensibilidad.MAX_ESCENARIOS}.")
+        ubicacion = datos['ubicacion']
+        if not isinstance(ubicacion, str) or ubicacion not in ENERGIA_PANEL_POR_ZONA:
+            raise ValueError(f"Ubicación {ubicacion} no encontrada en la base de datos.")
+        potencia = numero_finito(datos['potencia'], 'potencia')
+        costo = numero_finito(datos['costo'], 'costo')
+        if potencia <= 0 or costo <= 0:
+            raise ValueError("La potencia y el costo deben ser mayores que cero.")
+        resultado = sensibilidad.analizar_sensibilidad(
+            ubicacion, potencia, costo,
+            escenarios=escenarios,
+            escalamiento=numero_finito(datos.get('escalamiento_tarifa', sensibilidad.ESCALAMIENTO_TARIFA), 'escalamiento_tarifa'),
+            factor_sol=numero_finito(datos.get('factor_sol', 1.0), 'factor_sol'),
+            presupuesto_ms=min(
+                numero_finito(datos.get('presupuesto_ms', sensibilidad.PRESUPUESTO_SENSIBILIDAD_MS), 'presupuesto_ms'),
+                sensibilidad.PRESUPUESTO_SENSIBILIDAD_MS
+            ),
         )
-
-        return send_file(pdf_path, as_attachment=True)
     except KeyError as e:
-        return f"Error: Falta el campo {str(e)} en el formulario", 400
-    except ValueError:
-        return "Error: Verifica que los campos numéricos sean correctos.", 400
+        return jsonify({"error": f"Falta el campo {e.args[0]}"}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except OverflowError:
+        return jsonify({"error": "Los valores son demasiado grandes para calcular el proyecto."}), 400
+    return jsonify(resultado)
 
 @app.route('/procesar_factura', methods=['POST'])
 def procesar_factura():
+    try:
+        analizar_factura = analizador_facturas()
+    except (CapacidadNoDisponible, EnvironmentError) as e:
+        return jsonify({"error": str(e)}), 503
+
+    facturas, error = recibir_facturas()
+    if error:
+        return error
+    frontal, atras = facturas
+
+    if modo_asincrono():
+        # Las facturas grandes quedan en disco para el trabajo; limpiar_cargas las borra al vencer
+        try:
+            trabajo_id = encolar(
+                'factura', analizar_factura, frontal, atras, request.form.get('empresa'), request.form.get('departamento'),
+                datos={"cliente": request.form.to_dict()}
+            )
+        except ColaLlena:
+            liberar_facturas(frontal, atras)
+            return cola_llena()
+        return respuesta_trabajo(trabajo_id)
+
+    # El análisis corre en su propio compartimento: si está lleno se rechaza en vez de ocupar un hilo más
+    try:
+        datos = compartimento_facturas.ejecutar(
+            analizar_factura, frontal, atras, request.form.get('empresa'), request.form.get('departamento')
+        )
+    except CompartimentoLleno as e:
+        return cola_llena(e.reintentar_en)
+    except ErrorLLM as e:
+        return modelo_no_disponible(e)
+    except EnvironmentError as e:
+        return jsonify({"error": str(e)}), 503
+    except ValueError as e:
+        return str(e), 400
+    finally:
+        liberar_facturas(frontal, atras)
+
+    return render_template('resultado_factura.html', datos=datos, cliente=request.form), {
+        "Server-Timing": tiempos_servidor(datos["Tiempos OCR"])
+    }
+
+@app.route('/procesar_factura/eventos', methods=['POST'])
+def procesar_factura_eventos():
+    """
+    Igual que /procesar_factura, pero responde un flujo de Server-Sent Events
+    con cada etapa (subida, ocr_frontal, ocr_atras, extraccion, calculo) y los
+    segundos desde que llegó la petición, y al final el evento 'resultado'
+    con los datos y el HTML de resultado_factura (o 'error' con el mensaje).
+    """
+    inicio = time.perf_counter()
+    try:
+        analizar_factura = analizador_facturas()
+    except (CapacidadNoDisponible, EnvironmentError) as e:
+        return jsonify({"error": str(e)}), 503
+
+    facturas, error = recibir_facturas()
+    if error:
+        return error
+    frontal, atras = facturas
+
+    eventos = queue.Queue()
+    try:
+        futuro = compartimento_facturas.enviar(
+            analizar_factura, frontal, atras, request.form.get('empresa'), request.form.get('departamento'),
+            progreso=lambda etapa, datos: eventos.put((etapa, datos))
+        )
+    except CompartimentoLleno as e:
+        liberar_facturas(frontal, atras)
+        return cola_llena(e.reintentar_en)
+    # El análisis sigue aunque el cliente cierre la conexión; las facturas se liberan al terminar
+    futuro.add_done_callback(lambda _futuro: liberar_facturas(frontal, atras))
+    futuro.add_done_callback(lambda _futuro: eventos.put(None))
+    cliente = request.form.to_dict()
+
+    def segundos():
+        return round(time.perf_counter() - inicio, 3)
+
+    def flujo():
+        yield evento_sse('subida', {"archivos": [frontal.nombre, atras.nombre], "segundos": segundos()})
+        while True:
+            try:
+                evento = eventos.get(timeout=LATIDO_SSE)
+            except queue.Empty:
+                # Comentario SSE para que los proxies no cierren una conexión sin tráfico
+                yield ": latido\n\n"
+                continue
+            if evento is None:
+                break
+            etapa, datos = evento
+            yield evento_sse(etapa, {**datos, "segundos": segundos()})
+
+        try:
+            datos = futuro.result()
+        except ErrorLLM as e:
+            yield evento_sse('error', {
+                "mensaje": str(e), "reintentar_en": e.reintentar_en or REINTENTO_MODELO, "segundos": segundos()
+            })
+            return
+        except (ValueError, EnvironmentError) as e:
+            yield evento_sse('error', {"mensaje": str(e), "segundos": segundos()})
+            return
+        except Exception:
+            yield evento_sse('error', {"mensaje": "Error interno al procesar la factura.", "segundos": segundos()})
+            raise
+        html = render_template('resultado_factura.html', datos=datos, cliente=cliente)
+        yield evento_sse('resultado', {"datos": datos, "html": html, "segundos": segundos()})
+
+    return Response(
+        stream_with_context(flujo()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def numero_finito(valor, campo):
+    """ float(valor); ValueError si no es un número o es infinito o NaN (json acepta Infinity y NaN). """
+    try:
+        numero = float(valor)
+    except TypeError:
+        raise ValueError(f"El campo {campo} debe ser un número.")
+    if not math.isfinite(numero):
+        raise ValueError(f"El campo {campo} debe ser un número finito.")
+    return numero
+
+def analizador_facturas():
+    """
+    Función que analiza las facturas. Lanza CapacidadNoDisponible o
+    EnvironmentError (sin motor de OCR) antes de recibir los archivos.
+    """
+    analizar_factura = capacidad('facturas').analizar_factura
+    capacidad('ocr').verificar_motor()
+    return analizar_factura
+
+def recibir_facturas():
+    """
+    Valida y recibe las dos caras de la factura del formulario. Devuelve
+    ((frontal, atras), None) o (None, respuesta de error).
+    """
     if 'factura_frontal' not in request.files or 'factura_atras' not in request.files:
-        return "No se adjuntaron ambas facturas.", 400
+        return None, ("No se adjuntaron ambas facturas.", 400)
 
     factura_frontal = request.files['factura_frontal']
     factura_atras = request.files['factura_atras']
 
     if factura_frontal.filename == '' or factura_atras.filename == '':
-        return "Uno o ambos archivos están vacíos.", 400
-
-    upload_folder = 'uploads'
-    os.makedirs(upload_folder, exist_ok=True)
-
-    filepath_frontal = os.path.join(upload_folder, factura_frontal.filename)
-    filepath_atras = os.path.join(upload_folder, factura_atras.filename)
+        return None, ("Uno o ambos archivos están vacíos.", 400)
 
-    factura_frontal.save(filepath_frontal)
-    factura_atras.save(filepath_atras)
-
-    # Extraer texto de las facturas
-    texto_frontal = extraer_texto_factura(filepath_frontal)
-    texto_atras = extraer_texto_factura(filepath_atras)
-
-    texto_completo = texto_frontal + "\n" + texto_atras
-
-    # Imprimir el texto extraído para depuración
-    print("Texto extraído de la factura:")
-    print(texto_completo)
-
-    # Procesar el texto con OpenAI
-    datos_extraidos_texto = analizar_factura_con_openai(texto_completo)
-
-    # Imprimir la respuesta de OpenAI para depuración
-    print("Respuesta de OpenAI:")
-    print(datos_extraidos_texto)
-
-    # Convertir el texto en diccionario
-    datos_extraidos = {}
-    for linea in datos_extraidos_texto.split('\n'):
-        if ':' in linea:
-            clave, valor = linea.split(':', 1)
-            datos_extraidos[clave.strip()] = valor.strip()
-
-    print("Datos extraídos procesados:")
-    print(datos_extraidos)
-
-    # Obtener los valores extraídos
-    zona_proyecto = datos_extraidos.get('Zona del Proyecto', 'No disponible')
-    consumo_promedio_kwh = datos_extraidos.get('Consumo promedio mensual de energía', '0')
-    costo_kwh = datos_extraidos.get('Costo del kWh', '0')
-
-    # Verificar si los datos se extrajeron correctamente
-    if not zona_proyecto or not consumo_promedio_kwh or not costo_kwh:
-        return "No se pudieron extraer todos los datos necesarios de la factura.", 400
-
-    # Limpiar y convertir los valores numéricos
-    consumo_promedio_kwh = float(consumo_promedio_kwh.replace('kWh/mes', '').replace(',', '').strip())
-    costo_kwh = float(costo_kwh.replace('COP', '').replace('$', '').replace(',', '').strip())
-
-    # Limpiar la zona antes del cálculo
-    zona_proyecto_limpia = zona_proyecto.split('-')[-1].strip()
-
-    # Calcular el proyecto
-    datos_proyecto = calcular_proyecto(zona_proyecto_limpia, consumo_promedio_kwh, costo_kwh)
-
-    return render_template('resultado_factura.html', datos={
-    "Zona del Proyecto": zona_proyecto,
-    "Consumo promedio mensual de energía": f"{consumo_promedio_kwh} kWh/mes",
-    "Costo del kWh": f"${costo_kwh} COP",
-    "Resultados Generales": datos_proyecto["Resultados Generales"]
-    }, cliente=request.form)
+    # Cada petición tiene sus propias facturas: dos clientes con el mismo nombre de archivo no se pisan
+    try:
+        return (recibir_factura(factura_frontal), recibir_factura(factura_atras)), None
+    except FacturaMuyGrande as e:
+        return None, (str(e), 413)
+    except ValueError as e:
+        return None, (str(e), 400)
+
+def evento_sse(nombre, datos):
+    """ Evento de Server-Sent Events con los datos en JSON. """
+    return f"event: {nombre}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+def tiempos_servidor(tiempos_ocr):
+    """ Tiempos del OCR de cada archivo en formato Server-Timing (milisegundos). """
+    return ", ".join(
+        f'ocr{i};dur={tiempo["total_segundos"] * 1000:.0f}'
+        for i, tiempo in enumerate(tiempos_ocr, start=1)
+    )
+
+@app.route('/salud')
+def salud():
+    """ Capacidades del servidor (cuáles están disponibles, cuáles ya se cargaron y qué les falta) y sus cachés. """
+    estado = estado_capacidades()
+    estado["facturas"]["compartimento"] = compartimento_facturas.estadisticas()
+    estado["caches"] = {"facturas": estadisticas_cache_facturas(), "proyectos": estadisticas_cache_proyectos()}
+    return jsonify(estado)
+
+# --------------------- TRABAJOS ASÍNCRONOS ------------------------------
+
+def modo_asincrono():
+    """ Indica si la petición pidió encolar el trabajo en lugar de esperarlo (modo=async). """
+    return request.values.get('modo') == 'async'
+
+def respuesta_trabajo(trabajo_id):
+    return jsonify({
+        "id": trabajo_id,
+        "estado": url_for('estado_trabajo', trabajo_id=trabajo_id),
+        "descarga": url_for('descargar_trabajo', trabajo_id=trabajo_id),
+    }), 202
+
+def cola_llena(reintentar_en=10):
+    return "El servidor está ocupado, intenta de nuevo en unos segundos.", 503, {"Retry-After": str(reintentar_en)}
+
+def modelo_no_disponible(error):
+    """ 503 con Retry-After cuando el servicio del modelo no responde, igual que al rechazar por cola llena. """
+    return jsonify({"error": str(error)}), 503, {"Retry-After": str(error.reintentar_en or REINTENTO_MODELO)}
+
+@app.route('/trabajos')
+def cola_trabajos():
+    return jsonify(profundidad_cola())
+
+@app.route('/trabajos/<trabajo_id>')
+def estado_trabajo(trabajo_id):
+    estado = leer_estado(trabajo_id)
+    if estado is None:
+        return "Trabajo no encontrado.", 404
+    return jsonify(estado)
+
+@app.route('/trabajos/<trabajo_id>/descarga')
+def descargar_trabajo(trabajo_id):
+    estado = leer_estado(trabajo_id)
+    if estado is None:
+        return "Trabajo no encontrado.", 404
+    if estado['estado'] == 'error':
+        return f"Error: {estado.get('error')}", 400
+    if estado['estado'] != 'terminado':
+        return jsonify(estado), 409
+
+    if estado['tipo'] == 'cotizacion':
+        ruta = ruta_resultado(trabajo_id)
+        if ruta is None:
+            # La limpieza borró el PDF antes que el estado
+            return "El resultado del trabajo ya no está disponible.", 410
+        return send_file(
+            ruta, mimetype='application/pdf',
+            as_attachment=True, download_name=estado['datos']['archivo']
+        )
+    return render_template('resultado_factura.html', datos=estado['resultado'], cliente=estado['datos']['cliente'])
 
 @app.route('/diligenciamiento_contratos')
 def diligenciamiento_contratos():
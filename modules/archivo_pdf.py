@@ -0,0 +1,72 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+
+# Guardar una copia de cada cotización en disco es opcional y se hace fuera de la petición
+ARCHIVAR_PDFS = os.getenv('ARCHIVAR_PDFS', '0') == '1'
+
+# Carpeta donde se archivan los PDFs generados
+PDF_FOLDER = os.getenv('PDF_FOLDER', 'generated_pdfs')
+
+# Máximo de PDFs pendientes por archivar; si se llena se descartan las copias
+MAX_PENDIENTES = 100
+
+logger = logging.getLogger(__name__)
+
+_cola = queue.Queue(maxsize=MAX_PENDIENTES)
+_hilo = None
+_lock = threading.Lock()
+
+
+def _escribir(nombre, contenido):
+    os.makedirs(PDF_FOLDER, exist_ok=True)
+    ruta = os.path.join(PDF_FOLDER, nombre)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'wb') as file:
+        file.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def _archivador():
+    while True:
+        nombre, contenido = _cola.get()
+        try:
+            _escribir(nombre, contenido)
+        except OSError as e:
+            logger.warning("Error al archivar %s: %s", nombre, e)
+        finally:
+            _cola.task_done()
+
+
+def _iniciar_archivador():
+    global _hilo
+    with _lock:
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_archivador, name='archivador-pdf', daemon=True)
+            _hilo.start()
+
+
+def archivar_pdf(nombre, contenido):
+    """
+    Encola una copia del PDF para guardarla en PDF_FOLDER en segundo plano.
+    No hace nada si ARCHIVAR_PDFS no está activo.
+    """
+    if not ARCHIVAR_PDFS:
+        return False
+
+    _iniciar_archivador()
+    try:
+        _cola.put_nowait((nombre, contenido))
+    except queue.Full:
+        logger.warning("Cola de archivo llena, no se guarda %s", nombre)
+        return False
+    return True
+
+
+@atexit.register
+def _vaciar_cola():
+    """ Espera a que se escriban los PDFs pendientes antes de terminar el proceso. """
+    if _hilo is not None and _hilo.is_alive():
+        _cola.join()
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Carpeta compartida por todos los workers, tamaño máximo y vigencia de cada entrada
+CACHE_FACTURAS_FOLDER = os.getenv('CACHE_FACTURAS_FOLDER', 'cache_facturas')
+MAX_CACHE_FACTURAS_MB = float(os.getenv('MAX_CACHE_FACTURAS_MB', '200'))
+TTL_CACHE_FACTURAS = int(os.getenv('TTL_CACHE_FACTURAS', str(7 * 24 * 3600)))
+
+# Cada cuánto (segundos) se revisa el tamaño de la caché para borrar lo vencido y lo menos usado
+INTERVALO_LIMPIEZA = 300
+
+
+def sha256_archivo(filepath):
+    """ SHA-256 del contenido del archivo, leído por bloques. """
+    resumen = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for bloque in iter(lambda: file.read(1 << 20), b''):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def normalizar_texto(texto):
+    """ Texto sin diferencias de espacios ni de mayúsculas, para que el mismo OCR dé la misma clave. """
+    return ' '.join(texto.split()).casefold()
+
+
+def clave(*partes):
+    """ Clave de caché a partir de varias partes (textos o valores serializables a JSON). """
+    return hashlib.sha256(json.dumps(partes, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class CacheDisco:
+    """
+    Caché en disco direccionada por contenido: cada entrada es un JSON en
+    <carpeta>/<nombre>/<clave[:2]>/<clave>.json, escrito de forma atómica
+    para que varios workers la compartan. Las entradas vencen a los
+    TTL_CACHE_FACTURAS segundos; si la carpeta pasa de MAX_CACHE_FACTURAS_MB
+    se borran las menos usadas (un acierto actualiza su fecha).
+    """
+
+    def __init__(self, nombre, carpeta=CACHE_FACTURAS_FOLDER, max_mb=MAX_CACHE_FACTURAS_MB, ttl=TTL_CACHE_FACTURAS):
+        self.nombre = nombre
+        self.carpeta = os.path.join(carpeta, nombre)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        # Entradas y bytes en disco según el último recorrido de la carpeta (None si no se ha recorrido)
+        self.entradas = None
+        self.bytes = None
+        self._ultima_limpieza = 0
+        self._lock = threading.Lock()
+
+    def _ruta(self, clave):
+        return os.path.join(self.carpeta, clave[:2], f"{clave}.json")
+
+    def obtener(self, clave):
+        """ Valor guardado para la clave, o None si no existe o ya venció. """
+        ruta = self._ruta(clave)
+        try:
+            if time.time() - os.path.getmtime(ruta) > self.ttl:
+                os.remove(ruta)
+                raise FileNotFoundError(ruta)
+            with open(ruta, 'r', encoding='utf-8') as file:
+                valor = json.load(file)
+            os.utime(ruta)
+        except (OSError, ValueError):
+            with self._lock:
+                self.fallos += 1
+            return None
+
+        with self._lock:
+            self.aciertos += 1
+        return valor
+
+    def guardar(self, clave, valor):
+        ruta = self._ruta(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as file:
+            json.dump(valor, file, ensure_ascii=False)
+        os.replace(temporal, ruta)
+        self._limpiar()
+
+    def _limpiar(self):
+        """ Borra lo vencido y, si sigue pasando del tamaño máximo, lo menos usado. """
+        with self._lock:
+            ahora = time.time()
+            if ahora - self._ultima_limpieza < INTERVALO_LIMPIEZA:
+                return
+            self._ultima_limpieza = ahora
+
+        entradas = []
+        for raiz, _, archivos in os.walk(self.carpeta):
+            for nombre in archivos:
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    estado = os.stat(ruta)
+                except OSError:
+                    continue
+                if ahora - estado.st_mtime > self.ttl:
+                    self._borrar(ruta)
+                else:
+                    entradas.append((estado.st_mtime, estado.st_size, ruta))
+
+        total = sum(tamano for _, tamano, _ in entradas)
+        borradas = 0
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            self._borrar(ruta)
+            total -= tamano
+            borradas += 1
+
+        with self._lock:
+            self.entradas, self.bytes = len(entradas) - borradas, total
+
+    def _medir(self):
+        """ Recorre la carpeta para contar las entradas y su tamaño en disco. """
+        entradas = total = 0
+        for raiz, _, archivos in os.walk(self.carpeta):
+            for nombre in archivos:
+                try:
+                    total += os.path.getsize(os.path.join(raiz, nombre))
+                    entradas += 1
+                except OSError:
+                    pass
+        with self._lock:
+            self.entradas, self.bytes = entradas, total
+
+    @staticmethod
+    def _borrar(ruta):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+    def estadisticas(self):
+        """
+        Aciertos y fallos de este proceso y tamaño en disco (compartido por los
+        workers). El tamaño es el del último recorrido de la limpieza, para no
+        recorrer la carpeta en cada consulta; la primera vez se mide.
+        """
+        if self.bytes is None:
+            self._medir()
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+                "entradas": self.entradas,
+                "tamano_mb": round(self.bytes / (1024 * 1024), 3),
+                "maximo_mb": round(self.max_bytes / (1024 * 1024), 2),
+            }
+
+
+# Texto del OCR por archivo y respuesta del modelo por texto normalizado
+cache_ocr = CacheDisco('ocr')
+cache_llm = CacheDisco('llm')
+
+
+def estadisticas_cache_facturas():
+    """ Aciertos, fallos, tasa de aciertos y tamaño en disco de las cachés de OCR y del modelo. """
+    return {"ocr": cache_ocr.estadisticas(), "llm": cache_llm.estadisticas()}
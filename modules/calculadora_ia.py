@@ -1,96 +1,284 @@
-import pytesseract
-from pdf2image import convert_from_path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
-import openai
+import logging
 import os
-import shutil
+import re
+import tempfile
+import threading
+import time
 
-# # Buscar la ruta de Tesseract
-# tesseract_path = shutil.which('tesseract')
+from modules.cache_facturas import cache_llm, cache_ocr, clave, normalizar_texto
+from modules.cargas import EXTENSIONES_FACTURA, como_archivo
+from modules.cliente_llm import OPENAI_MODELO, ErrorLLM, cliente_llm
+from modules.ocr_motor import OCR_IDIOMA, reconocer, verificar_motor
+from modules.preprocesamiento import preprocesar, recortar_regiones
+from modules.prompt_facturas import PLANTILLA_PROMPT, construir_prompt, interpretar_respuesta
 
-# if tesseract_path:
-#     pytesseract.pytesseract.tesseract_cmd = tesseract_path
-# else:
-#     raise EnvironmentError("Tesseract no está instalado o no se encuentra en el PATH.")
+logger = logging.getLogger(__name__)
 
-# Leer la clave desde la variable de entorno
-openai.api_key = os.getenv('OPENAI_API_KEY')
+# Hilos que corren Tesseract a la vez (tesserocr y el proceso de tesseract liberan el GIL, así que alcanzan hilos)
+OCR_TRABAJADORES = int(os.getenv('OCR_TRABAJADORES', str(os.cpu_count() or 1)))
 
-if not openai.api_key:
-    raise ValueError("La clave de API de OpenAI no está configurada en la variable de entorno 'OPENAI_API_KEY'.")
+# PDF: se rasteriza y se lee una página a la vez, en gris y a esta resolución, hasta tener los datos
+OCR_PDF_POR_PAGINAS = os.getenv('OCR_PDF_POR_PAGINAS', '1') == '1'
+OCR_DPI = int(os.getenv('OCR_DPI', '200'))
 
-# Ruta para almacenar archivos temporales
-UPLOAD_FOLDER = 'uploads'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Reducir, enderezar y binarizar cada página antes del OCR (ver modules/preprocesamiento.py)
+OCR_PREPROCESAR = os.getenv('OCR_PREPROCESAR', '1') == '1'
 
-def extraer_texto_factura(filepath):
+# Señales de que el texto ya trae la zona, el consumo y la tarifa (no extraen los valores)
+CAMPOS_FACTURA = {
+    "zona": re.compile(
+        r'\b(antioquia|atl[aá]ntico|bogot[aá]|bol[ií]var|boyac[aá]|caldas|caquet[aá]|casanare|cauca|cesar|'
+        r'choc[oó]|c[oó]rdoba|cundinamarca|guain[ií]a|guaviare|huila|guajira|magdalena|meta|nari[nñ]o|'
+        r'santander|putumayo|quind[ií]o|risaralda|san andr[eé]s|sucre|tolima|valle|vaup[eé]s|vichada|'
+        r'amazonas|arauca)\b', re.IGNORECASE),
+    "consumo": re.compile(r'\d[\d.,]*\s*kwh', re.IGNORECASE),
+    "tarifa": re.compile(r'(costo|tarifa|valor\s+unitario|\$\s*/\s*kwh)[^\n]*(\n[^\n]*){0,2}?\d+[.,]\d{2}', re.IGNORECASE),
+}
+
+_ocr_pool = None
+_ocr_lock = threading.Lock()
+
+
+def _obtener_ocr_pool():
+    global _ocr_pool
+    with _ocr_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ThreadPoolExecutor(max_workers=OCR_TRABAJADORES, thread_name_prefix='ocr')
+        return _ocr_pool
+
+
+def campos_encontrados(texto):
+    """ Nombres de CAMPOS_FACTURA que aparecen en el texto. """
+    return {campo for campo, patron in CAMPOS_FACTURA.items() if patron.search(texto)}
+
+
+def _es_pdf(archivo):
+    return archivo.extension == '.pdf'
+
+
+@contextmanager
+def _ruta_pdf(archivo):
+    """ Ruta del PDF para poppler; si la factura está en memoria se escribe una sola vez en un temporal. """
+    if archivo.ruta is not None:
+        yield archivo.ruta
+        return
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as temporal:
+        temporal.write(archivo.contenido)
+        temporal.flush()
+        yield temporal.name
+
+
+def _cargar_paginas(archivo):
+    """ Abre la imagen (desde memoria si la factura no está en disco) o convierte el PDF en imágenes, una por página. """
+    inicio = time.perf_counter()
+    if _es_pdf(archivo):
+        with _ruta_pdf(archivo) as ruta:
+            paginas = convert_from_path(ruta, dpi=OCR_DPI, grayscale=True)
+    elif archivo.extension in EXTENSIONES_FACTURA:
+        paginas = [Image.open(archivo.abrir())]
+    else:
+        raise ValueError("Formato de archivo no compatible. Usa PNG, JPG o PDF.")
+    return paginas, time.perf_counter() - inicio
+
+
+def _ocr_pagina(pagina, regiones=None):
+    """ Preprocesa la página y lee solo sus regiones, si se indicaron, o la página completa. """
+    inicio = time.perf_counter()
+    if OCR_PREPROCESAR:
+        pagina = preprocesar(pagina)
+    partes = recortar_regiones(pagina, regiones) if regiones else [pagina]
+    texto = '\n'.join(reconocer(parte) for parte in partes)
+    fin = time.perf_counter()
+    return texto, fin - inicio, fin, sum(parte.width * parte.height for parte in partes)
+
+
+def _ocr_pdf_por_paginas(archivo, regiones=None):
     """
-    Extrae texto de una factura que puede ser una imagen o un archivo PDF.
+    Rasteriza y lee el PDF de a una página, así la memoria no crece con el
+    número de páginas. Se detiene cuando el texto acumulado ya tiene todos
+    los CAMPOS_FACTURA.
     """
+    with _ruta_pdf(archivo) as ruta:
+        total = pdfinfo_from_path(ruta)["Pages"]
+        texto = ''
+        tiempo = {"paginas": 0, "paginas_pdf": total, "carga_segundos": 0.0, "ocr_segundos": [], "pixeles": 0}
+        fin = time.perf_counter()
 
-    # Buscar Tesseract solo cuando se llama a la función
-    tesseract_path = shutil.which('tesseract')
-    if tesseract_path:
-        pytesseract.pytesseract.tesseract_cmd = tesseract_path
-    else:
-        raise EnvironmentError("Tesseract no está instalado o no se encuentra en el PATH.")
-    
+        for numero in range(1, total + 1):
+            inicio = time.perf_counter()
+            pagina, = convert_from_path(ruta, dpi=OCR_DPI, first_page=numero, last_page=numero, grayscale=True)
+            tiempo["carga_segundos"] += time.perf_counter() - inicio
+
+            texto_pagina, segundos, fin, pixeles = _ocr_pagina(pagina, regiones)
+            del pagina
+            texto += texto_pagina
+            tiempo["ocr_segundos"].append(round(segundos, 3))
+            tiempo["pixeles"] += pixeles
+            tiempo["paginas"] = numero
+
+            if len(campos_encontrados(texto)) == len(CAMPOS_FACTURA):
+                break
+
+    tiempo["carga_segundos"] = round(tiempo["carga_segundos"], 3)
+    return texto, tiempo, fin
+
+
+def _clave_ocr(archivo, regiones):
+    """ Clave del texto en cache_ocr: el contenido del archivo y todo lo que cambia el resultado del OCR. """
     try:
-        if filepath.lower().endswith(('.png', '.jpg', '.jpeg')):
-            texto = pytesseract.image_to_string(Image.open(filepath), lang='spa')
-        elif filepath.lower().endswith('.pdf'):
-            pages = convert_from_path(filepath)
-            texto = ''
-            for page in pages:
-                texto += pytesseract.image_to_string(page, lang='spa')
+        contenido = archivo.sha256()
+    except OSError:
+        return None
+    return clave(contenido, regiones, OCR_PREPROCESAR, OCR_PDF_POR_PAGINAS, OCR_DPI, OCR_IDIOMA)
+
+
+def extraer_textos_facturas(facturas, regiones=None, al_terminar=None):
+    """
+    Extrae el texto de varias facturas a la vez: los archivos se cargan y
+    todas sus páginas pasan por Tesseract en paralelo, en un pool acotado a
+    OCR_TRABAJADORES. Con OCR_PDF_POR_PAGINAS cada PDF se lee en su propio
+    hilo página por página (ver _ocr_pdf_por_paginas). Devuelve los textos en
+    el mismo orden de facturas y los tiempos de cada archivo (carga, OCR de
+    cada página, total hasta que terminó su última página y píxeles leídos).
+    'regiones' trae, por archivo, las regiones de la plantilla de la empresa
+    (ver regiones_plantilla) o None para leer las páginas completas. Los
+    archivos ya leídos antes con la misma configuración salen de cache_ocr.
+    Cada factura es una ruta o un ArchivoFactura (ver modules/cargas.py), que
+    se lee desde memoria sin pasar por el disco. Si se da al_terminar, se
+    llama con (índice, tiempos) cuando queda listo el texto de cada archivo.
+    """
+    archivos = [como_archivo(factura) for factura in facturas]
+    if regiones is None:
+        regiones = [None] * len(archivos)
+    pool = _obtener_ocr_pool()
+
+    inicio = time.perf_counter()
+    claves = [_clave_ocr(archivo, regiones_archivo) for archivo, regiones_archivo in zip(archivos, regiones)]
+    cacheados = [cache_ocr.obtener(clave) if clave else None for clave in claves]
+    if any(texto is None for texto in cacheados):
+        verificar_motor()
+
+    tareas = []
+    for archivo, regiones_archivo, cacheado in zip(archivos, regiones, cacheados):
+        if cacheado is not None:
+            tareas.append((None, None))
+        elif OCR_PDF_POR_PAGINAS and _es_pdf(archivo):
+            tareas.append((_ocr_pdf_por_paginas, pool.submit(_ocr_pdf_por_paginas, archivo, regiones_archivo)))
         else:
-            raise ValueError("Formato de archivo no compatible. Usa PNG, JPG o PDF.")
-    except Exception as e:
-        texto = f"Error al procesar la factura: {str(e)}"
-    
-    return texto
+            tareas.append((_cargar_paginas, pool.submit(_cargar_paginas, archivo)))
+
+    # Las páginas se encolan a medida que cada archivo termina de cargar
+    ocr_por_archivo = []
+    for (funcion, tarea), regiones_archivo in zip(tareas, regiones):
+        try:
+            if funcion is _cargar_paginas:
+                paginas, _ = tarea.result()
+                ocr_por_archivo.append([pool.submit(_ocr_pagina, pagina, regiones_archivo) for pagina in paginas])
+            else:
+                ocr_por_archivo.append(None)
+        except Exception as e:
+            ocr_por_archivo.append(e)
+
+    textos = []
+    tiempos = []
+    for archivo, (funcion, tarea), ocr, clave, cacheado in zip(archivos, tareas, ocr_por_archivo, claves, cacheados):
+        tiempo = {
+            "archivo": archivo.nombre, "paginas": 0, "carga_segundos": None, "ocr_segundos": [], "pixeles": 0,
+            "cache": cacheado is not None
+        }
+        fin = inicio
+        try:
+            if cacheado is not None:
+                texto = cacheado
+                fin = time.perf_counter()
+            elif isinstance(ocr, Exception):
+                raise ocr
+            elif ocr is None:
+                texto, tiempo_pdf, fin = tarea.result()
+                tiempo.update(tiempo_pdf)
+            else:
+                tiempo["carga_segundos"] = round(tarea.result()[1], 3)
+                texto = ''
+                for futuro in ocr:
+                    texto_pagina, segundos, terminada, pixeles = futuro.result()
+                    fin = max(fin, terminada)
+                    texto += texto_pagina
+                    tiempo["ocr_segundos"].append(round(segundos, 3))
+                    tiempo["pixeles"] += pixeles
+                tiempo["paginas"] = len(ocr)
+            if clave and cacheado is None:
+                cache_ocr.guardar(clave, texto)
+        except Exception as e:
+            texto = f"Error al procesar la factura: {str(e)}"
+            fin = time.perf_counter()
+        tiempo["total_segundos"] = round(fin - inicio, 3)
+        textos.append(texto)
+        tiempos.append(tiempo)
+        if al_terminar is not None:
+            al_terminar(len(tiempos) - 1, tiempo)
+
+    return textos, tiempos
+
+
+def extraer_texto_factura(filepath):
+    """
+    Extrae texto de una factura que puede ser una imagen o un archivo PDF.
+    """
+    textos, _ = extraer_textos_facturas([filepath])
+    return textos[0]
 
 
 def analizar_factura_con_openai(texto_factura):
     """
     Analiza el texto extraído de la factura utilizando la API de OpenAI para obtener
-    información relevante como zona, consumo promedio y costo del kWh.
-    """
-    prompt = f"""
-    A continuación tienes el texto de una factura de servicios públicos. Extrae la siguiente información si está disponible:
-
-    1. Ciudad y Departamento: Ejemplo: Medellín, Antioquia.
-    2. Región correspondiente según la ciudad (elige una de las siguientes):
-        - Costa Caribe
-        - Región Andina
-        - Región Pacífica
-        - Llanos Orientales
-        - Amazonía
-        - Desierto de la Guajira
-    3. Consumo promedio mensual de energía en kWh.
-    4. Costo del kWh en pesos colombianos (COP).
-
-    Texto de la factura:
-    \"\"\"{texto_factura}\"\"\"
-
-    Responde en el siguiente formato:
-    Zona del Proyecto: <zona>
-    Consumo promedio mensual de energía: <valor> kWh/mes
-    Costo del kWh: $<valor> COP
+    la ciudad, el departamento, la zona, el consumo promedio y el costo del kWh.
+    Solo se envían las líneas relevantes del texto, dentro de
+    PRESUPUESTO_TOKENS_PROMPT, y el modelo responde en JSON. Las respuestas se
+    guardan en cache_llm por el texto enviado. Lanza ValueError si la
+    respuesta no se puede interpretar y ErrorLLM si el servicio no responde
+    (caído, plazo agotado o circuito abierto).
     """
+    prompt, seleccion = construir_prompt(texto_factura)
+
+    # La plantilla va en la clave para que un cambio en las instrucciones no reutilice respuestas viejas
+    clave_llm = clave(OPENAI_MODELO, normalizar_texto(seleccion["texto"]), PLANTILLA_PROMPT)
+    inicio = time.perf_counter()
+    resultado = cache_llm.obtener(clave_llm)
+    if resultado is not None:
+        _registrar_consulta(seleccion, inicio, "caché")
+        return resultado
 
     try:
-        respuesta = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "Eres un asistente que extrae datos de facturas de servicios públicos."},
+        respuesta = cliente_llm().completar(
+            [
+                {"role": "system", "content": "Eres un asistente que extrae datos de facturas de servicios públicos y responde solo en JSON."},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=200
+            max_tokens=200,
+            temperature=0,
+            response_format={"type": "json_object"}
         )
+        resultado = interpretar_respuesta(respuesta)
+    except ErrorLLM:
+        # Caída, plazo agotado o circuito abierto: no es culpa de la factura, se atiende como servicio no disponible
+        _registrar_consulta(seleccion, inicio, "error")
+        raise
+    except ValueError as e:
+        _registrar_consulta(seleccion, inicio, "error")
+        raise ValueError(f"Error al analizar la factura con OpenAI: {str(e)}") from e
 
-        resultado = respuesta.choices[0]['message']['content'].strip()
-    except Exception as e:
-        resultado = f"Error al analizar la factura con OpenAI: {str(e)}"
-    
+    _registrar_consulta(seleccion, inicio, "ok")
+    cache_llm.guardar(clave_llm, resultado)
     return resultado
+
+
+def _registrar_consulta(seleccion, inicio, estado):
+    """ Tamaño del prompt y latencia de cada consulta al modelo. """
+    logger.info(
+        "OpenAI (%s): prompt de %d tokens (%d de %d líneas), %.0f ms", estado, seleccion['tokens_prompt'],
+        seleccion['lineas_usadas'], seleccion['lineas_totales'], (time.perf_counter() - inicio) * 1000
+    )
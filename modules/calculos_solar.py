@@ -1,4 +1,6 @@
+from functools import lru_cache
 import math
+import os
 
 # Diccionario con la radiación solar por zona (kWh/m²/mes)
 RADIACION_ANUAL_POR_ZONA = {
@@ -10,15 +12,32 @@ RADIACION_ANUAL_POR_ZONA = {
     "Desierto de la Guajira": 2190
 }
 
+# Potencia de los paneles (kWp) para los que se calcula la energía por zona
+POTENCIAS_PANEL = (0.400, 0.585, 0.605)
+
+# Constantes por zona que solo dependen de la ubicación; se calculan una vez al importar
+RADIACION_ANUAL_CALCULADA = {zona: radiacion * 12 for zona, radiacion in RADIACION_ANUAL_POR_ZONA.items()}
+ENERGIA_PANEL_POR_ZONA = {
+    zona: tuple(round(potencia * radiacion, 2) for potencia in POTENCIAS_PANEL)
+    for zona, radiacion in RADIACION_ANUAL_CALCULADA.items()
+}
+
+# Mantenimiento anual que se cotiza (el mismo de la página de forma de pago)
+MANTENIMIENTO_ANUAL = 315900
+
+# Cantidad máxima de proyectos distintos que se guardan en memoria
+TAMANO_CACHE_PROYECTOS = int(os.getenv('TAMANO_CACHE_PROYECTOS', '4096'))
+
 def radiacion_anual_zona(ubicacion):
-    if ubicacion in RADIACION_ANUAL_POR_ZONA:
-        return RADIACION_ANUAL_POR_ZONA[ubicacion] * 12
+    if ubicacion in RADIACION_ANUAL_CALCULADA:
+        return RADIACION_ANUAL_CALCULADA[ubicacion]
     else:
         raise ValueError(f'Ubicación {ubicacion} no encontrada en la base de datos.')
 
 class CalculoNumeroPaneles:
     def __init__(self, ubicacion, potencia):
         self.radiacion_anual = radiacion_anual_zona(ubicacion)
+        self.energia_por_panel = ENERGIA_PANEL_POR_ZONA[ubicacion]
         self.potencia = potencia
 
         # Potencia de diferentes tipos de paneles (kWp)
@@ -30,10 +49,8 @@ class CalculoNumeroPaneles:
         self.area_panel = 1.13  
 
     def calcular_paneles(self):
-        energia_400 = round(self.potencia_panel_400 * self.radiacion_anual, 2)
-        energia_585 = round(self.potencia_panel_585 * self.radiacion_anual, 2)
-        energia_605 = round(self.potencia_panel_605 * self.radiacion_anual, 2)
-        
+        energia_400, energia_585, energia_605 = self.energia_por_panel
+
         consumo_anual = self.potencia * 12  
 
         numeroPaneles_400 = round(math.ceil(consumo_anual / energia_400))
@@ -69,9 +86,53 @@ def calcular_impacto_ambiental(consumo_anual_kwh, porcentaje_energia_solar=100):
         "km_equivalentes_auto": int(km_equivalentes_auto)
     }
 
+class ResultadoProyecto(dict):
+    """
+    Diccionario de solo lectura con el resultado de calcular_proyecto. Como los
+    resultados se comparten desde la caché, cualquier intento de modificarlos
+    lanza TypeError.
+    """
+
+    def _solo_lectura(self, *args, **kwargs):
+        raise TypeError("El resultado del proyecto es de solo lectura.")
+
+    __setitem__ = __delitem__ = _solo_lectura
+    clear = pop = popitem = setdefault = update = _solo_lectura
+    __ior__ = _solo_lectura
+
+    def __reduce__(self):
+        return (ResultadoProyecto, (dict(self),))
+
+def _congelar(valor):
+    if isinstance(valor, dict):
+        return ResultadoProyecto({clave: _congelar(v) for clave, v in valor.items()})
+    return valor
+
+@lru_cache(maxsize=TAMANO_CACHE_PROYECTOS)
 def calcular_proyecto(ubicacion, potencia, costo):
+    """
+    Calcula el proyecto para la zona, el consumo mensual y el costo del kWh.
+    El resultado depende solo de esos tres valores, así que se guarda en una
+    caché LRU y se devuelve como un ResultadoProyecto de solo lectura.
+    """
+    return _congelar(_calcular_proyecto(ubicacion, potencia, costo))
+
+def estadisticas_cache_proyectos():
+    """ Aciertos, fallos y tamaño de la caché de calcular_proyecto en este proceso. """
+    info = calcular_proyecto.cache_info()
+    return {"aciertos": info.hits, "fallos": info.misses, "tamano": info.currsize, "maximo": info.maxsize}
+
+def _calcular_proyecto(ubicacion, potencia, costo):
     paneles = CalculoNumeroPaneles(ubicacion, potencia).calcular_paneles()
+    return armar_proyecto(paneles, potencia, costo)
 
+def armar_proyecto(paneles, potencia, costo, porcentaje_energia_solar=100):
+    """
+    Costos, inversores, baterías y estructura del proyecto a partir de la
+    cantidad de paneles de cada tipo, el consumo mensual y el costo del kWh.
+    porcentaje_energia_solar es la parte del consumo que cubre el sistema y
+    se usa para el impacto ambiental.
+    """
     consumoAnual = potencia * 12
     ahorroAnual = f'${int(consumoAnual * costo):,}'.replace(",", ".")
     costokWp = 375320
@@ -105,7 +166,7 @@ def calcular_proyecto(ubicacion, potencia, costo):
     midcland_400W = round(math.ceil(paneles['Número de paneles de 400W'] * 2) - 2)
     endcland_400W = round(math.ceil(paneles['Número de paneles de 400W'] / 2))
 
-    impacto_ambiental = calcular_impacto_ambiental(consumoAnual)
+    impacto_ambiental = calcular_impacto_ambiental(consumoAnual, porcentaje_energia_solar)
 
     return {
         "Resultados Generales": {
@@ -0,0 +1,112 @@
+import numpy as np
+
+from modules import calculos_solar
+from modules.calculos_solar import RADIACION_ANUAL_POR_ZONA
+
+ZONAS = list(RADIACION_ANUAL_POR_ZONA)
+
+# Energía anual por panel y zona (filas en el orden de ZONAS), la misma de CalculoNumeroPaneles
+ENERGIA_PANEL_POR_ZONA = np.array([calculos_solar.ENERGIA_PANEL_POR_ZONA[zona] for zona in ZONAS])
+
+COSTO_KWP = 375320
+CO2_POR_KWH = 0.0007
+CO2_POR_KM_AUTO = 0.00025
+
+
+def indices_zona(ubicaciones):
+    """ Convierte los nombres de zona en índices de ZONAS; lanza ValueError si alguna no existe. """
+    unicas, inversa = np.unique(np.asarray(ubicaciones, dtype=str), return_inverse=True)
+    posiciones = {zona: i for i, zona in enumerate(ZONAS)}
+    for zona in unicas:
+        if zona not in posiciones:
+            raise ValueError(f'Ubicación {zona} no encontrada en la base de datos.')
+    return np.array([posiciones[zona] for zona in unicas], dtype=np.intp)[inversa]
+
+
+def _ceil(valores):
+    return np.ceil(valores).astype(np.int64)
+
+
+def calcular_proyecto_lote(ubicaciones, potencias, costos):
+    """
+    Versión vectorizada de calcular_proyecto para muchos proyectos a la vez.
+    Recibe arreglos (o listas) de zonas, consumo mensual y costo del kWh, y
+    devuelve un diccionario de columnas NumPy con los valores numéricos de
+    cada proyecto en el mismo orden de entrada.
+    """
+    zona = indices_zona(ubicaciones)
+    potencia = np.asarray(potencias, dtype=np.float64)
+    costo = np.asarray(costos, dtype=np.float64)
+
+    consumo_anual = potencia * 12
+    energia = ENERGIA_PANEL_POR_ZONA[zona]
+    paneles = _ceil(consumo_anual[:, None] / energia)
+    paneles_400, paneles_585, paneles_605 = paneles.T
+
+    capacidad_bateria_gel = _ceil(((consumo_anual / 365) / 12) / 0.5)
+    capacidad_bateria_litio = _ceil((((consumo_anual / 365) / 24) * 0.9) * 12)
+
+    reduccion_co2 = consumo_anual * (100 / 100) * CO2_POR_KWH
+
+    return {
+        "Costo Proyecto": np.trunc(COSTO_KWP * paneles_400).astype(np.int64),
+        "Ahorro Anual": np.trunc(consumo_anual * costo).astype(np.int64),
+        "Disminución de Renta": np.trunc(COSTO_KWP * paneles_400 / 2).astype(np.int64),
+        "Área mínima requerida para páneles": _ceil(paneles_400 * 1.13),
+        "reduccion_CO2_toneladas": np.round(reduccion_co2, 2),
+        "km_equivalentes_auto": np.trunc(reduccion_co2 / CO2_POR_KM_AUTO).astype(np.int64),
+        "Número de paneles de 400W": paneles_400,
+        "Número de paneles de 585W": paneles_585,
+        "Número de paneles de 605W": paneles_605,
+        "Número de Inversores 3.500W": _ceil((paneles_400 * 400) / 3500),
+        "Número de Inversores 6.000W": _ceil((paneles_585 * 585) / 6000),
+        "Número de Inversores 12.000W": _ceil((paneles_605 * 600) / 12000),
+        "Número de Baterías Gel 100Ah": _ceil(capacidad_bateria_gel / 100),
+        "Número de Baterías Gel 150Ah": _ceil(capacidad_bateria_gel / 150),
+        "Número de Baterías Gel 200Ah": _ceil(capacidad_bateria_gel / 200),
+        "Número de Baterías Gel 250Ah": _ceil(capacidad_bateria_gel / 250),
+        "Número de Baterías litio 60Ah": _ceil(capacidad_bateria_litio / 60),
+        "Número de Baterías litio 100Ah": _ceil(capacidad_bateria_litio / 100),
+        "Número de Baterías litio 120Ah": _ceil(capacidad_bateria_litio / 120),
+        "Número de Baterías litio 150Ah": _ceil(capacidad_bateria_litio / 150),
+        "Número de Baterías litio 2000Ah": _ceil(capacidad_bateria_litio / 200),
+        "Número de Rieles 4.7m 400W": _ceil((paneles_400 * 1.15) / 4.7) * 2,
+        "Número de Midcland 400W": paneles_400 * 2 - 2,
+        "Número de Endcland 400W": _ceil(paneles_400 / 2),
+    }
+
+
+def _dinero(valor):
+    return f'${int(valor):,}'.replace(",", ".")
+
+
+def fila_como_proyecto(columnas, i):
+    """ Arma, para el proyecto i, el mismo diccionario anidado que devuelve calcular_proyecto. """
+    valor = {clave: columna[i].item() for clave, columna in columnas.items()}
+
+    return {
+        "Resultados Generales": {
+            "Costo Proyecto": _dinero(valor["Costo Proyecto"]),
+            "Ahorro Anual": _dinero(valor["Ahorro Anual"]),
+            "Disminución de Renta": _dinero(valor["Disminución de Renta"]),
+            "Área mínima requerida para páneles": f'{valor["Área mínima requerida para páneles"]} m²',
+            "Impacto Ambiental": {
+                "reduccion_CO2_toneladas": valor["reduccion_CO2_toneladas"],
+                "km_equivalentes_auto": valor["km_equivalentes_auto"],
+            }
+        },
+        "Equipos Necesarios:": {
+            "Paneles": {clave: valor[clave] for clave in (
+                "Número de paneles de 400W", "Número de paneles de 585W", "Número de paneles de 605W")},
+            "Inversores": {clave: valor[clave] for clave in (
+                "Número de Inversores 3.500W", "Número de Inversores 6.000W", "Número de Inversores 12.000W")},
+            "Baterias gel": {clave: valor[clave] for clave in (
+                "Número de Baterías Gel 100Ah", "Número de Baterías Gel 150Ah",
+                "Número de Baterías Gel 200Ah", "Número de Baterías Gel 250Ah")},
+            "Baterias Litio": {clave: valor[clave] for clave in (
+                "Número de Baterías litio 60Ah", "Número de Baterías litio 100Ah", "Número de Baterías litio 120Ah",
+                "Número de Baterías litio 150Ah", "Número de Baterías litio 2000Ah")},
+            "Estructura": {clave: valor[clave] for clave in (
+                "Número de Rieles 4.7m 400W", "Número de Midcland 400W", "Número de Endcland 400W")},
+        }
+    }
@@ -0,0 +1,137 @@
+from importlib import import_module
+from importlib.util import find_spec
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+# Tiempo máximo para importar app.py en un proceso nuevo; el benchmark falla si se pasa (milisegundos)
+LIMITE_ARRANQUE_MS = float(os.getenv('LIMITE_ARRANQUE_MS', '1500'))
+
+# Paquetes pesados que no deben cargarse al importar app.py
+PAQUETES_PESADOS = ('numpy', 'pytesseract', 'tesserocr', 'pdf2image', 'requests')
+
+# Carpeta de app.py, para medir el arranque sin importar desde dónde se llame
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger(__name__)
+
+
+class CapacidadNoDisponible(Exception):
+    """ Falta una dependencia o configuración que la capacidad necesita. """
+
+
+def _requisitos_ocr():
+    faltantes = [paquete for paquete in ('PIL', 'pdf2image', 'pytesseract') if find_spec(paquete) is None]
+    if find_spec('tesserocr') is None and not shutil.which('tesseract'):
+        faltantes.append("tesserocr o el ejecutable de tesseract")
+    return faltantes
+
+
+def _requisitos_llm():
+    faltantes = [paquete for paquete in ('requests',) if find_spec(paquete) is None]
+    if not os.getenv('OPENAI_API_KEY') and not os.getenv('OPENAI_BASE_URL'):
+        faltantes.append("la variable de entorno OPENAI_API_KEY")
+    return faltantes
+
+
+# Cada capacidad: módulo que la implementa y función que dice qué le falta, sin importarlo
+CAPACIDADES = {
+    "ocr": ("modules.ocr_motor", _requisitos_ocr),
+    "llm": ("modules.cliente_llm", _requisitos_llm),
+    "facturas": ("modules.facturas", _requisitos_ocr),
+    "finanzas": ("modules.finanzas", lambda: [paquete for paquete in ('numpy',) if find_spec(paquete) is None]),
+    "sensibilidad": ("modules.sensibilidad", lambda: [paquete for paquete in ('numpy',) if find_spec(paquete) is None]),
+    "simulacion": ("modules.simulacion_horaria", lambda: [paquete for paquete in ('numpy',) if find_spec(paquete) is None]),
+}
+
+_cargados = {}
+_errores = {}
+_lock = threading.Lock()
+
+
+def capacidad(nombre):
+    """
+    Módulo de la capacidad, importado la primera vez que se pide. Lanza
+    CapacidadNoDisponible si le faltan dependencias o si no se pudo importar.
+    """
+    if nombre in _cargados:
+        return _cargados[nombre]
+
+    modulo, requisitos = CAPACIDADES[nombre]
+    with _lock:
+        if nombre not in _cargados:
+            faltantes = requisitos()
+            if faltantes:
+                raise CapacidadNoDisponible(f"La función de {nombre} no está disponible: falta {', '.join(faltantes)}.")
+            try:
+                inicio = time.perf_counter()
+                _cargados[nombre] = import_module(modulo)
+                _errores.pop(nombre, None)
+                logger.info("Capacidad %s cargada en %.0f ms", nombre, (time.perf_counter() - inicio) * 1000)
+            except Exception as e:
+                _errores[nombre] = str(e)
+                raise CapacidadNoDisponible(f"La función de {nombre} no está disponible: {str(e)}") from e
+    return _cargados[nombre]
+
+
+def estado_capacidades():
+    """ Por capacidad: si ya se cargó en este proceso, si está disponible y qué le falta. """
+    estado = {}
+    for nombre, (modulo, requisitos) in CAPACIDADES.items():
+        faltantes = requisitos()
+        if nombre in _errores:
+            faltantes.append(_errores[nombre])
+        # Cargada también si otra capacidad la importó (facturas importa ocr y llm)
+        estado[nombre] = {"cargada": modulo in sys.modules, "disponible": not faltantes, "faltantes": faltantes}
+
+    if estado["ocr"]["cargada"]:
+        # Igual que antes de leer una factura: sin tesserocr ni el ejecutable de tesseract no hay OCR
+        ocr_motor = sys.modules[CAPACIDADES["ocr"][0]]
+        try:
+            ocr_motor.verificar_motor()
+            estado["ocr"]["motor"] = ocr_motor.motor_activo()
+        except EnvironmentError as e:
+            for nombre in ("ocr", "facturas"):
+                estado[nombre].update(disponible=False, faltantes=estado[nombre]["faltantes"] + [str(e)])
+    if estado["llm"]["cargada"]:
+        estado["llm"].update(sys.modules[CAPACIDADES["llm"][0]].cliente_llm().estadisticas())
+    return estado
+
+
+def medir_arranque(repeticiones=3):
+    """
+    Milisegundos que tarda un proceso nuevo en importar app.py (el mejor de
+    varios intentos) y los PAQUETES_PESADOS que quedaron cargados.
+    """
+    codigo = (
+        "import sys, time; inicio = time.perf_counter(); import app; "
+        "print(round((time.perf_counter() - inicio) * 1000, 1)); "
+        f"print(','.join(p for p in {PAQUETES_PESADOS!r} if p in sys.modules))"
+    )
+    entorno = {clave: valor for clave, valor in os.environ.items() if clave != 'OPENAI_API_KEY'}
+    tiempos, pesados = [], []
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, '-c', codigo], capture_output=True, text=True, env=entorno, check=True, cwd=RAIZ
+        ).stdout.splitlines()
+        tiempos.append(float(salida[-2]))
+        pesados = [paquete for paquete in salida[-1].split(',') if paquete]
+    return min(tiempos), pesados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mide el arranque de app.py (sin OPENAI_API_KEY) y revisa que no cargue paquetes pesados.")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    milisegundos, pesados = medir_arranque(args.repeticiones)
+    print(f"Importar app.py: {milisegundos:.0f} ms (límite {LIMITE_ARRANQUE_MS:.0f} ms)")
+    print(f"Paquetes pesados cargados al arrancar: {', '.join(pesados) or 'ninguno'}")
+    print(json.dumps(estado_capacidades(), ensure_ascii=False, indent=2))
+    raise SystemExit(1 if pesados or milisegundos > LIMITE_ARRANQUE_MS else 0)
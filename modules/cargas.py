@@ -0,0 +1,153 @@
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+from flask import Request
+
+from modules.cache_facturas import sha256_archivo
+
+# Carpeta de las facturas que no caben en memoria; los archivos llevan un nombre aleatorio, no el del cliente
+UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
+
+# Tamaño máximo de cada factura y tamaño hasta el que se conserva en memoria (MB)
+MAX_FACTURA_MB = float(os.getenv('MAX_FACTURA_MB', '15'))
+CARGA_EN_MEMORIA_MB = float(os.getenv('CARGA_EN_MEMORIA_MB', '8'))
+
+# Tiempo que se conservan en disco las facturas grandes (segundos), por si las usa un trabajo asíncrono
+RETENCION_CARGAS = int(os.getenv('RETENCION_CARGAS', '3600'))
+
+EXTENSIONES_FACTURA = ('.pdf', '.jpg', '.jpeg', '.png')
+
+# Margen para los campos del formulario además de las dos facturas
+MAX_SOLICITUD_BYTES = int((2 * MAX_FACTURA_MB + 1) * 1024 * 1024)
+
+# Solo se borran archivos con el nombre que les pone recibir_factura
+_NOMBRE_CARGA = re.compile(r'^[0-9a-f]{32}\.[a-z]+$')
+
+_ultima_limpieza = 0
+_lock = threading.Lock()
+
+
+class FacturaMuyGrande(ValueError):
+    """ La factura supera MAX_FACTURA_MB. """
+
+
+class SolicitudCargas(Request):
+    """
+    Petición de Flask que guarda cada archivo recibido en memoria hasta
+    CARGA_EN_MEMORIA_MB (Werkzeug pasa a disco desde 500 KB, así que una
+    foto de celular se escribía y se volvía a leer en cada factura).
+    """
+
+    max_content_length = MAX_SOLICITUD_BYTES
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledTemporaryFile(max_size=int(CARGA_EN_MEMORIA_MB * 1024 * 1024))
+
+
+class ArchivoFactura:
+    """
+    Factura recibida: su contenido en memoria o, si es grande, la ruta del
+    archivo en UPLOAD_FOLDER. Se puede enviar a otro proceso (trabajos
+    asíncronos). 'nombre' es el del cliente y solo se usa para mostrar.
+    """
+
+    __slots__ = ('nombre', 'contenido', 'ruta')
+
+    def __init__(self, nombre, contenido=None, ruta=None):
+        self.nombre = nombre
+        self.contenido = contenido
+        self.ruta = ruta
+
+    def __getstate__(self):
+        return self.nombre, self.contenido, self.ruta
+
+    def __setstate__(self, estado):
+        self.nombre, self.contenido, self.ruta = estado
+
+    @property
+    def extension(self):
+        return os.path.splitext(self.nombre)[1].lower()
+
+    def abrir(self):
+        """ Archivo binario para leer el contenido, esté en memoria o en disco. """
+        return BytesIO(self.contenido) if self.contenido is not None else open(self.ruta, 'rb')
+
+    def sha256(self):
+        if self.contenido is not None:
+            return hashlib.sha256(self.contenido).hexdigest()
+        return sha256_archivo(self.ruta)
+
+
+def como_archivo(factura):
+    """ ArchivoFactura para una ruta (las herramientas de línea de comandos pasan rutas) o la misma factura. """
+    if isinstance(factura, ArchivoFactura):
+        return factura
+    return ArchivoFactura(os.path.basename(factura), ruta=factura)
+
+
+def recibir_factura(archivo):
+    """
+    ArchivoFactura para un archivo subido (FileStorage de Flask): en memoria
+    si no pasa de CARGA_EN_MEMORIA_MB y si no, copiado a UPLOAD_FOLDER con un
+    nombre único. Lanza ValueError si el formato no es compatible y
+    FacturaMuyGrande si pasa de MAX_FACTURA_MB.
+    """
+    limpiar_cargas()
+    factura = ArchivoFactura(os.path.basename(archivo.filename or ''))
+    if factura.extension not in EXTENSIONES_FACTURA:
+        raise ValueError("Formato de archivo no compatible. Usa PNG, JPG o PDF.")
+
+    flujo = archivo.stream
+    flujo.seek(0, os.SEEK_END)
+    tamano = flujo.tell()
+    flujo.seek(0)
+    if tamano > MAX_FACTURA_MB * 1024 * 1024:
+        raise FacturaMuyGrande(f"La factura {factura.nombre} supera el máximo de {MAX_FACTURA_MB:g} MB.")
+
+    if tamano <= CARGA_EN_MEMORIA_MB * 1024 * 1024:
+        factura.contenido = flujo.read()
+    else:
+        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        factura.ruta = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4().hex}{factura.extension}")
+        with open(factura.ruta, 'wb') as destino:
+            shutil.copyfileobj(flujo, destino, 1 << 20)
+    return factura
+
+
+def liberar_facturas(*facturas):
+    """ Borra del disco las facturas que se guardaron en UPLOAD_FOLDER. """
+    for factura in facturas:
+        if factura.ruta and os.path.dirname(factura.ruta) == UPLOAD_FOLDER and _NOMBRE_CARGA.match(os.path.basename(factura.ruta)):
+            try:
+                os.remove(factura.ruta)
+            except OSError:
+                pass
+
+
+def limpiar_cargas():
+    """ Borra las facturas de UPLOAD_FOLDER más antiguas que RETENCION_CARGAS (a lo sumo cada 5 minutos). """
+    global _ultima_limpieza
+    ahora = time.time()
+    with _lock:
+        if ahora - _ultima_limpieza < 300:
+            return
+        _ultima_limpieza = ahora
+
+    try:
+        nombres = os.listdir(UPLOAD_FOLDER)
+    except OSError:
+        return
+    for nombre in filter(_NOMBRE_CARGA.match, nombres):
+        ruta = os.path.join(UPLOAD_FOLDER, nombre)
+        try:
+            if os.path.isfile(ruta) and ahora - os.path.getmtime(ruta) > RETENCION_CARGAS:
+                os.remove(ruta)
+        except OSError:
+            pass
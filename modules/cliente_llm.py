@@ -0,0 +1,311 @@
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as ErrorUrllib3
+
+from modules.errores_llm import CircuitoAbierto, ErrorLLM, ErrorTransitorio
+
+# Servicio compatible con la API de chat de OpenAI; para pruebas se apunta al stub local (modules/stub_llm.py)
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+OPENAI_MODELO = os.getenv('OPENAI_MODELO', 'gpt-4')
+
+# Plazo total de una consulta, incluidos los reintentos y la espera por un cupo (segundos)
+OPENAI_PLAZO = float(os.getenv('OPENAI_PLAZO', '30'))
+OPENAI_REINTENTOS = int(os.getenv('OPENAI_REINTENTOS', '2'))
+
+# Consultas simultáneas por worker y conexiones que se mantienen abiertas con el servicio
+OPENAI_CONCURRENCIA = int(os.getenv('OPENAI_CONCURRENCIA', '4'))
+OPENAI_CONEXIONES = int(os.getenv('OPENAI_CONEXIONES', '8'))
+
+# Fallos seguidos que abren el circuito y segundos que se deja de consultar antes de probar de nuevo
+OPENAI_FALLOS_CIRCUITO = int(os.getenv('OPENAI_FALLOS_CIRCUITO', '5'))
+OPENAI_PAUSA_CIRCUITO = float(os.getenv('OPENAI_PAUSA_CIRCUITO', '30'))
+
+# Espera base de los reintentos; se duplica en cada intento y se toma al azar entre 0 y ese valor
+ESPERA_BASE_REINTENTO = 0.5
+
+ESTADOS_TRANSITORIOS = {408, 409, 429, 500, 502, 503, 504}
+
+# Bytes por lectura del cuerpo de la respuesta; entre lecturas se revisa el plazo
+TAMANO_LECTURA = 8192
+
+logger = logging.getLogger(__name__)
+
+
+class BackendHTTP:
+    """
+    Backend con la API de chat de OpenAI (o cualquier servicio compatible en
+    base_url) sobre una sesión de requests que reutiliza las conexiones.
+    """
+
+    def __init__(self, base_url=OPENAI_BASE_URL, api_key=OPENAI_API_KEY, conexiones=OPENAI_CONEXIONES):
+        self.url = base_url.rstrip('/') + '/chat/completions'
+        self.api_key = api_key
+        self.base_url = base_url
+        # Se vuelve False si el modelo rechaza response_format (modelos sin modo JSON, como gpt-4)
+        self.modo_json = True
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=conexiones, max_retries=0)
+        self.sesion.mount('http://', adaptador)
+        self.sesion.mount('https://', adaptador)
+        if api_key:
+            self.sesion.headers['Authorization'] = f"Bearer {api_key}"
+
+    def completar(self, mensajes, timeout, **opciones):
+        """
+        Texto de la respuesta del modelo. timeout es el plazo total de la
+        consulta en segundos: requests solo limita cada espera del socket, así
+        que el cuerpo se lee por partes y se corta si el plazo se agota (un
+        servicio que responde a goteo no lo alarga). Lanza ErrorTransitorio o
+        ErrorLLM.
+        """
+        if not self.api_key and self.base_url == OPENAI_BASE_URL:
+            raise ErrorLLM("La clave de API de OpenAI no está configurada en la variable de entorno 'OPENAI_API_KEY'.")
+        if not self.modo_json:
+            opciones.pop('response_format', None)
+        limite = time.monotonic() + timeout
+        try:
+            with self.sesion.post(
+                self.url, json={"model": OPENAI_MODELO, "messages": mensajes, **opciones}, timeout=timeout, stream=True
+            ) as respuesta:
+                estado = respuesta.status_code
+                texto = _leer_cuerpo(respuesta, limite)
+        except (requests.RequestException, ErrorUrllib3) as e:
+            # Tiempo agotado, conexión caída o respuesta cortada a mitad: se puede reintentar
+            raise ErrorTransitorio(f"Sin respuesta completa del servicio: {str(e)}") from e
+
+        if estado in ESTADOS_TRANSITORIOS:
+            raise ErrorTransitorio(f"El servicio respondió {estado}")
+        if estado == 400 and 'response_format' in opciones and 'response_format' in texto:
+            # El modelo no tiene modo JSON: se pide sin él desde ahora; el prompt ya pide solo JSON
+            logger.warning("El modelo %s no acepta response_format; se consulta sin modo JSON.", OPENAI_MODELO)
+            self.modo_json = False
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                raise ErrorTransitorio("Se agotó el plazo de la consulta.")
+            return self.completar(mensajes, restante, **opciones)
+        if estado != 200:
+            raise ErrorLLM(f"El servicio respondió {estado}: {texto[:200]}")
+        try:
+            return json.loads(texto)["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise ErrorLLM(f"Respuesta inesperada del servicio: {texto[:200]}") from e
+
+
+def _leer_cuerpo(respuesta, limite):
+    """ Cuerpo de la respuesta como texto; ErrorTransitorio si no termina de llegar antes del límite. """
+    # read1 (urllib3 2) devuelve lo que ya llegó sin esperar a juntar TAMANO_LECTURA bytes
+    leer = getattr(respuesta.raw, 'read1', None) or respuesta.raw.read
+    partes = []
+    while True:
+        if time.monotonic() >= limite:
+            raise ErrorTransitorio("Se agotó el plazo mientras llegaba la respuesta del servicio.")
+        parte = leer(TAMANO_LECTURA, decode_content=True)
+        if not parte:
+            return b''.join(partes).decode(respuesta.encoding or 'utf-8', errors='replace')
+        partes.append(parte)
+
+
+class Circuito:
+    """
+    Cortacircuito: tras `umbral` fallos seguidos se abre y rechaza consultas
+    durante `pausa` segundos; luego deja pasar una de prueba y, si sale bien,
+    se cierra de nuevo.
+    """
+
+    def __init__(self, umbral=OPENAI_FALLOS_CIRCUITO, pausa=OPENAI_PAUSA_CIRCUITO):
+        self.umbral = umbral
+        self.pausa = pausa
+        self.fallos_seguidos = 0
+        self.abierto_hasta = 0.0
+        self._probando = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        with self._lock:
+            if self.fallos_seguidos < self.umbral:
+                return True
+            if time.monotonic() < self.abierto_hasta or self._probando:
+                return False
+            self._probando = True
+            return True
+
+    def exito(self):
+        with self._lock:
+            self.fallos_seguidos = 0
+            self._probando = False
+
+    def fallo(self):
+        with self._lock:
+            self.fallos_seguidos += 1
+            self._probando = False
+            if self.fallos_seguidos >= self.umbral:
+                self.abierto_hasta = time.monotonic() + self.pausa
+
+    def reintentar_en(self):
+        """ Segundos (al menos 1) hasta que el circuito deje pasar la consulta de prueba. """
+        with self._lock:
+            return max(1, math.ceil(self.abierto_hasta - time.monotonic()))
+
+    def estado(self):
+        with self._lock:
+            if self.fallos_seguidos < self.umbral:
+                return 'cerrado'
+            return 'abierto' if time.monotonic() < self.abierto_hasta else 'semiabierto'
+
+
+class ClienteLLM:
+    """
+    Consultas al modelo con plazo total, reintentos acotados con espera al
+    azar (jitter), cortacircuito y un máximo de consultas simultáneas. El
+    backend es cualquier objeto con completar(mensajes, timeout, **opciones).
+    """
+
+    def __init__(self, backend=None, plazo=OPENAI_PLAZO, reintentos=OPENAI_REINTENTOS, concurrencia=OPENAI_CONCURRENCIA):
+        self.backend = backend or BackendHTTP()
+        self.plazo = plazo
+        self.reintentos = reintentos
+        self.circuito = Circuito()
+        self._cupos = threading.BoundedSemaphore(concurrencia)
+        self._lock = threading.Lock()
+        self.consultas = 0
+        self.reintentadas = 0
+        self.fallidas = 0
+
+    def completar(self, mensajes, plazo=None, **opciones):
+        """ Texto de la respuesta del modelo; lanza ErrorLLM si no se obtuvo dentro del plazo. """
+        limite = time.monotonic() + (plazo or self.plazo)
+        with self._lock:
+            self.consultas += 1
+        try:
+            for intento in range(self.reintentos + 1):
+                try:
+                    return self._intentar(mensajes, limite, **opciones)
+                except (ErrorTransitorio, CircuitoAbierto) as e:
+                    # La espera entre intentos no ocupa cupo, así otras consultas siguen avanzando
+                    espera = random.uniform(0, ESPERA_BASE_REINTENTO * 2 ** intento)
+                    if isinstance(e, CircuitoAbierto) or intento == self.reintentos or time.monotonic() + espera >= limite:
+                        raise
+                    with self._lock:
+                        self.reintentadas += 1
+                    time.sleep(espera)
+        except ErrorLLM:
+            with self._lock:
+                self.fallidas += 1
+            raise
+
+    def _intentar(self, mensajes, limite, **opciones):
+        if not self.circuito.permitir():
+            raise CircuitoAbierto(
+                "El servicio del modelo está fallando; se reintentará en unos segundos.", self.circuito.reintentar_en()
+            )
+        # Desde aquí toda salida avisa al circuito, o la consulta de prueba lo dejaría semiabierto para siempre
+        exito = False
+        try:
+            if not self._cupos.acquire(timeout=max(0.0, limite - time.monotonic())):
+                raise ErrorTransitorio("No hubo cupo para consultar el modelo dentro del plazo.")
+            try:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise ErrorTransitorio("Se agotó el plazo de la consulta.")
+                contenido = self.backend.completar(mensajes, timeout=restante, **opciones)
+            finally:
+                self._cupos.release()
+            exito = True
+            return contenido
+        except ErrorTransitorio:
+            raise
+        except ErrorLLM:
+            # El servicio respondió (por ejemplo, un 400): no es una caída
+            exito = True
+            raise
+        except Exception as e:
+            raise ErrorTransitorio(f"Error inesperado al consultar el modelo: {str(e)}") from e
+        finally:
+            if exito:
+                self.circuito.exito()
+            else:
+                self.circuito.fallo()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "consultas": self.consultas,
+                "reintentos": self.reintentadas,
+                "fallidas": self.fallidas,
+                "circuito": self.circuito.estado(),
+            }
+
+
+_cliente = None
+_cliente_pid = None
+_lock = threading.Lock()
+
+
+def cliente_llm():
+    """ Cliente del proceso; se crea de nuevo después de un fork para no compartir conexiones. """
+    global _cliente, _cliente_pid
+    with _lock:
+        if _cliente is None or _cliente_pid != os.getpid():
+            _cliente, _cliente_pid = ClienteLLM(), os.getpid()
+        return _cliente
+
+
+def configurar_backend(backend):
+    """ Reemplaza el backend del cliente del proceso (por ejemplo, por uno que apunte al stub). """
+    global _cliente, _cliente_pid
+    with _lock:
+        _cliente, _cliente_pid = ClienteLLM(backend), os.getpid()
+    return _cliente
+
+
+def _percentil(valores, fraccion):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(fraccion * len(ordenados)))]
+
+
+if __name__ == '__main__':
+    from concurrent.futures import ThreadPoolExecutor
+
+    from modules.stub_llm import iniciar_stub
+
+    parser = argparse.ArgumentParser(description="Carga contra el stub local del modelo a través del cliente.")
+    parser.add_argument('--consultas', type=int, default=200)
+    parser.add_argument('--hilos', type=int, default=16)
+    parser.add_argument('--latencia-ms', type=float, default=50)
+    parser.add_argument('--fallos', type=float, default=0.1, help="fracción de respuestas 503 del stub")
+    args = parser.parse_args()
+
+    servidor = iniciar_stub(latencia_ms=args.latencia_ms, fallos=args.fallos)
+    cliente = ClienteLLM(BackendHTTP(f"http://127.0.0.1:{servidor.server_port}/v1", api_key='stub'))
+    mensajes = [{"role": "user", "content": "Medellín - Antioquia\nEnergía feb-24 40 888,470 $35.538,80"}]
+
+    def consultar(_):
+        inicio = time.perf_counter()
+        try:
+            cliente.completar(mensajes)
+            return time.perf_counter() - inicio, None
+        except ErrorLLM as e:
+            return time.perf_counter() - inicio, type(e).__name__
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(args.hilos) as pool:
+        resultados = list(pool.map(consultar, range(args.consultas)))
+    total = time.perf_counter() - inicio
+    servidor.shutdown()
+
+    latencias = [segundos * 1000 for segundos, _ in resultados]
+    errores = [error for _, error in resultados if error]
+    print(f"{args.consultas} consultas en {total:.2f} s ({args.consultas / total:.0f}/s), "
+          f"p50 {_percentil(latencias, 0.5):.0f} ms, p95 {_percentil(latencias, 0.95):.0f} ms")
+    print(f"Errores: {len(errores)} {sorted(set(errores))}; {cliente.estadisticas()}; "
+          f"conexiones abiertas en el stub: {servidor.conexiones}")
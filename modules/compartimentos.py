@@ -0,0 +1,153 @@
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import math
+import os
+import threading
+import time
+
+# Análisis de facturas (OCR + modelo) que corren a la vez en cada worker y cuántos más pueden esperar turno.
+# Con gunicorn gthread, --threads debe pasar de la suma para que queden hilos libres para las demás rutas.
+FACTURAS_CONCURRENCIA = int(os.getenv('FACTURAS_CONCURRENCIA', '2'))
+FACTURAS_COLA = int(os.getenv('FACTURAS_COLA', '4'))
+
+# Límites del Retry-After que se sugiere al rechazar (segundos)
+REINTENTO_MINIMO = 1
+REINTENTO_MAXIMO = 60
+
+# Duración supuesta de una tarea mientras no se haya medido ninguna (segundos)
+DURACION_INICIAL = 10.0
+
+
+class CompartimentoLleno(Exception):
+    """ El compartimento tiene todas sus tareas en curso y su cola llena. """
+
+    def __init__(self, nombre, reintentar_en):
+        super().__init__(f"El compartimento {nombre} está lleno; reintentar en {reintentar_en} s.")
+        self.reintentar_en = reintentar_en
+
+
+class Compartimento:
+    """
+    Mamparo (bulkhead): pool de hilos propio para un tipo de tarea pesada,
+    con un máximo de tareas en curso y de tareas esperando. Lo que no cabe se
+    rechaza de inmediato con CompartimentoLleno en lugar de ocupar hilos del
+    servidor, así las rutas livianas no quedan detrás de las pesadas.
+    """
+
+    def __init__(self, nombre, concurrencia, cola):
+        self.nombre = nombre
+        self.concurrencia = concurrencia
+        self.cola = cola
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pendientes = 0
+        self.atendidas = 0
+        self.rechazadas = 0
+        self.duracion_media = None
+
+    def _obtener_pool(self):
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.concurrencia, thread_name_prefix=self.nombre)
+            self._pid = os.getpid()
+            self.pendientes = 0
+        return self._pool
+
+    def reintentar_en(self):
+        """ Segundos estimados hasta que se libere un turno, según la duración media de las tareas. """
+        with self._lock:
+            return self._reintentar_en()
+
+    def _reintentar_en(self):
+        duracion = self.duracion_media or DURACION_INICIAL
+        turnos = max(1, self.pendientes - self.concurrencia + 1) / self.concurrencia
+        return min(REINTENTO_MAXIMO, max(REINTENTO_MINIMO, math.ceil(duracion * turnos)))
+
+    def _medir(self, funcion, args, kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self._lock:
+                # Media móvil exponencial: sigue los cambios de carga sin guardar historial
+                self.duracion_media = duracion if self.duracion_media is None else 0.8 * self.duracion_media + 0.2 * duracion
+
+    def _al_terminar(self, _futuro):
+        with self._lock:
+            self.pendientes -= 1
+            self.atendidas += 1
+
+    def enviar(self, funcion, *args, **kwargs):
+        """ Future de funcion(*args, **kwargs) en el pool del compartimento. Lanza CompartimentoLleno si no cabe. """
+        with self._lock:
+            pool = self._obtener_pool()
+            if self.pendientes >= self.concurrencia + self.cola:
+                self.rechazadas += 1
+                raise CompartimentoLleno(self.nombre, self._reintentar_en())
+            self.pendientes += 1
+
+        try:
+            futuro = pool.submit(self._medir, funcion, args, kwargs)
+        except Exception:
+            with self._lock:
+                self.pendientes -= 1
+            raise
+        futuro.add_done_callback(self._al_terminar)
+        return futuro
+
+    def ejecutar(self, funcion, *args, **kwargs):
+        """ Resultado de funcion(*args, **kwargs), esperando turno en el compartimento. """
+        return self.enviar(funcion, *args, **kwargs).result()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "en_curso": min(self.pendientes, self.concurrencia),
+                "en_espera": max(0, self.pendientes - self.concurrencia),
+                "concurrencia": self.concurrencia,
+                "cola": self.cola,
+                "atendidas": self.atendidas,
+                "rechazadas": self.rechazadas,
+                "duracion_media_segundos": None if self.duracion_media is None else round(self.duracion_media, 3),
+            }
+
+
+# Compartimento del análisis de facturas (OCR y consulta al modelo)
+compartimento_facturas = Compartimento('facturas', FACTURAS_CONCURRENCIA, FACTURAS_COLA)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Simula una ráfaga de tareas pesadas contra un compartimento y mide la latencia de una tarea liviana."
+    )
+    parser.add_argument('--pesadas', type=int, default=20, help="tareas pesadas que llegan a la vez")
+    parser.add_argument('--duracion', type=float, default=0.5, help="segundos de cada tarea pesada")
+    parser.add_argument('--hilos', type=int, default=12, help="hilos del servidor simulado (gunicorn --threads)")
+    args = parser.parse_args()
+
+    compartimento = Compartimento('prueba', FACTURAS_CONCURRENCIA, FACTURAS_COLA)
+    resultados = []
+
+    def pesada(_):
+        try:
+            compartimento.ejecutar(time.sleep, args.duracion)
+            return 'atendida'
+        except CompartimentoLleno as e:
+            return f"rechazada ({e.reintentar_en} s)"
+
+    def liviana():
+        inicio = time.perf_counter()
+        time.sleep(0.001)
+        return (time.perf_counter() - inicio) * 1000
+
+    with ThreadPoolExecutor(args.hilos) as servidor:
+        futuros = [servidor.submit(pesada, i) for i in range(args.pesadas)]
+        time.sleep(0.05)
+        latencia = servidor.submit(liviana).result()
+        resultados = [futuro.result() for futuro in futuros]
+
+    print(f"Pesadas: {resultados.count('atendida')} atendidas, {len(resultados) - resultados.count('atendida')} rechazadas "
+          f"(concurrencia {compartimento.concurrencia}, cola {compartimento.cola})")
+    print(f"Tarea liviana durante la ráfaga: {latencia:.1f} ms")
+    print(compartimento.estadisticas())
@@ -0,0 +1,335 @@
+from string import Formatter
+import os
+
+from fpdf import FPDF  # type: ignore
+
+from modules.calculos_solar import MANTENIMIENTO_ANUAL
+from modules.fragmentos_pdf import (
+    USAR_FRAGMENTOS, documento_a_bytes, insertar_fragmento, leer_condiciones, obtener_fragmento
+)
+from modules.recursos_pdf import IMAGENES_FOLDER, colocar_imagen
+
+IMAGEN_CENTRAL = "energia.jpg"
+IMAGEN_MARCAS = "MARCAS_ALIADAS.png"
+LOGO_FACTURACION = "logos.jpeg"
+
+TEXTO_LEGAL = "Cualquier inquietud adicional que tengan con gusto será atendida. Con la solicitud de esta cotización, autorizas el uso de tus datos personales. Para más información, ingresa a www.ferragro.com"
+
+BENEFICIOS_SOLARTECH = """
+    1. Ahorro Inmediato en tu Factura de Energía:
+        - Tu sistema solar podría reducir hasta un 80% en la factura de electricidad desde el primer mes.
+        - El ahorro anual estimado es {ahorro_anual}.
+
+    2. Energía Gratis y Protección Contra Aumentos de Tarifas:
+        - Los paneles solares generan electricidad gratuita por más de 25 años.
+        - Evitarás aumentos en las tarifas eléctricas congelando tu costo actual.
+
+    3. Inversión Inteligente con Retorno Garantizado:
+        - Recuperarás tu inversión en {recuperacion} gracias al ahorro en electricidad.
+        - Vida útil del sistema: 25-30 años, asegurando más de 20 años de energía gratuita.
+
+    4. Impacto Ambiental Positivo:
+        - Reducirás tu huella de carbono en aproximadamente {reduccion_co2:.2f} toneladas de CO2 al año.
+        - Esto equivale a evitar el uso de un auto de combustión por {km_equivalentes:,.0f} km al año.
+        - Contribuirás a un planeta más limpio y sostenible, sin sacrificar tu comodidad.
+
+    5. Accede a Incentivos y Beneficios Tributarios:
+        - Ley 1715 en Colombia ofrece deducción de impuestos hasta el 50% de la inversión.
+        - Exención de IVA y aranceles en equipos solares.
+        - Financiamiento con tasas preferenciales y créditos verdes.
+
+    Invierte en Energía Solar y Empieza a Ahorrar desde Hoy:
+        - Te ofrecemos un sistema solar completo con instalación profesional y garantía.
+        - Contáctanos ahora y solicita tu cotización personalizada.
+    """
+
+BENEFICIOS_FERRAGRO = """1. Ahorro Inmediato en tu Factura de Energía:
+        - Tu sistema solar reduciría hasta un 80% en la factura de electricidad desde el primer mes.
+        - Hoy pagas aproximadamente 500,000 COP al mes, podrías ahorrar hasta $400,000 COP/mes.
+        - En 25 años, el ahorro acumulado supera los $120 millones COP.
+
+    2. Energía Gratis y Protección Contra Aumentos de Tarifas:
+        - Los paneles solares generan electricidad gratuita por más de 25 años.
+        - Las tarifas de energía suben cada año. Con tu sistema solar, congelas tu costo de electricidad.
+        - Además, puedes almacenar energía en baterías y evitar cortes eléctricos.
+
+    3. Inversión Inteligente con Retorno Garantizado:
+        - Recuperas tu inversión en 3 a 6 años gracias al ahorro en electricidad.
+        - Vida útil del sistema: 25-30 años, lo que equivale a más de 20 años de energía gratuita.
+        - Valorización de tu propiedad: Las casas con paneles solares aumentan su valor hasta un 10%.
+
+    4. Impacto Ambiental Positivo:
+        - Reducirás tu huella de carbono en hasta 7.5 toneladas de CO2 al año.
+        - Esto equivale a evitar el uso de un auto de combustión por 30,000 km al año.
+        - Contribuirás a un planeta más limpio y sostenible, sin sacrificar tu comodidad.
+
+    5. Accede a Incentivos y Beneficios Tributarios:
+        - La Ley 1715 en Colombia otorga beneficios como:
+        - Deducción de impuestos hasta el 50% de la inversión.
+        - Exención de IVA y aranceles en equipos solares.
+        - Financiamiento con tasas preferenciales y créditos verdes.
+
+    Invierte en Energía Solar y Empieza a Ahorrar desde Hoy:
+        - Te ofrecemos un sistema solar completo con instalación profesional y garantía.
+        - Contáctanos ahora y solicita tu cotización personalizada."""
+
+# Configuración de cada marca. Agregar una marca nueva es agregar una entrada aquí.
+TEMAS = {
+    "solartech": {
+        "color": (255, 0, 0),  # Rojo
+        "logo": "SOLARTECH.jpeg",
+        "logo_ancho": 100,
+        "logo_y": 10,
+        "espacio_logo": 30,
+        "espacio_fecha": 10,
+        "beneficios": BENEFICIOS_SOLARTECH,
+    },
+    "ferragro": {
+        "color": (34, 139, 34),  # Verde
+        "logo": "logos.jpeg",
+        "logo_ancho": 120,
+        "logo_y": 5,
+        "espacio_logo": 50,
+        "espacio_fecha": 5,
+        "beneficios": BENEFICIOS_FERRAGRO,
+    },
+}
+
+
+class TemaCotizacion:
+    """
+    Tema de una marca con su geometría ya calculada para la página A4 de FPDF.
+    Se compila una sola vez al importar el módulo.
+    """
+
+    def __init__(self, nombre, config):
+        ancho_pagina = FPDF().w
+
+        self.nombre = nombre
+        self.color = config["color"]
+        self.logo = config["logo"]
+        self.logo_ancho = config["logo_ancho"]
+        self.logo_x = (ancho_pagina - config["logo_ancho"]) / 2
+        self.logo_y = config["logo_y"]
+        self.espacio_logo = config["espacio_logo"]
+        self.espacio_fecha = config["espacio_fecha"]
+
+        self.imagen_central_x = (ancho_pagina - 200) / 2
+        self.marcas_x = (ancho_pagina - 150) / 2
+        self.logo_facturacion_x = (ancho_pagina - 100) / 2
+        self.col_width = (ancho_pagina - 20) / 2
+
+        # Los beneficios sin datos del cliente se renderizan junto con las secciones fijas
+        self.beneficios = config["beneficios"]
+        self.beneficios_fijos = not any(campo for _, campo, _, _ in Formatter().parse(self.beneficios))
+
+        self.dependencias_fragmento = [
+            os.path.join(IMAGENES_FOLDER, IMAGEN_MARCAS),
+            os.path.join(IMAGENES_FOLDER, LOGO_FACTURACION),
+        ]
+
+
+TEMAS_COMPILADOS = {nombre: TemaCotizacion(nombre, config) for nombre, config in TEMAS.items()}
+
+
+def format_value(value, unit=""):
+    """ Formatea valores numéricos eliminando los decimales si son enteros. """
+    if isinstance(value, (int, float)):
+        if value == int(value):
+            return f"{int(value)} {unit}".strip()  # Convierte a entero sin decimales
+        else:
+            return f"{value:,.2f} {unit}".replace(",", ".")  # Formato con decimales si es necesario
+    return str(value)  # Si no es número, devolverlo como texto
+
+def agregar_titulo(pdf, title, tema):
+    """ Agrega un título con el color de la marca de fondo y letra blanca en toda la fila. """
+    pdf.set_fill_color(*tema.color)
+    pdf.set_text_color(255, 255, 255)  # Blanco
+    pdf.set_font('Arial', 'B', 14)
+    pdf.cell(0, 10, title, ln=True, align='C', fill=True)
+    pdf.ln(5)
+    pdf.set_text_color(0, 0, 0)  # Restablece el color de texto a negro
+
+def agregar_forma_pago_y_mantenimiento(pdf, tema):
+    """ Agrega la sección de Forma de Pago y Mantenimiento Anual en el PDF. """
+    agregar_titulo(pdf, "Forma de Pago", tema)
+    pdf.set_font('Arial', '', 12)
+
+    table_width = 130
+    col_width_1 = table_width * 0.7
+    col_width_2 = table_width * 0.3
+    x_start = (pdf.w - table_width) / 2
+    pdf.set_x(x_start)
+
+    pdf.cell(col_width_1, 10, "Concepto", border=1, align='C')
+    pdf.cell(col_width_2, 10, "Porcentaje", border=1, align='C')
+    pdf.ln()
+
+    forma_pago = [
+        ("Anticipo", "50%"),
+        ("Entrega de materiales", "40%"),
+        ("Retie", "10%")
+    ]
+
+    for concepto, porcentaje in forma_pago:
+        pdf.set_x(x_start)
+        pdf.cell(col_width_1, 10, concepto, border=1, align='C')
+        pdf.cell(col_width_2, 10, porcentaje, border=1, align='C')
+        pdf.ln()
+
+    pdf.ln(10)
+
+    agregar_titulo(pdf, "Mantenimiento Anual", tema)
+    pdf.set_font('Arial', '', 12)
+    pdf.cell(0, 10, f"Monto: ${MANTENIMIENTO_ANUAL:,}".replace(",", "."), ln=True, align='C', border=1)
+    pdf.ln(5)
+    pdf.cell(0, 10, "Condición: Indexado IPC", ln=True, align='C', border=1)
+    pdf.ln(10)
+
+def agregar_beneficios(pdf, tema, resultados_proyecto=None):
+    """ Agrega la página de beneficios de la marca, con los datos del cliente si el texto los usa. """
+    agregar_titulo(pdf, "Beneficios del Proyecto", tema)
+    pdf.set_font('Arial', '', 11)
+
+    if tema.beneficios_fijos:
+        texto_beneficios = tema.beneficios
+    else:
+        resultados_generales = resultados_proyecto['Resultados Generales']
+        impacto_ambiental = resultados_generales.get('Impacto Ambiental', {})
+        texto_beneficios = tema.beneficios.format(
+            ahorro_anual=resultados_generales['Ahorro Anual'],
+            reduccion_co2=impacto_ambiental.get('Reducción de CO2 (toneladas)', 0),
+            km_equivalentes=impacto_ambiental.get('Equivalente en km no recorridos', 0),
+            recuperacion=resultados_proyecto.get('Proyección Financiera', {}).get('Recuperación de la inversión', '3 a 6 años'),
+        )
+
+    pdf.multi_cell(0, 8, texto_beneficios, border=1, align='J')
+    pdf.ln(10)
+
+def agregar_paginas_fijas(pdf, tema):
+    """ Agrega las secciones que son iguales en todas las cotizaciones de la marca. """
+    agregar_forma_pago_y_mantenimiento(pdf, tema)
+    agregar_titulo(pdf, "Marcas aliadas", tema)
+    colocar_imagen(pdf, IMAGEN_MARCAS, x=tema.marcas_x, w=150)
+    pdf.ln(10)
+    pdf.add_page()
+
+    agregar_titulo(pdf, "Condiciones del Proyecto", tema)
+    condiciones = leer_condiciones()
+    if condiciones is not None:
+        pdf.set_font('Arial', size=8)
+        pdf.multi_cell(0, 6, condiciones, border=1, align='J')
+
+    pdf.set_font('Arial', 'I', 12)
+    pdf.set_text_color(*tema.color)
+    pdf.multi_cell(0, 10, TEXTO_LEGAL, align='L')
+
+    pdf.ln(5)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(0, 10, "FACTURADO POR:", ln=True, align='C')
+    pdf.set_font('Arial', '', 12)
+    pdf.cell(0, 8, "FERRAGRO S.A.S.", ln=True, align='C')
+    pdf.cell(0, 8, "NIT: 800.060.880-3", ln=True, align='C')
+    pdf.cell(0, 8, "Somos Autorretenedores", ln=True, align='C')
+
+    pdf.ln(10)
+    colocar_imagen(pdf, LOGO_FACTURACION, x=tema.logo_facturacion_x, y=pdf.get_y(), w=100)
+    pdf.ln(25)
+
+    if tema.beneficios_fijos:
+        pdf.add_page()
+        agregar_beneficios(pdf, tema)
+
+def generar_cotizacion_pdf(marca, cotizacion, fecha, cliente, proyecto, celular, correo_asesor, correo, ubicacion, potencia, costo, area, resultados_proyecto, usar_fragmento=USAR_FRAGMENTOS):
+    """
+    Genera la cotización en PDF con el tema de la marca indicada a partir de
+    los datos del cliente y el resultado de calcular_proyecto. El documento se
+    genera en memoria y se devuelve como bytes.
+    """
+    tema = TEMAS_COMPILADOS[marca]
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_font('Arial', size=12)
+
+    colocar_imagen(pdf, tema.logo, x=tema.logo_x, y=tema.logo_y, w=tema.logo_ancho)
+    pdf.ln(tema.espacio_logo)
+
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, txt=f"Cotización #{cotizacion}", ln=True, align='C')
+    pdf.cell(0, 10, txt="Cotización de Proyecto de Energía Solar", ln=True, align='C')
+    pdf.set_font('Arial', 'I', 12)
+    pdf.cell(0, 10, txt=f"Fecha: {fecha}", ln=True, align='C')
+    pdf.ln(tema.espacio_fecha)
+
+    colocar_imagen(pdf, IMAGEN_CENTRAL, x=tema.imagen_central_x, w=200, h=80)
+    pdf.ln(10)
+
+    agregar_titulo(pdf, "Datos proporcionados por el Cliente", tema)
+    col_width = tema.col_width
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(col_width, 8, txt="Campo", border=1, align='C')
+    pdf.cell(col_width, 8, txt="Valor", border=1, align='C')
+    pdf.ln()
+
+    pdf.set_font('Arial', size=12)
+    cliente_info = [
+        ("Cliente", cliente),
+        ("Correo", correo),
+        ("Proyecto", proyecto),
+        ("Celular", celular),
+        ("Correo Asesor", correo_asesor),
+        ("Ubicación", ubicacion),
+        ("Potencia", f"{potencia} kWp"),
+        ("Costo del kWp", f"${costo}"),
+        ("Área Disponible", f"{area} m²")
+    ]
+
+    for campo, valor in cliente_info:
+        pdf.cell(col_width, 8, txt=campo, border=1)
+        pdf.cell(col_width, 8, txt=str(valor), border=1, align='C')
+        pdf.ln()
+
+    pdf.ln(10)
+
+    for section, data in resultados_proyecto.items():
+        agregar_titulo(pdf, section, tema)
+        pdf.set_font('Arial', 'B', 12)
+        pdf.cell(col_width, 8, txt="Concepto", border=1, align='C')
+        pdf.cell(col_width, 8, txt="Valor", border=1, align='C')
+        pdf.ln()
+        pdf.set_font('Arial', size=12)
+
+        for key, value in data.items():
+            if isinstance(value, dict):
+                pdf.set_font('Arial', 'B', 12)
+                pdf.cell(0, 8, txt=key, ln=True, align='L', border=1)
+                pdf.ln(2)
+                pdf.set_font('Arial', size=12)
+                for subkey, subvalue in value.items():
+                    pdf.cell(col_width, 8, txt=subkey, border=1)
+                    pdf.cell(col_width, 8, txt=format_value(subvalue), border=1, align='C')
+                    pdf.ln()
+                pdf.ln(5)
+            else:
+                pdf.cell(col_width, 8, txt=key, border=1)
+                pdf.cell(col_width, 8, txt=format_value(value), border=1, align='C')
+                pdf.ln()
+        pdf.ln(10)
+
+    if usar_fragmento:
+        # Las secciones fijas se insertan desde el fragmento cacheado de la marca
+        fragmento = obtener_fragmento(
+            tema.nombre, lambda plantilla: agregar_paginas_fijas(plantilla, tema), tema.dependencias_fragmento
+        )
+        insertar_fragmento(pdf, fragmento)
+    else:
+        agregar_paginas_fijas(pdf, tema)
+
+    if not tema.beneficios_fijos:
+        pdf.add_page()
+        agregar_beneficios(pdf, tema, resultados_proyecto)
+
+    return documento_a_bytes(pdf)
@@ -0,0 +1,20 @@
+# Errores de la consulta al modelo, aparte de cliente_llm para que app.py los atienda sin importar requests
+
+
+class ErrorLLM(Exception):
+    """
+    La consulta al modelo falló y no se reintenta más. reintentar_en son los
+    segundos sugeridos antes de volver a intentar, si se saben.
+    """
+
+    def __init__(self, mensaje, reintentar_en=None):
+        super().__init__(mensaje)
+        self.reintentar_en = reintentar_en
+
+
+class ErrorTransitorio(ErrorLLM):
+    """ Falla que puede pasar sola (tiempo agotado, 429, 5xx); se reintenta. """
+
+
+class CircuitoAbierto(ErrorLLM):
+    """ El servicio falló muchas veces seguidas; no se consulta hasta que pase la pausa. """
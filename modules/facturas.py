@@ -0,0 +1,106 @@
+import logging
+
+from modules.calculadora_ia import extraer_textos_facturas, analizar_factura_con_openai
+from modules.municipios import resolver_zona
+from modules.parser_facturas import analizar_texto_factura, es_confiable
+from modules.preprocesamiento import regiones_plantilla
+from modules.simulacion_horaria import calcular_proyecto_horario
+
+# Solo tamaños y campos encontrados: el texto de la factura trae el nombre, la cédula y la dirección del cliente
+logger = logging.getLogger(__name__)
+
+# Etapa que se avisa al terminar el OCR de cada cara, en el orden en que se pasan
+ETAPAS_OCR = ('ocr_frontal', 'ocr_atras')
+
+
+def _avisar(progreso, etapa, **datos):
+    if progreso is not None:
+        progreso(etapa, datos)
+
+
+def analizar_factura(factura_frontal, factura_atras, empresa=None, departamento=None, progreso=None):
+    """
+    Extrae el texto de ambas caras de la factura, obtiene la zona, el consumo
+    y el costo del kWh y calcula el proyecto. Devuelve los datos que muestra
+    resultado_factura.html y los tiempos del OCR de cada archivo. Si la
+    empresa tiene plantilla, solo se leen sus regiones de cada cara. Los
+    datos se leen primero con el parser local y solo se consulta a OpenAI si
+    la confianza no alcanza. Cada factura es una ruta o un ArchivoFactura.
+    El departamento, si el usuario lo indica, se usa en lugar del que lean
+    el parser o el modelo para ubicar municipios con el mismo nombre en varios.
+    Si se da progreso, se llama con (etapa, datos) al terminar el OCR de cada
+    cara ('ocr_frontal', 'ocr_atras'), la extracción y el cálculo.
+    Lanza ValueError si la factura no tiene los datos necesarios,
+    UbicacionAmbigua (un ValueError) si hay que indicar el departamento, o
+    ErrorLLM si hacía falta el modelo y su servicio no responde.
+    """
+    # Extraer texto de ambas caras a la vez
+    (texto_frontal, texto_atras), tiempos_ocr = extraer_textos_facturas(
+        [factura_frontal, factura_atras], regiones_plantilla(empresa),
+        al_terminar=lambda indice, tiempo: _avisar(progreso, ETAPAS_OCR[indice], **tiempo)
+    )
+
+    texto_completo = texto_frontal + "\n" + texto_atras
+
+    logger.debug("Texto extraído de la factura: %d caracteres", len(texto_completo))
+
+    # Intentar primero con el parser local; OpenAI solo si no es confiable
+    analisis_local = analizar_texto_factura(texto_completo, empresa, departamento)
+    if es_confiable(analisis_local):
+        ubicacion = analisis_local["ciudad"] or analisis_local["departamento"]
+        consumo_promedio_kwh = analisis_local["consumo_kwh"]
+        costo_kwh = analisis_local["costo_kwh"]
+        _avisar(progreso, 'extraccion', fuente='parser', confianza=analisis_local["confianza"])
+        datos_proyecto = calcular_proyecto_horario(analisis_local["zona"], consumo_promedio_kwh, costo_kwh)
+        _avisar(progreso, 'calculo')
+
+        return {
+            "Zona del Proyecto": f"{ubicacion} - {analisis_local['zona']}",
+            "Consumo promedio mensual de energía": f"{consumo_promedio_kwh} kWh/mes",
+            "Costo del kWh": f"${costo_kwh} COP",
+            "Resultados Generales": datos_proyecto["Resultados Generales"],
+            "Simulación Horaria": datos_proyecto["Simulación Horaria"],
+            "Proyección Financiera": datos_proyecto["Proyección Financiera"],
+            "Tiempos OCR": tiempos_ocr,
+            "Fuente de datos": "parser",
+            "Confianza": analisis_local["confianza"]
+        }
+
+    # Procesar el texto con OpenAI
+    datos_extraidos = analizar_factura_con_openai(texto_completo)
+
+    logger.debug("Campos devueltos por OpenAI: %s", sorted(campo for campo, valor in datos_extraidos.items() if valor))
+
+    consumo_promedio_kwh = datos_extraidos["consumo_kwh"]
+    costo_kwh = datos_extraidos["costo_kwh"]
+
+    # Verificar si los datos se extrajeron correctamente
+    if not consumo_promedio_kwh or not costo_kwh:
+        raise ValueError("No se pudieron extraer todos los datos necesarios de la factura.")
+
+    # Ubicar el municipio o departamento de la respuesta en una de las zonas
+    departamento = departamento or datos_extraidos["departamento"]
+    lugar = " - ".join(filter(None, (datos_extraidos["ciudad"], departamento)))
+    ubicacion = resolver_zona(lugar) or resolver_zona(datos_extraidos["zona"])
+    if ubicacion is None:
+        raise ValueError(f"No se reconoce la zona del proyecto: {lugar or datos_extraidos['zona']}")
+
+    nombre_lugar = ubicacion["municipio"] or ubicacion["departamento"] or lugar
+    zona_proyecto = f"{nombre_lugar} - {ubicacion['zona']}" if nombre_lugar else ubicacion["zona"]
+    _avisar(progreso, 'extraccion', fuente='openai', confianza=analisis_local["confianza"])
+
+    # Calcular el proyecto
+    datos_proyecto = calcular_proyecto_horario(ubicacion["zona"], consumo_promedio_kwh, costo_kwh)
+    _avisar(progreso, 'calculo')
+
+    return {
+        "Zona del Proyecto": zona_proyecto,
+        "Consumo promedio mensual de energía": f"{consumo_promedio_kwh} kWh/mes",
+        "Costo del kWh": f"${costo_kwh} COP",
+        "Resultados Generales": datos_proyecto["Resultados Generales"],
+        "Simulación Horaria": datos_proyecto["Simulación Horaria"],
+        "Proyección Financiera": datos_proyecto["Proyección Financiera"],
+        "Tiempos OCR": tiempos_ocr,
+        "Fuente de datos": "openai",
+        "Confianza": analisis_local["confianza"]
+    }
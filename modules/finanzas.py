@@ -0,0 +1,192 @@
+import os
+
+import numpy as np
+
+from modules.calculos_solar import MANTENIMIENTO_ANUAL
+
+# Supuestos de la proyección financiera; cada uno se puede cambiar por variable de entorno
+ANIOS_PROYECCION = int(os.getenv('ANIOS_PROYECCION', '25'))
+ESCALAMIENTO_TARIFA = float(os.getenv('ESCALAMIENTO_TARIFA', '0.06'))  # Alza anual del kWh
+DEGRADACION_PANELES = float(os.getenv('DEGRADACION_PANELES', '0.005'))  # Pérdida anual de producción
+IPC = float(os.getenv('IPC', '0.05'))  # Indexación anual del mantenimiento
+TASA_DESCUENTO = float(os.getenv('TASA_DESCUENTO', '0.10'))
+TASA_RENTA = float(os.getenv('TASA_RENTA', '0.35'))  # Tarifa del impuesto de renta del cliente
+
+# Ley 1715: se deduce de la renta el 50% de la inversión, repartido hasta en 15 años
+DEDUCCION_LEY_1715 = 0.5
+ANIOS_DEDUCCION = int(os.getenv('ANIOS_DEDUCCION', '1'))
+
+
+def proyectar_flujos(inversion, ahorro_primer_anio, escalamiento=ESCALAMIENTO_TARIFA,
+                     degradacion=DEGRADACION_PANELES, ipc=IPC, tasa_renta=TASA_RENTA,
+                     mantenimiento=MANTENIMIENTO_ANUAL, anios=ANIOS_PROYECCION,
+                     anios_deduccion=ANIOS_DEDUCCION):
+    """
+    Flujo de caja anual de cada proyecto: matriz (proyectos x anios+1) donde la
+    columna 0 es la inversión (negativa) y las demás el ahorro del año menos el
+    mantenimiento, más el beneficio tributario de la Ley 1715. Todos los
+    argumentos aceptan escalares o arreglos de un valor por proyecto.
+    """
+    inversion = np.atleast_1d(np.asarray(inversion, dtype=np.float64))
+    ahorro_primer_anio = np.asarray(ahorro_primer_anio, dtype=np.float64)
+    n = np.broadcast_shapes(inversion.shape, ahorro_primer_anio.shape, np.shape(escalamiento),
+                            np.shape(degradacion), np.shape(ipc), np.shape(tasa_renta))
+
+    def columna(valor):
+        return np.broadcast_to(np.asarray(valor, dtype=np.float64), n)[:, None]
+
+    anio = np.arange(anios, dtype=np.float64)[None, :]
+    ahorro = columna(ahorro_primer_anio) * ((1 + columna(escalamiento)) * (1 - columna(degradacion))) ** anio
+    costo_mantenimiento = mantenimiento * (1 + columna(ipc)) ** anio
+
+    beneficio_tributario = np.zeros((n[0], anios))
+    anios_deduccion = max(1, min(anios_deduccion, anios))
+    beneficio_tributario[:, :anios_deduccion] = (
+        columna(inversion) * DEDUCCION_LEY_1715 * columna(tasa_renta) / anios_deduccion)
+
+    flujos = np.empty((n[0], anios + 1))
+    flujos[:, 0] = -np.broadcast_to(inversion, n)
+    flujos[:, 1:] = ahorro - costo_mantenimiento + beneficio_tributario
+    return flujos
+
+
+def _polinomio(columnas, factor):
+    """
+    Evalúa sum(flujo_t * factor**t) y su derivada respecto a factor por Horner.
+    'columnas' son los flujos traspuestos (años x proyectos) para recorrerlos por año.
+    """
+    valor = columnas[-1].copy()
+    derivada = np.zeros_like(valor)
+    for t in range(columnas.shape[0] - 2, -1, -1):
+        derivada = derivada * factor + valor
+        valor = valor * factor + columnas[t]
+    return valor, derivada
+
+
+def vpn(flujos, tasa=TASA_DESCUENTO):
+    """ Valor presente neto de cada fila de flujos a la tasa dada (escalar o una por fila). """
+    factor = np.broadcast_to(1 / (1 + np.asarray(tasa, dtype=np.float64)), flujos.shape[:1])
+    return _polinomio(np.ascontiguousarray(flujos.T), factor)[0]
+
+
+def tir(flujos, iteraciones=50, tolerancia=1e-9):
+    """
+    Tasa interna de retorno de cada fila, todas las filas a la vez: pasos de
+    Newton dentro de un intervalo que se va cerrando como en bisección, para
+    que siempre converja. Solo se siguen iterando las filas que no han
+    convergido. Devuelve NaN cuando el VPN no cambia de signo entre -99% y 1000%.
+    """
+    columnas = np.ascontiguousarray(flujos.T)
+    resultado = np.full(flujos.shape[0], np.nan)
+
+    signo_bajo = np.sign(_polinomio(columnas, np.full(flujos.shape[0], 1 / 0.01))[0])
+    con_solucion = signo_bajo != np.sign(_polinomio(columnas, np.full(flujos.shape[0], 1 / 11.0))[0])
+    activas = np.flatnonzero(con_solucion)
+    columnas = columnas[:, activas]
+    signo_bajo = signo_bajo[activas]
+    bajo = np.full(activas.size, -0.99)
+    alto = np.full(activas.size, 10.0)
+
+    # Punto de partida: la rentabilidad de una perpetuidad con el flujo del primer año
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tasa = np.clip(np.nan_to_num(columnas[1] / -columnas[0], nan=TASA_DESCUENTO), -0.5, 9.0)
+
+    for _ in range(iteraciones):
+        if activas.size == 0:
+            break
+        factor = 1 / (1 + tasa)
+        valor, derivada = _polinomio(columnas, factor)
+        mismo_signo = np.sign(valor) == signo_bajo
+        bajo = np.where(mismo_signo, tasa, bajo)
+        alto = np.where(mismo_signo, alto, tasa)
+
+        # d(VPN)/d(tasa) = d(VPN)/d(factor) * -factor²
+        pendiente = -derivada * factor ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            siguiente = tasa - valor / pendiente
+        fuera = ~np.isfinite(siguiente) | (siguiente <= bajo) | (siguiente >= alto)
+        siguiente = np.where(fuera, (bajo + alto) / 2, siguiente)
+
+        convergio = np.abs(siguiente - tasa) < tolerancia
+        resultado[activas] = siguiente
+        pendientes = ~convergio
+        activas, columnas, signo_bajo = activas[pendientes], columnas[:, pendientes], signo_bajo[pendientes]
+        bajo, alto, tasa = bajo[pendientes], alto[pendientes], siguiente[pendientes]
+
+    return resultado
+
+
+def periodo_recuperacion(flujos):
+    """
+    Años hasta que el flujo acumulado deja de ser negativo, interpolando dentro
+    del año en que se recupera la inversión. NaN si no se recupera en el horizonte.
+    """
+    acumulado = np.cumsum(flujos, axis=1)
+    recuperado = acumulado >= 0
+    alguno = recuperado.any(axis=1)
+    anio = np.where(alguno, recuperado.argmax(axis=1), 0)
+
+    filas = np.arange(flujos.shape[0])
+    anterior = acumulado[filas, np.maximum(anio - 1, 0)]
+    flujo_anio = flujos[filas, anio]
+    fraccion = np.divide(-anterior, flujo_anio, out=np.zeros_like(anterior), where=flujo_anio != 0)
+
+    resultado = np.where(anio > 0, anio - 1 + fraccion, 0.0)
+    resultado[~alguno] = np.nan
+    return resultado
+
+
+def evaluar_proyectos(inversion, ahorro_primer_anio, tasa_descuento=TASA_DESCUENTO, **supuestos):
+    """
+    Proyección financiera de muchos proyectos (o escenarios) en una sola pasada.
+    Devuelve columnas NumPy con VPN, TIR, período de recuperación (años) y el
+    ahorro neto acumulado en el horizonte.
+    """
+    flujos = proyectar_flujos(inversion, ahorro_primer_anio, **supuestos)
+    return {
+        "vpn": vpn(flujos, tasa_descuento),
+        "tir": tir(flujos),
+        "recuperacion_anios": periodo_recuperacion(flujos),
+        "ahorro_acumulado": flujos[:, 1:].sum(axis=1),
+    }
+
+
+def evaluar_lote(ubicaciones, potencias, costos, **supuestos):
+    """ Dimensiona con calcular_proyecto_lote y evalúa financieramente cada cotización. """
+    from modules.calculos_vectorizados import calcular_proyecto_lote
+
+    columnas = calcular_proyecto_lote(ubicaciones, potencias, costos)
+    return evaluar_proyectos(columnas["Costo Proyecto"], columnas["Ahorro Anual"], **supuestos)
+
+
+def proyeccion_financiera(inversion, ahorro_primer_anio, **supuestos):
+    """ Proyección de un solo proyecto con valores de Python, lista para JSON o plantillas. """
+    resultado = evaluar_proyectos(inversion, ahorro_primer_anio, **supuestos)
+    valores = {clave: columna[0].item() for clave, columna in resultado.items()}
+    return {
+        "VPN": int(valores["vpn"]),
+        "TIR": None if np.isnan(valores["tir"]) else round(valores["tir"], 4),
+        "Recuperación (años)": None if np.isnan(valores["recuperacion_anios"]) else round(valores["recuperacion_anios"], 1),
+        "Ahorro acumulado": int(valores["ahorro_acumulado"]),
+    }
+
+
+if __name__ == '__main__':
+    import time
+
+    from modules.calculos_vectorizados import ZONAS
+
+    n = 100000
+    generador = np.random.default_rng(0)
+    ubicaciones = generador.choice(ZONAS, n)
+    potencias = generador.uniform(100, 3000, n)
+    costos = generador.uniform(600, 1100, n)
+
+    inicio = time.perf_counter()
+    resultado = evaluar_lote(ubicaciones, potencias, costos)
+    segundos = time.perf_counter() - inicio
+    print(f"{n} proyectos en {segundos * 1000:.1f} ms")
+    from modules.calculos_vectorizados import calcular_proyecto_lote
+
+    columnas = calcular_proyecto_lote(["Región Andina"], [400], [800])
+    print(proyeccion_financiera(columnas["Costo Proyecto"][0], columnas["Ahorro Anual"][0]))
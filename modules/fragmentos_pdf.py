@@ -0,0 +1,150 @@
+import os
+import re
+import threading
+
+from fpdf import FPDF  # type: ignore
+
+# Activa el modo en que las secciones fijas se insertan desde un fragmento cacheado
+USAR_FRAGMENTOS = os.getenv('PDF_FRAGMENTOS_CACHEADOS', '0') == '1'
+
+CONDICIONES_PATH = "modules/condiciones.txt"
+
+# Referencias a fuentes e imágenes dentro del contenido de una página de FPDF
+_REFERENCIA = re.compile(r'/(F)(\d+)(?= [\d.]+ Tf)|/(I)(\d+)(?= Do)')
+
+_condiciones = {}
+_fragmentos = {}
+_lock = threading.Lock()
+
+
+class _Plantilla(FPDF):
+    """ FPDF que anota la altura (y) a la que llegó cada página antes de pasar a la siguiente. """
+
+    def __init__(self):
+        FPDF.__init__(self)
+        self.finales = []
+
+    def add_page(self, orientation=''):
+        if self.page:
+            self.finales.append(self.y)
+        FPDF.add_page(self, orientation)
+
+
+class Fragmento:
+    """
+    Páginas ya renderizadas de las secciones fijas de una marca. El contenido
+    de cada página se guarda partido en texto literal y referencias a fuentes
+    e imágenes, para poder renumerarlas en el documento donde se inserta.
+    También se guarda hasta qué altura llega cada página, para saber si la
+    primera cabe en lo que queda de la página donde se inserta.
+    """
+
+    def __init__(self, pdf):
+        self.margen_superior = pdf.t_margin
+        self.finales = pdf.finales + [pdf.y]
+        fuentes = {info['i']: clave for clave, info in pdf.fonts.items()}
+        imagenes = {info['i']: clave for clave, info in pdf.images.items()}
+
+        self.fuentes = {clave: dict(info) for clave, info in pdf.fonts.items()}
+        self.imagenes = {clave: dict(info) for clave, info in pdf.images.items()}
+        self.paginas = []
+
+        for numero in range(1, pdf.page + 1):
+            partes = []
+            contenido = pdf.pages[numero]
+            inicio = 0
+            for ref in _REFERENCIA.finditer(contenido):
+                partes.append(contenido[inicio:ref.start()])
+                if ref.group(1):
+                    partes.append(('F', fuentes[int(ref.group(2))]))
+                else:
+                    partes.append(('I', imagenes[int(ref.group(4))]))
+                inicio = ref.end()
+            partes.append(contenido[inicio:])
+            self.paginas.append(partes)
+
+
+def _mtime(ruta):
+    try:
+        return os.stat(ruta).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def leer_condiciones():
+    """ Devuelve el texto de condiciones.txt, leyéndolo de nuevo solo si cambió. """
+    mtime = _mtime(CONDICIONES_PATH)
+    if mtime is None:
+        return None
+
+    with _lock:
+        if _condiciones.get('mtime') == mtime:
+            return _condiciones['texto']
+
+    with open(CONDICIONES_PATH, "r", encoding="utf-8") as file:
+        texto = file.read()
+
+    with _lock:
+        _condiciones.update(mtime=mtime, texto=texto)
+    return texto
+
+
+def documento_a_bytes(pdf):
+    """ Cierra el documento FPDF y devuelve su contenido binario. """
+    return pdf.output(dest='S').encode('latin-1')
+
+
+def obtener_fragmento(marca, construir, dependencias=()):
+    """
+    Devuelve las secciones fijas de la marca. Se renderizan una sola vez por
+    proceso con construir(pdf) y se regeneran si cambia alguno de los archivos
+    en dependencias (además de condiciones.txt).
+    """
+    firma = tuple(_mtime(ruta) for ruta in (CONDICIONES_PATH, *dependencias))
+
+    with _lock:
+        cacheado = _fragmentos.get(marca)
+        if cacheado and cacheado[0] == firma:
+            return cacheado[1]
+
+    pdf = _Plantilla()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_font('Arial', size=12)
+    construir(pdf)
+    fragmento = Fragmento(pdf)
+
+    with _lock:
+        _fragmentos[marca] = (firma, fragmento)
+    return fragmento
+
+
+def insertar_fragmento(pdf, fragmento):
+    """
+    Agrega al documento las páginas del fragmento. La primera sigue en la
+    página actual si cabe en el espacio que queda, como al dibujar las
+    secciones directamente; las demás van en páginas nuevas.
+    """
+    indices = {}
+    for clave, info in fragmento.fuentes.items():
+        if clave not in pdf.fonts:
+            pdf.fonts[clave] = dict(info, i=len(pdf.fonts) + 1)
+        indices[('F', clave)] = pdf.fonts[clave]['i']
+    for clave, info in fragmento.imagenes.items():
+        if clave not in pdf.images:
+            # FPDF elimina 'data' al escribir el documento, por eso se registra una copia
+            pdf.images[clave] = dict(info, i=len(pdf.images) + 1)
+        indices[('I', clave)] = pdf.images[clave]['i']
+
+    for numero, partes in enumerate(fragmento.paginas):
+        contenido = ''.join(parte if isinstance(parte, str) else f"/{parte[0]}{indices[parte]}" for parte in partes)
+        alto = fragmento.finales[numero] - fragmento.margen_superior
+        if numero == 0 and pdf.page and pdf.y + alto <= pdf.page_break_trigger:
+            # Se corre hacia abajo lo que ya ocupa la página; q/Q deja el estado gráfico como estaba
+            desplazamiento = pdf.y - fragmento.margen_superior
+            contenido = f"q 1 0 0 1 0 {-desplazamiento * pdf.k:.2f} cm\n{contenido}\nQ\n"
+        else:
+            pdf.add_page()
+            desplazamiento = pdf.y - fragmento.margen_superior
+        pdf.pages[pdf.page] += contenido
+        pdf.y = fragmento.finales[numero] + desplazamiento
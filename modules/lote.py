@@ -0,0 +1,171 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import time
+import zipfile
+
+from modules.cotizacion_pdf import generar_cotizacion_pdf
+
+# Columnas que debe traer cada fila del archivo del lote
+CAMPOS_LOTE = ('cliente', 'proyecto', 'celular', 'correo_asesor', 'correo', 'ubicacion', 'potencia', 'costo', 'area')
+
+# Máximo de filas por lote y procesos que generan las cotizaciones
+MAX_FILAS_LOTE = int(os.getenv('MAX_FILAS_LOTE', '2000'))
+TRABAJADORES_LOTE = int(os.getenv('TRABAJADORES_LOTE', str(os.cpu_count() or 1)))
+
+
+def leer_filas(contenido, nombre_archivo):
+    """
+    Lee las filas del lote desde un CSV (con encabezados) o un JSON (lista de
+    objetos). Devuelve una lista de diccionarios con las columnas de CAMPOS_LOTE.
+    """
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode('utf-8-sig')
+
+    if nombre_archivo.lower().endswith('.json'):
+        filas = json.loads(contenido)
+        if not isinstance(filas, list):
+            raise ValueError("El JSON del lote debe ser una lista de cotizaciones.")
+    elif nombre_archivo.lower().endswith('.csv'):
+        lector = csv.DictReader(io.StringIO(contenido))
+        faltantes = [campo for campo in CAMPOS_LOTE if campo not in (lector.fieldnames or [])]
+        if faltantes:
+            raise ValueError(f"Faltan las columnas {', '.join(faltantes)} en el CSV.")
+        filas = list(lector)
+    else:
+        raise ValueError("Formato de lote no compatible. Usa CSV o JSON.")
+
+    if len(filas) > MAX_FILAS_LOTE:
+        raise ValueError(f"El lote tiene {len(filas)} filas; el máximo es {MAX_FILAS_LOTE}.")
+    return filas
+
+
+def cotizar_fila(marca, numero, fecha, fila):
+    """ Calcula y genera la cotización de una fila. Se ejecuta en los procesos del pool. """
+    # NumPy se carga en los procesos del pool y no al importar app.py
+    from modules.simulacion_horaria import calcular_proyecto_horario
+
+    potencia = float(fila['potencia'])
+    costo = float(fila['costo'])
+    area = float(fila['area'])
+    datos_proyecto = calcular_proyecto_horario(fila['ubicacion'], potencia, costo)
+
+    return generar_cotizacion_pdf(
+        marca, numero, fecha, fila['cliente'], fila['proyecto'], fila['celular'],
+        fila['correo'], fila['correo_asesor'], fila['ubicacion'], potencia, costo, area, datos_proyecto
+    )
+
+
+def generar_lote(marca, filas, numeros, trabajadores=TRABAJADORES_LOTE):
+    """
+    Genera las cotizaciones de todas las filas en paralelo y las entrega a
+    medida que terminan como (indice_fila, nombre_pdf, pdf, error).
+    """
+    fecha = datetime.now().strftime("%d/%m/%Y")
+
+    pool = ProcessPoolExecutor(max_workers=trabajadores, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        futuros = {}
+        for indice, (fila, numero) in enumerate(zip(filas, numeros)):
+            futuro = pool.submit(cotizar_fila, marca, numero, fecha, fila)
+            futuros[futuro] = (indice, f'cotizacion_{numero}.pdf')
+
+        for futuro in as_completed(futuros):
+            indice, nombre_pdf = futuros[futuro]
+            try:
+                yield indice, nombre_pdf, futuro.result(), None
+            except KeyError as e:
+                yield indice, nombre_pdf, None, f"Falta el campo {str(e)}"
+            except Exception as e:
+                yield indice, nombre_pdf, None, str(e)
+    finally:
+        # Si el cliente corta la descarga no se siguen generando las cotizaciones pendientes
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _FlujoZip(io.RawIOBase):
+    """ Destino de escritura del ZIP que acumula los bytes para entregarlos por partes. """
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def zip_lote(marca, filas, numeros, trabajadores=TRABAJADORES_LOTE):
+    """
+    Genera el ZIP del lote por partes: cada cotización se agrega y se entrega
+    apenas termina. Al final se agrega reporte.json con los errores por fila
+    y el rendimiento (cotizaciones por segundo).
+    """
+    flujo = _FlujoZip()
+    inicio = time.perf_counter()
+    generadas = 0
+    errores = []
+
+    with zipfile.ZipFile(flujo, 'w', compression=zipfile.ZIP_STORED) as archivo:
+        for indice, nombre_pdf, pdf, error in generar_lote(marca, filas, numeros, trabajadores):
+            if error:
+                errores.append({"fila": indice + 1, "error": error})
+                continue
+            archivo.writestr(nombre_pdf, pdf)
+            generadas += 1
+            yield flujo.vaciar()
+
+        segundos = time.perf_counter() - inicio
+        errores.sort(key=lambda error: error["fila"])
+        reporte = {
+            "marca": marca,
+            "filas": len(filas),
+            "cotizaciones": generadas,
+            "errores": errores,
+            "trabajadores": trabajadores,
+            "segundos": round(segundos, 3),
+            "cotizaciones_por_segundo": round(generadas / segundos, 2) if segundos else None,
+        }
+        archivo.writestr('reporte.json', json.dumps(reporte, ensure_ascii=False, indent=2))
+
+    yield flujo.vaciar()
+
+
+def main():
+    from modules.numeracion import AsignadorCotizaciones
+
+    parser = argparse.ArgumentParser(description="Genera cotizaciones en lote desde un CSV o JSON.")
+    parser.add_argument('entrada', help="Archivo CSV o JSON con las cotizaciones")
+    parser.add_argument('salida', help="Archivo ZIP de salida")
+    parser.add_argument('--marca', default='solartech')
+    parser.add_argument('--trabajadores', type=int, default=TRABAJADORES_LOTE)
+    args = parser.parse_args()
+
+    with open(args.entrada, 'rb') as file:
+        filas = leer_filas(file.read(), args.entrada)
+
+    asignador = AsignadorCotizaciones()
+    numeros = [asignador.siguiente() for _ in filas]
+
+    with open(args.salida, 'wb') as file:
+        for parte in zip_lote(args.marca, filas, numeros, args.trabajadores):
+            file.write(parte)
+
+    with zipfile.ZipFile(args.salida) as archivo:
+        print(archivo.read('reporte.json').decode('utf-8'))
+
+
+if __name__ == '__main__':
+    main()
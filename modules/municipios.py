@@ -0,0 +1,277 @@
+from collections import defaultdict
+from functools import lru_cache
+import argparse
+import csv
+import os
+import re
+import time
+import unicodedata
+
+# Los 1.121 municipios de Colombia con su código y departamento según la DIVIPOLA del DANE, y coordenadas
+# y población de GeoNames (cities500, CC BY 4.0) donde el nombre coincide; vacías donde no.
+MUNICIPIOS_CSV = os.getenv(
+    'MUNICIPIOS_CSV', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'datos', 'municipios_colombia.csv')
+)
+
+# Similitud mínima (coeficiente de Dice sobre trigramas) para aceptar un nombre mal escrito
+SIMILITUD_MINIMA = float(os.getenv('SIMILITUD_MINIMA_MUNICIPIO', '0.6'))
+
+# Nombres aproximados que se consideran empatados con el mejor si su similitud no está más abajo que esto
+MARGEN_AMBIGUEDAD = float(os.getenv('MARGEN_AMBIGUEDAD_MUNICIPIO', '0.05'))
+
+# Veces que debe superar en población un municipio a los homónimos de otros departamentos para elegirlo sin preguntar
+DOMINANCIA_POBLACION = 10
+
+DEPARTAMENTOS_POR_ZONA = {
+    "Costa Caribe": ("Atlántico", "Bolívar", "Magdalena", "Cesar", "Córdoba", "Sucre", "San Andrés"),
+    "Desierto de la Guajira": ("La Guajira",),
+    "Región Andina": (
+        "Antioquia", "Boyacá", "Caldas", "Cundinamarca", "Bogotá", "Huila", "Norte de Santander",
+        "Quindío", "Risaralda", "Santander", "Tolima"
+    ),
+    "Región Pacífica": ("Chocó", "Valle del Cauca", "Cauca", "Nariño"),
+    "Llanos Orientales": ("Meta", "Casanare", "Arauca", "Vichada"),
+    "Amazonía": ("Amazonas", "Caquetá", "Guainía", "Guaviare", "Putumayo", "Vaupés"),
+}
+
+# Otras formas en que aparecen algunos nombres en las facturas
+ALIAS = {
+    "bogota d c": "bogota",
+    "bogota dc": "bogota",
+    "santafe de bogota": "bogota",
+    "santa fe de bogota": "bogota",
+    "cartagena": "cartagena de indias",
+    "santiago de cali": "cali",
+    "cucuta": "san jose de cucuta",
+    "tumaco": "san andres de tumaco",
+    "mompos": "santa cruz de mompox",
+    "mompox": "santa cruz de mompox",
+    "ubate": "villa de san diego de ubate",
+    "toluviejo": "san jose de toluviejo",
+    "tolu viejo": "san jose de toluviejo",
+    "piendamo": "piendamo tunia",
+    "guican": "guican de la sierra",
+    "guajira": "la guajira",
+    "valle": "valle del cauca",
+    "archipielago de san andres": "san andres",
+}
+
+
+def normalizar(texto):
+    """ Minúsculas y sin tildes, para comparar sin importar cómo quedaron en el OCR. """
+    return ''.join(
+        letra for letra in unicodedata.normalize('NFD', texto.lower()) if unicodedata.category(letra) != 'Mn'
+    )
+
+
+def _clave(nombre):
+    """ Nombre normalizado, solo letras y números separados por un espacio. """
+    clave = ' '.join(re.sub(r'[^a-z0-9]+', ' ', normalizar(nombre)).split())
+    return ALIAS.get(clave, clave)
+
+
+def _trigramas(clave):
+    clave = f" {clave} "
+    return {clave[i:i + 3] for i in range(len(clave) - 2)}
+
+
+ZONA_POR_DEPARTAMENTO = {
+    _clave(departamento): (departamento, zona)
+    for zona, departamentos in DEPARTAMENTOS_POR_ZONA.items()
+    for departamento in departamentos
+}
+ZONAS = {_clave(zona): zona for zona in DEPARTAMENTOS_POR_ZONA}
+
+
+class UbicacionAmbigua(ValueError):
+    """ El nombre corresponde a municipios de varios departamentos y hay que indicar cuál. """
+
+    def __init__(self, nombre, opciones):
+        self.opciones = list(dict.fromkeys(f"{municipio['municipio']} ({municipio['departamento']})" for municipio in opciones))
+        super().__init__(
+            f"La ubicación '{nombre}' corresponde a varios municipios: {', '.join(self.opciones)}. Indique el departamento."
+        )
+
+
+class IndiceMunicipios:
+    """
+    Índice en memoria de los municipios: búsqueda exacta por nombre
+    normalizado y, si no aparece, aproximada con un índice invertido de
+    trigramas (coeficiente de Dice), para tolerar tildes y errores del OCR.
+    """
+
+    def __init__(self, ruta=MUNICIPIOS_CSV):
+        self.municipios = []
+        self.exactos = defaultdict(list)
+        self.trigramas = defaultdict(list)
+
+        with open(ruta, 'r', encoding='utf-8') as file:
+            for fila in csv.DictReader(file):
+                departamento, zona = ZONA_POR_DEPARTAMENTO[_clave(fila['departamento'])]
+                clave = _clave(fila['municipio'])
+                self.municipios.append({
+                    "municipio": fila['municipio'],
+                    "departamento": departamento,
+                    "zona": zona,
+                    "codigo_dane": fila['codigo_dane'],
+                    "latitud": float(fila['latitud']) if fila['latitud'] else None,
+                    "longitud": float(fila['longitud']) if fila['longitud'] else None,
+                    "poblacion": int(fila['poblacion']) if fila['poblacion'] else None,
+                    "_trigramas": len(_trigramas(clave)),
+                })
+                indice = len(self.municipios) - 1
+                self.exactos[clave].append(indice)
+                for trigrama in _trigramas(clave):
+                    self.trigramas[trigrama].append(indice)
+
+        # Ante nombres repetidos va primero el más poblado
+        for indices in self.exactos.values():
+            indices.sort(key=lambda i: -(self.municipios[i]["poblacion"] or 0))
+
+    def _resultado(self, indice, similitud):
+        municipio = {campo: valor for campo, valor in self.municipios[indice].items() if not campo.startswith('_')}
+        municipio["similitud"] = round(similitud, 3)
+        return municipio
+
+    def _elegir(self, nombre, candidatos):
+        """
+        Primero de los candidatos [(indice, similitud)], ya ordenados. Si hay
+        candidatos de otros departamentos y el primero no es claramente más
+        poblado que todos ellos, lanza UbicacionAmbigua en vez de escoger.
+        """
+        indice, similitud = candidatos[0]
+        primero = self.municipios[indice]
+        otros = [
+            self.municipios[otro] for otro, _ in candidatos[1:]
+            if self.municipios[otro]["departamento"] != primero["departamento"]
+        ]
+        # Una población desconocida (sin dato) no permite decidir
+        if any(
+            not primero["poblacion"] or not otro["poblacion"] or primero["poblacion"] < DOMINANCIA_POBLACION * otro["poblacion"]
+            for otro in otros
+        ):
+            raise UbicacionAmbigua(nombre, [primero] + otros)
+        return self._resultado(indice, similitud)
+
+    def buscar(self, nombre, departamento=None, similitud_minima=SIMILITUD_MINIMA):
+        """
+        Municipio más parecido a nombre (opcionalmente dentro del
+        departamento), con su zona y la similitud de 0 a 1; None si ninguno
+        alcanza similitud_minima. Sin departamento, si el nombre (o los más
+        parecidos, dentro de MARGEN_AMBIGUEDAD) es de municipios de varios
+        departamentos, lanza UbicacionAmbigua con las opciones.
+        """
+        clave = _clave(nombre)
+        if not clave:
+            return None
+
+        exactos = [
+            indice for indice in self.exactos.get(clave, ())
+            if departamento is None or self.municipios[indice]["departamento"] == departamento
+        ]
+        if exactos:
+            return self._elegir(nombre, [(indice, 1.0) for indice in exactos])
+
+        consulta = _trigramas(clave)
+        comunes = defaultdict(int)
+        for trigrama in consulta:
+            for indice in self.trigramas.get(trigrama, ()):
+                comunes[indice] += 1
+
+        parecidos = []
+        for indice, cantidad in comunes.items():
+            municipio = self.municipios[indice]
+            if departamento is not None and municipio["departamento"] != departamento:
+                continue
+            similitud = 2 * cantidad / (len(consulta) + municipio["_trigramas"])
+            if similitud > similitud_minima:
+                parecidos.append((indice, similitud))
+        if not parecidos:
+            return None
+
+        mejor_similitud = max(similitud for _, similitud in parecidos)
+        cercanos = [(indice, similitud) for indice, similitud in parecidos if similitud >= mejor_similitud - MARGEN_AMBIGUEDAD]
+        cercanos.sort(key=lambda candidato: (-candidato[1], -(self.municipios[candidato[0]]["poblacion"] or 0)))
+        return self._elegir(nombre, cercanos)
+
+
+@lru_cache(maxsize=1)
+def indice_municipios():
+    """ Índice de municipios del proceso; se construye en la primera búsqueda. """
+    return IndiceMunicipios()
+
+
+def buscar_municipio(nombre, departamento=None, similitud_minima=SIMILITUD_MINIMA):
+    """ Municipio con su departamento, zona y coordenadas, o None si no se reconoce. Puede lanzar UbicacionAmbigua. """
+    return indice_municipios().buscar(nombre, departamento, similitud_minima)
+
+
+def buscar_departamento(nombre, similitud_minima=SIMILITUD_MINIMA):
+    """ Nombre oficial del departamento más parecido, o None. """
+    clave = _clave(nombre)
+    if clave in ZONA_POR_DEPARTAMENTO:
+        return ZONA_POR_DEPARTAMENTO[clave][0]
+
+    consulta = _trigramas(clave)
+    mejor, mejor_similitud = None, similitud_minima
+    for clave_departamento, (departamento, _) in ZONA_POR_DEPARTAMENTO.items():
+        trigramas = _trigramas(clave_departamento)
+        similitud = 2 * len(consulta & trigramas) / (len(consulta) + len(trigramas))
+        if similitud > mejor_similitud:
+            mejor, mejor_similitud = departamento, similitud
+    return mejor
+
+
+def resolver_zona(texto):
+    """
+    Zona de radiación para una ubicación escrita libremente, como la que
+    devuelve el modelo ("Medellín - Antioquia", "Región Andina", "Pasto").
+    Devuelve un diccionario con la zona, el municipio y el departamento
+    (None los que no se identificaron), o None si no se reconoce nada.
+    Lanza UbicacionAmbigua si el municipio existe en varios departamentos y
+    el texto no dice cuál.
+    """
+    clave = _clave(texto or '')
+    for clave_zona, zona in ZONAS.items():
+        if re.search(rf'\b{clave_zona}\b', clave):
+            return {"zona": zona, "municipio": None, "departamento": None}
+
+    partes = [parte for parte in re.split(r'[-–,/()|:]', texto or '') if _clave(parte)]
+    departamento = None
+    for parte in partes:
+        if _clave(parte) in ZONA_POR_DEPARTAMENTO:
+            departamento = ZONA_POR_DEPARTAMENTO[_clave(parte)][0]
+            break
+    if departamento is None:
+        departamento = next(filter(None, (buscar_departamento(parte) for parte in partes[1:])), None)
+
+    for parte in partes:
+        # Un nombre de departamento solo cuenta como municipio si coincide exacto (Bogotá, Arauca)
+        es_departamento = _clave(parte) in ZONA_POR_DEPARTAMENTO
+        municipio = buscar_municipio(parte, departamento, 1.0 if es_departamento else SIMILITUD_MINIMA)
+        if municipio:
+            return {"zona": municipio["zona"], "municipio": municipio["municipio"], "departamento": municipio["departamento"]}
+
+    if departamento is not None:
+        return {"zona": ZONA_POR_DEPARTAMENTO[_clave(departamento)][1], "municipio": None, "departamento": departamento}
+    return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Resuelve ubicaciones a zonas con el índice de municipios.")
+    parser.add_argument('ubicaciones', nargs='*', default=["Medellín - Antioquia", "Medellln, Antioqia", "Bogotá D.C.", "Riohacha", "Girardot", "Providencia"])
+    parser.add_argument('--repeticiones', type=int, default=1000)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    indice_municipios()
+    print(f"Índice: {len(indice_municipios().municipios)} municipios en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    for ubicacion in args.ubicaciones:
+        inicio = time.perf_counter()
+        for _ in range(args.repeticiones):
+            try:
+                resultado = resolver_zona(ubicacion)
+            except UbicacionAmbigua as e:
+                resultado = f"ambigua: {', '.join(e.opciones)}"
+        microsegundos = (time.perf_counter() - inicio) / args.repeticiones * 1e6
+        print(f"{ubicacion!r}: {resultado} ({microsegundos:.0f} µs)")
@@ -0,0 +1,86 @@
+import json
+import os
+import sqlite3
+import threading
+
+# Base de datos compartida por todos los workers para numerar las cotizaciones
+NUMERACION_DB = os.getenv('NUMERACION_DB', 'cotizacion.db')
+
+# Archivo del contador anterior; solo se usa para continuar la numeración la primera vez
+COTIZACION_JSON = 'cotizacion.json'
+
+# Cantidad de números que cada worker reserva de una vez
+TAMANO_BLOQUE = int(os.getenv('NUMERACION_BLOQUE', '20'))
+
+
+def _numero_inicial():
+    if os.path.exists(COTIZACION_JSON):
+        with open(COTIZACION_JSON, "r") as file:
+            return json.load(file).get("cotizacion", 0)
+    return 0
+
+
+class AsignadorCotizaciones:
+    """
+    Entrega números de cotización únicos entre procesos. Cada proceso reserva
+    en SQLite un bloque de números consecutivos y los entrega desde memoria;
+    solo vuelve a la base de datos cuando se le acaba el bloque. Los números
+    que un worker no alcanza a usar antes de terminar se pierden, pero nunca
+    se repiten.
+    """
+
+    def __init__(self, ruta=NUMERACION_DB, tamano_bloque=TAMANO_BLOQUE):
+        self.ruta = ruta
+        self.tamano_bloque = tamano_bloque
+        self._lock = threading.Lock()
+        self._pid = None
+        self._conexion = None
+        self._siguiente = 1
+        self._limite = 0
+
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None, check_same_thread=False)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=FULL")
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS numeracion ("
+            " id INTEGER PRIMARY KEY CHECK (id = 1),"
+            " ultimo INTEGER NOT NULL)"
+        )
+        conexion.execute(
+            "INSERT OR IGNORE INTO numeracion (id, ultimo) VALUES (1, ?)", (_numero_inicial(),)
+        )
+        return conexion
+
+    def _reservar_bloque(self):
+        conexion = self._conexion
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            (ultimo,) = conexion.execute("SELECT ultimo FROM numeracion WHERE id = 1").fetchone()
+            conexion.execute(
+                "UPDATE numeracion SET ultimo = ? WHERE id = 1", (ultimo + self.tamano_bloque,)
+            )
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+
+        self._siguiente = ultimo + 1
+        self._limite = ultimo + self.tamano_bloque
+
+    def siguiente(self):
+        """ Devuelve el siguiente número de cotización de este proceso. """
+        with self._lock:
+            # Después de un fork (gunicorn --preload) el hijo no puede heredar el bloque del padre
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._conexion = self._conectar()
+                self._limite = 0
+                self._siguiente = 1
+
+            if self._siguiente > self._limite:
+                self._reservar_bloque()
+
+            numero = self._siguiente
+            self._siguiente += 1
+            return numero
@@ -0,0 +1,168 @@
+from functools import lru_cache
+import argparse
+import os
+import queue
+import shutil
+import threading
+import time
+
+import pytesseract
+
+try:
+    import tesserocr
+except (ImportError, ValueError):
+    # ValueError: algunas compilaciones de tesserocr (con cysignals) solo se importan en el hilo
+    # principal, y la capacidad de OCR se carga en el hilo de la primera petición que la usa
+    tesserocr = None
+
+# 'auto' usa tesserocr si está instalado y carga el idioma; si no, el ejecutable de tesseract
+OCR_MOTOR = os.getenv('OCR_MOTOR', 'auto')
+OCR_IDIOMA = os.getenv('OCR_IDIOMA', 'spa')
+
+# Carpeta con los .traineddata; None usa la que trae compilada tesseract
+TESSDATA = os.getenv('TESSDATA_PREFIX')
+
+MOTORES = ('tesserocr', 'pytesseract')
+
+
+class MotorTesserocr:
+    """
+    Instancias de la API de Tesseract que se mantienen vivas en el proceso,
+    con el modelo del idioma ya cargado. Cada hilo toma una libre y la
+    devuelve al terminar; si no hay libres se crea otra.
+    """
+
+    def __init__(self, idioma=OCR_IDIOMA, tessdata=TESSDATA):
+        self.idioma = idioma
+        self.tessdata = tessdata
+        self._libres = queue.LifoQueue()
+        self._pid = os.getpid()
+        # Se crea una de una vez para que un idioma faltante falle aquí y no en la primera factura
+        self._libres.put(self._crear())
+
+    def _crear(self):
+        if self.tessdata:
+            return tesserocr.PyTessBaseAPI(path=self.tessdata, lang=self.idioma)
+        return tesserocr.PyTessBaseAPI(lang=self.idioma)
+
+    def reconocer(self, imagen):
+        try:
+            api = self._libres.get_nowait()
+        except queue.Empty:
+            api = self._crear()
+        try:
+            api.SetImage(imagen)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            self._libres.put(api)
+
+
+@lru_cache(maxsize=1)
+def _ruta_tesseract():
+    tesseract_path = shutil.which('tesseract')
+    if not tesseract_path:
+        raise EnvironmentError("Tesseract no está instalado o no se encuentra en el PATH.")
+    return tesseract_path
+
+
+def _reconocer_pytesseract(imagen, idioma=OCR_IDIOMA):
+    """ Camino anterior: un proceso de tesseract por imagen. """
+    pytesseract.pytesseract.tesseract_cmd = _ruta_tesseract()
+    return pytesseract.image_to_string(imagen, lang=idioma)
+
+
+_motor = None
+_motor_pid = None
+_motor_error = None
+_lock = threading.Lock()
+
+
+def _obtener_motor():
+    """ Motor tesserocr de este proceso, o None si no está disponible o no se pidió. """
+    global _motor, _motor_pid, _motor_error
+    if OCR_MOTOR == 'pytesseract':
+        return None
+    with _lock:
+        if _motor_pid != os.getpid():
+            _motor, _motor_pid, _motor_error = None, os.getpid(), None
+            if tesserocr is None:
+                _motor_error = "tesserocr no está instalado"
+            else:
+                try:
+                    _motor = MotorTesserocr()
+                except RuntimeError as e:
+                    _motor_error = str(e)
+            if _motor is None and OCR_MOTOR == 'tesserocr':
+                raise EnvironmentError(f"No se pudo iniciar tesserocr: {_motor_error}")
+        return _motor
+
+
+def motor_activo():
+    """ Nombre del motor que se usa en este proceso ('tesserocr' o 'pytesseract'). """
+    return 'tesserocr' if _obtener_motor() is not None else 'pytesseract'
+
+
+def verificar_motor():
+    """ Lanza EnvironmentError si no hay ningún motor de OCR disponible. """
+    if _obtener_motor() is None:
+        _ruta_tesseract()
+
+
+def reconocer(imagen):
+    """ Texto de una imagen de PIL con el motor disponible; tesserocr primero y pytesseract de respaldo. """
+    motor = _obtener_motor()
+    if motor is not None:
+        return motor.reconocer(imagen)
+    return _reconocer_pytesseract(imagen)
+
+
+def comparar_motores(filepath, repeticiones=3):
+    """
+    Tiempo promedio de OCR de filepath con cada motor. Para tesserocr se
+    reporta aparte la carga del modelo, que solo se paga una vez por proceso.
+    """
+    from PIL import Image
+
+    imagen = Image.open(filepath)
+    imagen.load()
+    resultados = {}
+
+    for nombre in MOTORES:
+        try:
+            inicio = time.perf_counter()
+            if nombre == 'tesserocr':
+                if tesserocr is None:
+                    raise EnvironmentError("tesserocr no está instalado")
+                motor = MotorTesserocr()
+                funcion = motor.reconocer
+            else:
+                _ruta_tesseract()
+                funcion = _reconocer_pytesseract
+            carga = time.perf_counter() - inicio
+
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                texto = funcion(imagen)
+                tiempos.append(time.perf_counter() - inicio)
+            resultados[nombre] = {
+                "carga_segundos": round(carga, 3),
+                "promedio_segundos": round(sum(tiempos) / len(tiempos), 3),
+                "minimo_segundos": round(min(tiempos), 3),
+                "caracteres": len(texto),
+            }
+        except (EnvironmentError, RuntimeError) as e:
+            resultados[nombre] = {"error": str(e)}
+
+    return resultados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compara tesserocr y pytesseract sobre una factura.")
+    parser.add_argument('archivo', nargs='?', default='uploads/factura.jpeg')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    for nombre, resultado in comparar_motores(args.archivo, args.repeticiones).items():
+        print(f"{nombre}: {resultado}")
@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+import re
+
+from modules.municipios import ZONA_POR_DEPARTAMENTO, UbicacionAmbigua, buscar_departamento, buscar_municipio, normalizar
+
+# Por debajo de esta confianza se consulta al modelo de OpenAI
+UMBRAL_CONFIANZA = float(os.getenv('UMBRAL_CONFIANZA_PARSER', '0.8'))
+
+# Rangos razonables para descartar lecturas equivocadas del OCR
+RANGO_CONSUMO_KWH = (1, 100000)
+RANGO_COSTO_KWH = (100, 3000)
+
+# Nombres más largos primero para que "norte de santander" gane sobre "santander"
+_DEPARTAMENTOS = '|'.join(sorted((re.escape(nombre) for nombre in ZONA_POR_DEPARTAMENTO), key=len, reverse=True))
+PATRON_CIUDAD_DEPARTAMENTO = re.compile(rf'(?P<ciudad>[a-z][a-z .]{{2,30}}?)\s*[-–,]\s*(?P<departamento>{_DEPARTAMENTOS})\b')
+PATRON_DEPARTAMENTO = re.compile(rf'\b(?P<departamento>{_DEPARTAMENTOS})\b')
+
+NUMERO = r'\d[\d.,]*\d|\d'
+
+# Perfiles por empresa: cómo reconocerla y, en orden de preferencia, los patrones de cada campo con su confianza
+PERFILES = {
+    "epm": {
+        "identificar": re.compile(r'\bepm\b|empresas publicas de medellin|referente de pago'),
+        "consumo": [
+            (re.compile(rf'energ\S*\W{{0,12}}(?P<valor>{NUMERO})\s*kwh'), 0.9),
+        ],
+        # Liquidación al respaldo: "Energía feb-24 40 888,470 $35.538,80" (kWh, costo unitario y valor)
+        "tarifa": [
+            (re.compile(
+                rf'energ\S*\s+[a-z]{{3}}[-.]?\d{{2}}\s+(?P<kwh>{NUMERO})\s+\$?\s*(?P<valor>{NUMERO})\s+\$?\s*(?P<total>{NUMERO})'
+            ), 0.85),
+        ],
+    },
+    # Sin facturas en el corpus que los respalden: cada patrón vale menos de 0.4, así un solo campo leído
+    # con ellos deja el promedio por debajo de UMBRAL_CONFIANZA aunque los otros dos valgan 1.0 y se consulta al modelo
+    "generico": {
+        "identificar": re.compile(r''),
+        "consumo": [
+            (re.compile(rf'promedio[^\n]{{0,40}}?(?P<valor>{NUMERO})\s*kwh'), 0.35),
+            (re.compile(rf'(consumo|energ\S*)[^\n]{{0,40}}?(?P<valor>{NUMERO})\s*kwh'), 0.3),
+            (re.compile(rf'(?P<valor>{NUMERO})\s*kwh'), 0.2),
+        ],
+        "tarifa": [
+            (re.compile(
+                rf'(valor|costo|precio|tarifa)\s+(unitario|del\s+kwh|kwh|\(?\$\)?\s*/\s*kwh)[^\n\d]{{0,20}}(?P<valor>{NUMERO})'
+            ), 0.3),
+            (re.compile(rf'\$\s*/\s*kwh[^\n\d]{{0,10}}(?P<valor>{NUMERO})'), 0.3),
+            (re.compile(rf'(?P<valor>{NUMERO})\s*\$?\s*/\s*kwh'), 0.25),
+        ],
+    },
+}
+
+
+def candidatos_numero(texto):
+    """
+    Lecturas posibles de un número con formato colombiano (1.234,56) o con
+    los separadores que dejó el OCR, de la más probable a la menos probable.
+    """
+    limpio = re.sub(r'[^\d.,]', '', texto).strip('.,')
+    if not limpio:
+        return []
+    separadores = [i for i, letra in enumerate(limpio) if letra in '.,']
+    if not separadores:
+        return [float(limpio)]
+
+    ultimo = separadores[-1]
+    entero = re.sub(r'[.,]', '', limpio[:ultimo])
+    decimales = limpio[ultimo + 1:]
+    como_decimal = float(f"{entero}.{decimales}")
+    como_miles = float(entero + decimales)
+
+    if len(decimales) != 3:
+        return [como_decimal]
+    if len(separadores) > 1:
+        # 1.234.567 son miles; 4.556,650 usa el último separador como decimal
+        return [como_miles] if limpio[separadores[-2]] == limpio[ultimo] else [como_decimal]
+    return [como_miles, como_decimal]
+
+
+def _en_rango(candidatos, rango):
+    minimo, maximo = rango
+    return next((valor for valor in candidatos if minimo <= valor <= maximo), None)
+
+
+def _buscar_ciudad(palabras, departamento):
+    """
+    Nombre oficial del municipio con que terminan las palabras antes del
+    departamento ("... cl 10 medellin"): primero el nombre exacto más largo
+    (en el departamento o, como Bogotá, fuera de él) y si no, el más parecido.
+    Fuera del departamento no se toman nombres que existen en varios. Si nada
+    coincide, las palabras tal cual.
+    """
+    frases = [' '.join(palabras[inicio:]) for inicio in range(max(0, len(palabras) - 5), len(palabras))]
+    for departamento_busqueda in (departamento, None):
+        for frase in frases:
+            try:
+                municipio = buscar_municipio(frase, departamento_busqueda, 1.0)
+            except UbicacionAmbigua:
+                continue
+            if municipio:
+                return municipio["municipio"]
+
+    parecidos = list(filter(None, (buscar_municipio(frase, departamento) for frase in frases)))
+    if parecidos:
+        return max(parecidos, key=lambda municipio: municipio["similitud"])["municipio"]
+    return ' '.join(palabras).title()
+
+
+def _buscar_zona(texto, elegido=None):
+    """
+    Municipio, departamento y zona del texto. elegido es el (departamento,
+    zona) que se indicó en el formulario; manda sobre el que dice el texto.
+    """
+    coincidencia = PATRON_CIUDAD_DEPARTAMENTO.search(texto)
+    if coincidencia:
+        departamento, zona = elegido or ZONA_POR_DEPARTAMENTO[coincidencia.group('departamento')]
+        ciudad = _buscar_ciudad(coincidencia.group('ciudad').split(), departamento)
+        return {"zona": zona, "ciudad": ciudad, "departamento": departamento}, 1.0
+
+    coincidencia = PATRON_DEPARTAMENTO.search(texto)
+    if elegido or coincidencia:
+        departamento, zona = elegido or ZONA_POR_DEPARTAMENTO[coincidencia.group('departamento')]
+        return {"zona": zona, "ciudad": None, "departamento": departamento}, 0.8
+    return None, 0.0
+
+
+def _buscar_consumo(texto, perfiles):
+    for perfil in perfiles:
+        for patron, confianza in perfil["consumo"]:
+            for coincidencia in patron.finditer(texto):
+                valor = _en_rango(candidatos_numero(coincidencia.group('valor')), RANGO_CONSUMO_KWH)
+                if valor is not None:
+                    return valor, confianza
+    return None, 0.0
+
+
+def _buscar_tarifa(texto, perfiles):
+    """
+    Costo del kWh. Si la línea trae también los kWh y el valor total, se
+    comprueba que kWh x costo dé el total; eso también confirma el consumo.
+    """
+    for perfil in perfiles:
+        for patron, confianza in perfil["tarifa"]:
+            for coincidencia in patron.finditer(texto):
+                grupos = coincidencia.groupdict()
+                costos = candidatos_numero(grupos['valor'])
+                if grupos.get('total'):
+                    # El OCR a veces se come la coma: 888470 puede ser 888,470
+                    costos += [costo / divisor for costo in costos for divisor in (10, 100, 1000)]
+                    for kwh in candidatos_numero(grupos['kwh']):
+                        for total in candidatos_numero(grupos['total']):
+                            for costo in costos:
+                                if RANGO_COSTO_KWH[0] <= costo <= RANGO_COSTO_KWH[1] and abs(kwh * costo - total) <= 0.01 * total:
+                                    return costo, 1.0, kwh
+
+                costo = _en_rango(costos, RANGO_COSTO_KWH)
+                if costo is not None:
+                    return costo, confianza, None
+    return None, 0.0, None
+
+
+def identificar_empresa(texto):
+    """ Empresa cuyo perfil reconoce el texto (ya normalizado), o None. """
+    return next(
+        (nombre for nombre, perfil in PERFILES.items() if nombre != 'generico' and perfil["identificar"].search(texto)),
+        None
+    )
+
+
+def analizar_texto_factura(texto, empresa=None, departamento=None):
+    """
+    Extrae la zona, el consumo mensual (kWh) y el costo del kWh del texto del
+    OCR con los patrones de la empresa (la indicada o la que se reconozca en
+    el texto) y los genéricos. Si se indica el departamento, el municipio se
+    busca en él. Devuelve los valores (None si no se encontraron), la
+    confianza de cada campo y la confianza total (el promedio), de 0 a 1.
+    """
+    texto = normalizar(texto)
+    empresa = (empresa or '').strip().lower()
+    if empresa not in PERFILES or empresa == 'generico':
+        empresa = identificar_empresa(texto)
+    perfiles = [PERFILES[empresa], PERFILES['generico']] if empresa else [PERFILES['generico']]
+
+    departamento = buscar_departamento(departamento) if departamento else None
+    elegido = ZONA_POR_DEPARTAMENTO[normalizar(departamento)] if departamento else None
+    zona, confianza_zona = _buscar_zona(texto, elegido)
+    consumo, confianza_consumo = _buscar_consumo(texto, perfiles)
+    costo, confianza_costo, consumo_liquidado = _buscar_tarifa(texto, perfiles)
+
+    if consumo_liquidado is not None:
+        if consumo is None or consumo == consumo_liquidado:
+            consumo, confianza_consumo = consumo_liquidado, 1.0
+
+    confianzas = {"zona": confianza_zona, "consumo": confianza_consumo, "costo": confianza_costo}
+    return {
+        "empresa": empresa,
+        "zona": zona["zona"] if zona else None,
+        "ciudad": zona["ciudad"] if zona else None,
+        "departamento": zona["departamento"] if zona else None,
+        "consumo_kwh": consumo,
+        "costo_kwh": costo,
+        "confianza_campos": confianzas,
+        "confianza": round(sum(confianzas.values()) / len(confianzas), 3),
+    }
+
+
+def es_confiable(analisis, umbral=UMBRAL_CONFIANZA):
+    """ Si el análisis local basta para no consultar al modelo: todos los campos y confianza suficiente. """
+    campos = ("zona", "consumo_kwh", "costo_kwh")
+    return all(analisis[campo] is not None for campo in campos) and analisis["confianza"] >= umbral
+
+
+def evaluar_corpus(carpeta):
+    """
+    Corre el parser sobre un corpus de textos de OCR guardados: cada
+    <nombre>.txt tiene al lado un <nombre>.json con los valores esperados
+    (zona, consumo_kwh, costo_kwh) y, si se eligió en el formulario, la
+    empresa. Devuelve los resultados por archivo.
+    """
+    resultados = []
+    for nombre in sorted(os.listdir(carpeta)):
+        if not nombre.endswith('.txt'):
+            continue
+        with open(os.path.join(carpeta, nombre), 'r', encoding='utf-8') as file:
+            texto = file.read()
+        with open(os.path.join(carpeta, nombre[:-4] + '.json'), 'r', encoding='utf-8') as file:
+            esperado = json.load(file)
+        analisis = analizar_texto_factura(texto, esperado.pop('empresa', None))
+
+        errores = {
+            campo: {"esperado": valor, "obtenido": analisis[campo]}
+            for campo, valor in esperado.items() if analisis.get(campo) != valor
+        }
+        resultados.append({
+            "archivo": nombre, "confianza": analisis["confianza"], "confiable": es_confiable(analisis), "errores": errores
+        })
+    return resultados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Evalúa el parser de facturas sobre un corpus de textos de OCR.")
+    parser.add_argument('carpeta', nargs='?', default='corpus_facturas')
+    args = parser.parse_args()
+
+    resultados = evaluar_corpus(args.carpeta)
+    for resultado in resultados:
+        estado = "OK" if not resultado["errores"] else f"ERRORES {resultado['errores']}"
+        print(f"{resultado['archivo']}: confianza {resultado['confianza']} ({'local' if resultado['confiable'] else 'modelo'}) {estado}")
+    fallidos = sum(1 for resultado in resultados if resultado["errores"])
+    print(f"{len(resultados) - fallidos}/{len(resultados)} facturas correctas")
+    raise SystemExit(1 if fallidos else 0)
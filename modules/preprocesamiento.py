@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+
+# Lado mayor máximo de la imagen que se envía a Tesseract (las fotos de celular suelen pasar de 3000 px)
+OCR_MAX_LADO = int(os.getenv('OCR_MAX_LADO', '2000'))
+
+# Inclinación máxima que se corrige (grados) y paso con el que se busca
+MAX_INCLINACION = 5.0
+PASO_INCLINACION = 0.5
+
+# Lado mayor de la copia reducida con la que se estima la inclinación
+LADO_ESTIMACION = 600
+
+# Regiones de cada empresa como fracciones (x0, y0, x1, y1) de la foto, para 'frontal' y 'atras'.
+# Son amplias a propósito porque las fotos no quedan siempre igual encuadradas.
+PLANTILLAS_FACTURAS = {
+    "epm": {
+        "frontal": [
+            (0.0, 0.27, 1.0, 0.41),  # Cliente, dirección, ciudad y departamento
+            (0.08, 0.47, 1.0, 0.65),  # Consumos del mes (kWh)
+        ],
+        "atras": [
+            (0.0, 0.40, 1.0, 0.65),  # Liquidación de energía: kWh x costo unitario
+        ],
+    },
+}
+
+
+def _umbral_otsu(pixeles):
+    """ Umbral de Otsu para un arreglo de grises uint8. """
+    histograma = np.bincount(pixeles.ravel(), minlength=256).astype(np.float64)
+    total = histograma.sum()
+    peso_fondo = np.cumsum(histograma)
+    suma_fondo = np.cumsum(histograma * np.arange(256))
+    peso_frente = total - peso_fondo
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media_fondo = suma_fondo / peso_fondo
+        media_frente = (suma_fondo[-1] - suma_fondo) / peso_frente
+        varianza = peso_fondo * peso_frente * (media_fondo - media_frente) ** 2
+    return int(np.nanargmax(varianza))
+
+
+def reducir(imagen, max_lado=OCR_MAX_LADO):
+    """ Pasa a escala de grises y reduce la imagen para que su lado mayor no pase de max_lado. """
+    escala = max_lado / max(imagen.size)
+    if escala < 1 and imagen.format == 'JPEG':
+        # El decodificador de JPEG puede reducir 2, 4 u 8 veces al leer, sin decodificar la foto completa
+        imagen.draft('L', (round(imagen.width * escala), round(imagen.height * escala)))
+    imagen = ImageOps.exif_transpose(imagen).convert('L')
+    escala = max_lado / max(imagen.size)
+    if escala < 1:
+        imagen = imagen.resize((round(imagen.width * escala), round(imagen.height * escala)), Image.LANCZOS)
+    return imagen
+
+
+def estimar_inclinacion(imagen):
+    """
+    Ángulo (grados) que endereza las líneas de texto: el que hace más marcado
+    el perfil horizontal de una copia reducida y binarizada de la imagen.
+    """
+    escala = min(1.0, LADO_ESTIMACION / max(imagen.size))
+    muestra = imagen.resize((max(1, round(imagen.width * escala)), max(1, round(imagen.height * escala))))
+    pixeles = np.asarray(muestra)
+    tinta = Image.fromarray(((pixeles < _umbral_otsu(pixeles)) * 255).astype(np.uint8))
+
+    mejor_angulo, mejor_puntaje = 0.0, -1.0
+    for angulo in np.arange(-MAX_INCLINACION, MAX_INCLINACION + PASO_INCLINACION / 2, PASO_INCLINACION):
+        filas = np.asarray(tinta.rotate(angulo, resample=Image.NEAREST, expand=True)).sum(axis=1, dtype=np.float64)
+        puntaje = np.var(filas)
+        if puntaje > mejor_puntaje:
+            mejor_angulo, mejor_puntaje = float(angulo), puntaje
+    return mejor_angulo
+
+
+def binarizar(imagen):
+    """
+    Blanco y negro con Otsu después de dividir por el fondo difuminado, para
+    que las sombras y la luz desigual de las fotos no se vuelvan manchas.
+    """
+    fondo = np.asarray(imagen.filter(ImageFilter.BoxBlur(max(5, max(imagen.size) // 40))), dtype=np.float32)
+    normalizada = np.clip(np.asarray(imagen, dtype=np.float32) / np.maximum(fondo, 1) * 255, 0, 255).astype(np.uint8)
+    return Image.fromarray(((normalizada >= _umbral_otsu(normalizada)) * 255).astype(np.uint8))
+
+
+def preprocesar(imagen):
+    """ Reduce, endereza y binariza una página antes del OCR. """
+    imagen = reducir(imagen)
+    angulo = estimar_inclinacion(imagen)
+    if angulo:
+        imagen = imagen.rotate(angulo, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    return binarizar(imagen)
+
+
+def recortar_regiones(imagen, regiones):
+    """ Recorta las regiones (fracciones x0, y0, x1, y1) de la imagen, en el mismo orden. """
+    ancho, alto = imagen.size
+    return [
+        imagen.crop((round(x0 * ancho), round(y0 * alto), round(x1 * ancho), round(y1 * alto)))
+        for x0, y0, x1, y1 in regiones
+    ]
+
+
+def regiones_plantilla(empresa, caras=('frontal', 'atras')):
+    """
+    Regiones de la plantilla de la empresa para cada cara, o None por cara
+    si la empresa no tiene plantilla (se lee la página completa).
+    """
+    plantilla = PLANTILLAS_FACTURAS.get((empresa or '').strip().lower())
+    return [plantilla.get(cara) if plantilla else None for cara in caras]
@@ -0,0 +1,167 @@
+import argparse
+import json
+import math
+import os
+import re
+
+from modules.municipios import ZONA_POR_DEPARTAMENTO, ZONAS, normalizar
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Tokens máximos del texto de la factura dentro del prompt (las instrucciones van aparte)
+PRESUPUESTO_TOKENS_PROMPT = int(os.getenv('PRESUPUESTO_TOKENS_PROMPT', '400'))
+
+# Fracción mínima de letras y números en una línea para no tomarla como basura del OCR
+MIN_FRACCION_ALFANUMERICA = 0.6
+
+_UBICACION = '|'.join(sorted((re.escape(nombre) for nombre in ZONA_POR_DEPARTAMENTO), key=len, reverse=True))
+
+# Señales de que una línea sirve para la zona, el consumo o la tarifa, con su peso.
+# Las de otros servicios (agua, gas, aseo) restan para que no ocupen el presupuesto.
+SENALES = (
+    (re.compile(r'kwh'), 5),
+    (re.compile(rf'\b({_UBICACION})\b'), 5),
+    (re.compile(r'energ'), 3),
+    (re.compile(r'consumo|promedio'), 2),
+    (re.compile(r'\$|\bcop\b|costo|tarifa|valor\s+unitario|precio'), 2),
+    (re.compile(r'direcc|ciudad|municipio|barrio|\bcl\b|\bcra?\b|\bcalle\b|\bcarrera\b'), 2),
+    (re.compile(r'\d'), 1),
+    (re.compile(r'acueducto|alcantarill|\bgas\b|\bm3\b|\bm[*?]|aseo'), -4),
+)
+
+PLANTILLA_PROMPT = """
+A continuación tienes las líneas relevantes del texto de una factura de servicios públicos, leídas con OCR.
+
+Texto de la factura:
+\"\"\"{texto}\"\"\"
+
+Responde solo con un objeto JSON, sin texto adicional, con estas claves:
+{{"ciudad": "<municipio o null>", "departamento": "<departamento o null>", "zona": "<región o null>", "consumo_kwh": <número o null>, "costo_kwh": <número o null>}}
+
+- zona: una de {zonas}, según la ciudad.
+- consumo_kwh: consumo promedio mensual de energía en kWh.
+- costo_kwh: costo del kWh en pesos colombianos (COP).
+- Los números van sin separadores de miles ni unidades y con punto decimal.
+"""
+
+CLAVES_RESPUESTA = ("ciudad", "departamento", "zona", "consumo_kwh", "costo_kwh")
+
+
+_codificador = None
+
+
+def contar_tokens(texto):
+    """ Tokens del texto con tiktoken si está instalado; si no, la aproximación de 4 caracteres por token. """
+    global _codificador
+    if tiktoken is None:
+        return math.ceil(len(texto) / 4)
+    if _codificador is None:
+        _codificador = tiktoken.get_encoding('cl100k_base')
+    return len(_codificador.encode(texto))
+
+
+def puntuar_linea(linea):
+    """ Relevancia de una línea del OCR (0 = se descarta): suma de los pesos de las SENALES que tiene. """
+    visibles = ''.join(linea.split())
+    if len(visibles) < 4:
+        return 0
+    if sum(letra.isalnum() for letra in visibles) / len(visibles) < MIN_FRACCION_ALFANUMERICA:
+        return 0
+    linea = normalizar(linea)
+    return max(0, sum(peso for patron, peso in SENALES if patron.search(linea)))
+
+
+def seleccionar_lineas(texto, presupuesto=PRESUPUESTO_TOKENS_PROMPT):
+    """
+    Líneas del texto que caben en el presupuesto de tokens, tomando primero
+    las de mayor relevancia y devolviéndolas en su orden original. Las líneas
+    repetidas (por ejemplo, de una región leída dos veces) se toman una vez.
+    """
+    lineas = [' '.join(linea.split()) for linea in texto.splitlines()]
+    candidatas = []
+    vistas = set()
+    for posicion, linea in enumerate(lineas):
+        puntaje = puntuar_linea(linea)
+        if puntaje and linea.casefold() not in vistas:
+            vistas.add(linea.casefold())
+            candidatas.append((puntaje, posicion, linea))
+
+    elegidas = []
+    tokens = 0
+    for puntaje, posicion, linea in sorted(candidatas, key=lambda candidata: (-candidata[0], candidata[1])):
+        tokens_linea = contar_tokens(linea) + 1
+        if tokens + tokens_linea > presupuesto:
+            continue
+        elegidas.append((posicion, linea))
+        tokens += tokens_linea
+
+    return {
+        "texto": '\n'.join(linea for _, linea in sorted(elegidas)),
+        "lineas_totales": sum(1 for linea in lineas if linea),
+        "lineas_usadas": len(elegidas),
+        "tokens_texto": tokens,
+    }
+
+
+def construir_prompt(texto, presupuesto=PRESUPUESTO_TOKENS_PROMPT):
+    """ Prompt para el modelo con las líneas relevantes de la factura y los datos de la selección. """
+    seleccion = seleccionar_lineas(texto, presupuesto)
+    prompt = PLANTILLA_PROMPT.format(texto=seleccion["texto"], zonas=', '.join(ZONAS.values()))
+    seleccion["tokens_prompt"] = contar_tokens(prompt)
+    return prompt, seleccion
+
+
+def _numero(valor):
+    if valor is None or isinstance(valor, (int, float)):
+        return None if valor is None else float(valor)
+    limpio = re.sub(r'[^\d.,-]', '', str(valor)).replace(',', '.')
+    return float(limpio) if limpio else None
+
+
+def _primer_objeto_json(contenido):
+    """ Primer objeto JSON completo dentro del texto, aunque haya llaves sueltas antes o después. """
+    decodificador = json.JSONDecoder()
+    for coincidencia in re.finditer(r'\{', contenido):
+        try:
+            datos, _ = decodificador.raw_decode(contenido, coincidencia.start())
+        except ValueError:
+            continue
+        if isinstance(datos, dict):
+            return datos
+    return None
+
+
+def interpretar_respuesta(contenido):
+    """
+    Diccionario con CLAVES_RESPUESTA a partir de la respuesta del modelo: en
+    modo JSON la respuesta es el objeto; si no, el primer objeto JSON que
+    aparezca en el texto. Lanza ValueError si no trae un objeto JSON válido.
+    """
+    try:
+        datos = json.loads(contenido)
+    except ValueError:
+        datos = _primer_objeto_json(contenido)
+    if not isinstance(datos, dict):
+        raise ValueError(f"La respuesta no es un objeto JSON: {contenido[:200]}")
+
+    return {
+        clave: _numero(datos.get(clave)) if clave.endswith('_kwh') else (datos.get(clave) or None)
+        for clave in CLAVES_RESPUESTA
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Muestra el prompt que se enviaría para un texto de OCR guardado.")
+    parser.add_argument('archivo', nargs='?', default='corpus_facturas/epm_medellin_completa.txt')
+    parser.add_argument('--presupuesto', type=int, default=PRESUPUESTO_TOKENS_PROMPT)
+    args = parser.parse_args()
+
+    with open(args.archivo, 'r', encoding='utf-8') as file:
+        texto = file.read()
+    prompt, seleccion = construir_prompt(texto, args.presupuesto)
+    print(prompt)
+    print(f"Texto completo: {contar_tokens(texto)} tokens; prompt: {seleccion['tokens_prompt']} tokens "
+          f"({seleccion['lineas_usadas']} de {seleccion['lineas_totales']} líneas)")
@@ -0,0 +1,98 @@
+from io import BytesIO
+import os
+import threading
+
+from PIL import Image
+
+# Carpeta con las imágenes de marca que se imprimen en las cotizaciones
+IMAGENES_FOLDER = './static/css/imagenes'
+
+# Resolución a la que se preparan las imágenes según su tamaño impreso
+RESOLUCION_DPI = 150
+CALIDAD_JPEG = 85
+MM_POR_PULGADA = 25.4
+
+# Registro de imágenes preparadas por proceso: (nombre, ancho, alto) -> (mtime, info)
+_imagenes = {}
+_lock = threading.Lock()
+
+
+def _mm_a_pixeles(mm):
+    return max(1, int(round(mm / MM_POR_PULGADA * RESOLUCION_DPI)))
+
+
+def _preparar_imagen(ruta, ancho_mm, alto_mm=None):
+    """
+    Abre la imagen, la normaliza a RGB (aplanando la transparencia sobre blanco)
+    y la reduce al tamaño en que se imprime. Devuelve la información de imagen
+    en el formato que FPDF usa internamente (JPEG ya comprimido).
+    """
+    with Image.open(ruta) as original:
+        if original.mode in ('RGBA', 'LA') or (original.mode == 'P' and 'transparency' in original.info):
+            original = original.convert('RGBA')
+            imagen = Image.new('RGB', original.size, (255, 255, 255))
+            imagen.paste(original, mask=original.split()[-1])
+        else:
+            imagen = original.convert('RGB')
+
+    ancho_px = _mm_a_pixeles(ancho_mm)
+    if alto_mm:
+        alto_px = _mm_a_pixeles(alto_mm)
+    else:
+        alto_px = max(1, int(round(ancho_px * imagen.height / imagen.width)))
+
+    # Solo se reduce; nunca se amplía una imagen más pequeña que su tamaño impreso
+    if ancho_px < imagen.width and alto_px < imagen.height:
+        imagen = imagen.resize((ancho_px, alto_px), Image.LANCZOS)
+
+    buffer = BytesIO()
+    imagen.save(buffer, format='JPEG', quality=CALIDAD_JPEG, optimize=True)
+
+    return {
+        'w': imagen.width,
+        'h': imagen.height,
+        'cs': 'DeviceRGB',
+        'bpc': 8,
+        'f': 'DCTDecode',
+        'data': buffer.getvalue(),
+    }
+
+
+def obtener_imagen(nombre, ancho_mm, alto_mm=None):
+    """
+    Devuelve la imagen preparada desde el registro del proceso. Se vuelve a
+    cargar solo si el archivo cambió (mtime) desde la última preparación.
+    """
+    ruta = os.path.join(IMAGENES_FOLDER, nombre)
+    mtime = os.stat(ruta).st_mtime_ns
+    clave = (nombre, ancho_mm, alto_mm)
+
+    with _lock:
+        registrada = _imagenes.get(clave)
+        if registrada and registrada[0] == mtime:
+            return registrada[1]
+
+    info = _preparar_imagen(ruta, ancho_mm, alto_mm)
+
+    with _lock:
+        _imagenes[clave] = (mtime, info)
+    return info
+
+
+def colocar_imagen(pdf, nombre, x=None, y=None, w=0, h=0):
+    """
+    Equivalente a pdf.image(...) pero reutilizando la imagen preparada del
+    registro en lugar de abrir y decodificar el archivo en cada cotización.
+    """
+    info = obtener_imagen(nombre, w, h or None)
+    clave = f"{nombre}@{w}x{h}"
+    if clave not in pdf.images:
+        # FPDF elimina 'data' al escribir el documento, por eso se registra una copia
+        pdf.images[clave] = dict(info, i=len(pdf.images) + 1)
+    pdf.image(clave, x=x, y=y, w=w, h=h)
+
+
+def precargar_imagenes(usos):
+    """ Prepara de antemano las imágenes indicadas como (nombre, ancho, alto). """
+    for nombre, ancho_mm, alto_mm in usos:
+        obtener_imagen(nombre, ancho_mm, alto_mm)
@@ -0,0 +1,105 @@
+import os
+import time
+
+import numpy as np
+
+from modules.calculos_vectorizados import COSTO_KWP
+from modules.finanzas import ESCALAMIENTO_TARIFA, periodo_recuperacion, proyectar_flujos, vpn
+from modules.simulacion_horaria import dimensionar_paneles, energia_anual_por_kwp
+
+# Escenarios por petición y tiempo máximo para evaluarlos (milisegundos)
+ESCENARIOS_SENSIBILIDAD = int(os.getenv('ESCENARIOS_SENSIBILIDAD', '10000'))
+MAX_ESCENARIOS = int(os.getenv('MAX_ESCENARIOS', '100000'))
+PRESUPUESTO_SENSIBILIDAD_MS = float(os.getenv('PRESUPUESTO_SENSIBILIDAD_MS', '200'))
+
+# Escenarios que se evalúan por pasada; entre pasadas se revisa el presupuesto de tiempo
+TAMANO_BLOQUE = 2000
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Incertidumbre por defecto (desviación estándar) de cada variable
+INCERTIDUMBRE = {
+    "irradiancia": 0.08,  # Variación relativa del sol que recibe el techo
+    "consumo": 0.10,  # Variación relativa del consumo mensual
+    "escalamiento_tarifa": 0.03,  # Variación absoluta del alza anual del kWh
+}
+
+
+def _bandas(valores):
+    """ Percentiles de PERCENTILES; los escenarios que no recuperan la inversión cuentan como infinito. """
+    bandas = np.percentile(np.where(np.isnan(valores), np.inf, valores), PERCENTILES, method='inverted_cdf')
+    return {f"p{p}": (None if not np.isfinite(v) else round(float(v), 2)) for p, v in zip(PERCENTILES, bandas)}
+
+
+def _evaluar_bloque(generador, n, energia_panel, paneles, inversion, consumo_anual, costo,
+                    escalamiento, factor_sol, incertidumbre):
+    factor_irradiancia = np.clip(generador.normal(factor_sol, incertidumbre["irradiancia"], n), 0.05, None)
+    factor_consumo = np.clip(generador.normal(1, incertidumbre["consumo"], n), 0.1, None)
+    escalamientos = generador.normal(escalamiento, incertidumbre["escalamiento_tarifa"], n)
+
+    # El sistema ya está dimensionado: solo se ahorra la energía que alcanza a producir (con los
+    # excedentes cruzados 1 a 1, lo mismo que da la simulación de calcular_proyecto_horario sin batería)
+    produccion = paneles * energia_panel * factor_irradiancia
+    ahorro_primer_anio = np.minimum(produccion, consumo_anual * factor_consumo) * costo
+
+    flujos = proyectar_flujos(inversion, ahorro_primer_anio, escalamiento=escalamientos)
+    return ahorro_primer_anio, flujos[:, 1:].sum(axis=1), vpn(flujos), periodo_recuperacion(flujos)
+
+
+def analizar_sensibilidad(ubicacion, potencia, costo, escenarios=ESCENARIOS_SENSIBILIDAD,
+                          escalamiento=ESCALAMIENTO_TARIFA, factor_sol=1.0, incertidumbre=None,
+                          presupuesto_ms=PRESUPUESTO_SENSIBILIDAD_MS, semilla=None):
+    """
+    Monte Carlo sobre el proyecto que dimensiona calcular_proyecto_horario, con
+    la energía por panel del mismo modelo horario que la cotización: sortea
+    irradiancia (factor_sol < 1 para un techo con sombra), consumo y alza de
+    la tarifa alrededor de 'escalamiento', y devuelve bandas de percentiles
+    del ahorro, el VPN y el período de recuperación. Los escenarios se
+    evalúan por bloques y se deja de sortear al agotar presupuesto_ms, así
+    que 'escenarios_evaluados' puede ser menor que lo pedido.
+    """
+    if not 0 < escenarios <= MAX_ESCENARIOS:
+        raise ValueError(f"La cantidad de escenarios debe estar entre 1 y {MAX_ESCENARIOS}.")
+    incertidumbre = {**INCERTIDUMBRE, **(incertidumbre or {})}
+
+    inicio = time.perf_counter()
+    limite = inicio + presupuesto_ms / 1000
+
+    paneles = dimensionar_paneles(ubicacion, potencia)["Número de paneles de 400W"]
+    energia_panel = energia_anual_por_kwp(ubicacion) * 0.400
+    inversion = COSTO_KWP * paneles
+
+    generador = np.random.default_rng(semilla)
+    resultados = []
+    evaluados = 0
+    while evaluados < escenarios:
+        n = min(TAMANO_BLOQUE, escenarios - evaluados)
+        resultados.append(_evaluar_bloque(
+            generador, n, energia_panel, paneles, inversion, potencia * 12, costo, escalamiento, factor_sol,
+            incertidumbre
+        ))
+        evaluados += n
+        if time.perf_counter() >= limite:
+            break
+
+    ahorro, ahorro_acumulado, valor_presente, recuperacion = (np.concatenate(columna) for columna in zip(*resultados))
+
+    return {
+        "escenarios_solicitados": escenarios,
+        "escenarios_evaluados": evaluados,
+        "presupuesto_agotado": evaluados < escenarios,
+        "milisegundos": round((time.perf_counter() - inicio) * 1000, 1),
+        "inversion": int(inversion),
+        "ahorro_primer_anio": _bandas(ahorro),
+        "ahorro_acumulado": _bandas(ahorro_acumulado),
+        "vpn": _bandas(valor_presente),
+        "recuperacion_anios": _bandas(recuperacion),
+        "probabilidad_recuperacion": round(float(np.mean(~np.isnan(recuperacion))), 4),
+    }
+
+
+if __name__ == '__main__':
+    analizar_sensibilidad("Región Andina", 500, 800, escenarios=1000)
+    resultado = analizar_sensibilidad("Región Andina", 500, 800, presupuesto_ms=10000, semilla=0)
+    print(f"{resultado['escenarios_evaluados']} escenarios en {resultado['milisegundos']} ms")
+    print(resultado)
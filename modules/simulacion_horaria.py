@@ -0,0 +1,343 @@
+import hashlib
+import math
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from modules.calculos_solar import POTENCIAS_PANEL, RADIACION_ANUAL_POR_ZONA, armar_proyecto
+from modules.calculos_vectorizados import COSTO_KWP
+from modules.finanzas import ANIOS_PROYECCION, proyeccion_financiera
+
+HORAS_ANIO = 8760
+
+ZONAS = list(RADIACION_ANUAL_POR_ZONA)
+
+# Latitud representativa de cada zona (grados), para la geometría solar del perfil sintético
+LATITUD_POR_ZONA = {
+    "Costa Caribe": 10.4,
+    "Región Andina": 5.5,
+    "Región Pacífica": 4.5,
+    "Llanos Orientales": 4.1,
+    "Amazonía": -1.0,
+    "Desierto de la Guajira": 11.5
+}
+
+# Nubosidad por mes (1 = cielo despejado). Refleja las dos temporadas de lluvia del país.
+NUBOSIDAD_MENSUAL = np.array([0.90, 0.92, 0.85, 0.75, 0.72, 0.85, 0.92, 0.90, 0.82, 0.72, 0.74, 0.85])
+
+# Forma del consumo de un hogar a lo largo del día (se normaliza al consumo diario)
+CONSUMO_POR_HORA = np.array([
+    0.025, 0.022, 0.020, 0.020, 0.022, 0.030, 0.045, 0.050, 0.042, 0.038, 0.037, 0.040,
+    0.043, 0.042, 0.038, 0.037, 0.040, 0.050, 0.065, 0.070, 0.068, 0.060, 0.045, 0.033
+])
+CONSUMO_POR_HORA = CONSUMO_POR_HORA / CONSUMO_POR_HORA.sum()
+
+# Pérdidas DC (temperatura, suciedad, cableado) y eficiencia del inversor, para simular y para dimensionar
+PERDIDAS = 0.14
+EFICIENCIA_INVERSOR = 0.96
+
+# Perfiles propios (8760 valores en kW/m², uno por línea) que reemplazan al sintético de una zona
+PERFILES_FOLDER = os.getenv('PERFILES_FOLDER', 'perfiles')
+
+VERSION_PERFILES = 1
+
+_perfiles = None
+_ruta_cargada = None
+_lock = threading.Lock()
+
+
+def _firma_perfiles_propios():
+    """ Fecha de modificación y tamaño de cada perfil propio, para que editar un CSV cambie el archivo .npy. """
+    firma = []
+    for zona in ZONAS:
+        try:
+            estado = os.stat(os.path.join(PERFILES_FOLDER, f"{zona}.csv"))
+        except OSError:
+            continue
+        firma.append((zona, estado.st_mtime_ns, estado.st_size))
+    return firma
+
+
+def _ruta_perfiles():
+    firma = repr((
+        VERSION_PERFILES, sorted(RADIACION_ANUAL_POR_ZONA.items()), sorted(LATITUD_POR_ZONA.items()),
+        _firma_perfiles_propios()
+    ))
+    sufijo = hashlib.sha1(firma.encode('utf-8')).hexdigest()[:12]
+    return os.getenv('PERFILES_IRRADIANCIA', os.path.join(tempfile.gettempdir(), f'perfiles_irradiancia_{sufijo}.npy'))
+
+
+def _perfil_sintetico(zona):
+    """
+    Irradiancia horaria (kW/m²) de un año típico para la zona: cielo despejado
+    según la posición del sol, atenuado por nubosidad mensual y diaria, y
+    escalado para que el total anual coincida con RADIACION_ANUAL_POR_ZONA
+    (tomado como irradiación anual en kWh/m²).
+    """
+    horas = np.arange(HORAS_ANIO)
+    dia = horas // 24
+    hora_solar = horas % 24 + 0.5
+
+    latitud = np.radians(LATITUD_POR_ZONA[zona])
+    declinacion = np.radians(23.45) * np.sin(2 * np.pi * (284 + dia + 1) / 365)
+    angulo_horario = np.radians(15 * (hora_solar - 12))
+    cos_zenit = (np.sin(latitud) * np.sin(declinacion)
+                 + np.cos(latitud) * np.cos(declinacion) * np.cos(angulo_horario))
+    cos_zenit = np.clip(cos_zenit, 0, None)
+
+    # Modelo de cielo despejado de Haurwitz
+    despejado = np.where(cos_zenit > 0, 1.098 * cos_zenit * np.exp(-0.057 / np.maximum(cos_zenit, 1e-3)), 0)
+
+    # Días nublados con persistencia; la semilla depende de la zona para que el perfil sea estable
+    generador = np.random.default_rng(int(hashlib.sha1(zona.encode('utf-8')).hexdigest()[:8], 16))
+    ruido = generador.normal(0, 0.12, 365)
+    for i in range(1, 365):
+        ruido[i] += 0.6 * ruido[i - 1]
+    mes = np.minimum((np.arange(365) * 12) // 365, 11)
+    claridad_diaria = np.clip(NUBOSIDAD_MENSUAL[mes] + ruido, 0.15, 1.0)
+
+    perfil = despejado * claridad_diaria[dia]
+    return perfil * (RADIACION_ANUAL_POR_ZONA[zona] / perfil.sum())
+
+
+def _perfil_propio(zona):
+    ruta = os.path.join(PERFILES_FOLDER, f"{zona}.csv")
+    if not os.path.exists(ruta):
+        return None
+    perfil = np.loadtxt(ruta, dtype=np.float64)
+    if perfil.shape != (HORAS_ANIO,):
+        raise ValueError(f"El perfil {ruta} debe tener {HORAS_ANIO} valores.")
+    return perfil
+
+
+def _crear_perfiles(ruta):
+    perfiles = np.empty((len(ZONAS), HORAS_ANIO), dtype=np.float32)
+    for i, zona in enumerate(ZONAS):
+        propio = _perfil_propio(zona)
+        perfiles[i] = propio if propio is not None else _perfil_sintetico(zona)
+
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as file:
+        np.save(file, perfiles)
+    os.replace(temporal, ruta)
+
+
+def perfiles_irradiancia():
+    """
+    Devuelve la matriz (zonas x 8760) de irradiancia horaria. Se guarda una
+    vez en disco y se abre como memoria mapeada, así todos los workers
+    comparten las mismas páginas en lugar de tener cada uno su copia. Si
+    cambia un perfil propio, cambia la ruta y se genera de nuevo.
+    """
+    global _perfiles, _ruta_cargada
+    ruta = _ruta_perfiles()
+    with _lock:
+        if _perfiles is None or ruta != _ruta_cargada:
+            if not os.path.exists(ruta):
+                _crear_perfiles(ruta)
+            _perfiles, _ruta_cargada = np.load(ruta, mmap_mode='r'), ruta
+        return _perfiles
+
+
+def perfil_zona(ubicacion):
+    if ubicacion not in RADIACION_ANUAL_POR_ZONA:
+        raise ValueError(f'Ubicación {ubicacion} no encontrada en la base de datos.')
+    return perfiles_irradiancia()[ZONAS.index(ubicacion)]
+
+
+def _despachar_bateria(excedente, deficit, capacidad_kwh, eficiencia):
+    """
+    Carga la batería con los excedentes y la descarga en los déficits. La
+    carga de cada hora es recortar(carga anterior + neto, 0, capacidad); cada
+    hora es una función x -> recortar(x + a, bajo, alto) y la composición de
+    dos de ellas tiene la misma forma, así que la carga de todas las horas sale
+    de un scan prefijo vectorizado (log2(8760) = 14 pasos) sin recorrer las horas.
+    """
+    neto = np.where(excedente > 0, excedente * eficiencia, -deficit)
+    desplazamiento = neto.astype(np.float64)
+    bajo = np.zeros(HORAS_ANIO)
+    alto = np.full(HORAS_ANIO, float(capacidad_kwh))
+
+    paso = 1
+    while paso < HORAS_ANIO:
+        # Horas desde `paso`: se compone su función acumulada con la de `paso` horas antes
+        a_antes, bajo_antes, alto_antes = desplazamiento[:-paso], bajo[:-paso], alto[:-paso]
+        a, b, c = desplazamiento[paso:], bajo[paso:], alto[paso:]
+        nuevo_bajo = np.clip(bajo_antes + a, b, c)
+        nuevo_alto = np.clip(alto_antes + a, b, c)
+        desplazamiento = np.concatenate((desplazamiento[:paso], a_antes + a))
+        bajo = np.concatenate((bajo[:paso], nuevo_bajo))
+        alto = np.concatenate((alto[:paso], nuevo_alto))
+        paso *= 2
+
+    carga = np.clip(desplazamiento, bajo, alto)
+    cambio = np.diff(carga, prepend=0.0)
+    return np.maximum(cambio, 0) / eficiencia, np.maximum(-cambio, 0)
+
+
+def simular_anio(ubicacion, potencia_kwp, consumo_mensual_kwh, potencia_inversor_kw=None,
+                 bateria_kwh=0.0, perdidas=PERDIDAS, eficiencia_inversor=EFICIENCIA_INVERSOR, eficiencia_bateria=0.92):
+    """
+    Simula las 8760 horas de un año típico de un sistema de potencia_kwp en la
+    zona, con el inversor limitando la potencia AC y una batería opcional
+    (capacidad útil en kWh). Devuelve los totales anuales en kWh y el tamaño
+    de batería sugerido a partir del déficit nocturno de cada día.
+    """
+    irradiancia = np.asarray(perfil_zona(ubicacion), dtype=np.float64)
+    if potencia_inversor_kw is None:
+        potencia_inversor_kw = potencia_kwp
+
+    produccion_dc = irradiancia * potencia_kwp * (1 - perdidas)
+    produccion = np.minimum(produccion_dc * eficiencia_inversor, potencia_inversor_kw)
+
+    consumo_diario = consumo_mensual_kwh * 12 / 365
+    consumo = np.tile(CONSUMO_POR_HORA * consumo_diario, 365)
+
+    directo = np.minimum(produccion, consumo)
+    excedente = produccion - directo
+    deficit = consumo - directo
+
+    # Batería que cubriría el déficit del 90% de los días con la energía que sobra ese día
+    deficit_diario = np.minimum(deficit.reshape(365, 24).sum(axis=1),
+                                excedente.reshape(365, 24).sum(axis=1) * eficiencia_bateria)
+    bateria_sugerida_kwh = float(np.percentile(deficit_diario, 90))
+
+    if bateria_kwh > 0:
+        cargada, descargada = _despachar_bateria(excedente, deficit, bateria_kwh, eficiencia_bateria)
+        excedente = excedente - cargada
+        deficit = deficit - descargada
+    else:
+        descargada = np.zeros(HORAS_ANIO)
+
+    energia_producida = float(produccion.sum())
+    consumo_anual = float(consumo.sum())
+    autoconsumo = float(directo.sum() + descargada.sum())
+
+    return {
+        "energia_producida_kwh": round(energia_producida, 2),
+        "consumo_anual_kwh": round(consumo_anual, 2),
+        "autoconsumo_kwh": round(autoconsumo, 2),
+        "excedentes_kwh": round(float(excedente.sum()), 2),
+        "energia_red_kwh": round(float(deficit.sum()), 2),
+        "fraccion_solar": round(autoconsumo / consumo_anual, 4) if consumo_anual else 0.0,
+        "energia_recortada_kwh": round(float((produccion_dc * eficiencia_inversor - produccion).sum()), 2),
+        "bateria_sugerida_kwh": round(bateria_sugerida_kwh, 2),
+        # Mismas convenciones de calcular_proyecto: gel a 12 V con 50% de descarga, litio a 24 V con 90%
+        "capacidad_bateria_gel_ah": int(np.ceil(bateria_sugerida_kwh * 1000 / 12 / 0.5)),
+        "capacidad_bateria_litio_ah": int(np.ceil(bateria_sugerida_kwh * 1000 / 24 / 0.9)),
+    }
+
+
+def energia_anual_por_kwp(ubicacion):
+    """ kWh (AC) que produce al año 1 kWp en la zona según el perfil horario, sin recorte del inversor. """
+    irradiancia = np.asarray(perfil_zona(ubicacion), dtype=np.float64)
+    return float(irradiancia.sum()) * (1 - PERDIDAS) * EFICIENCIA_INVERSOR
+
+
+def dimensionar_paneles(ubicacion, potencia):
+    """
+    Paneles de cada tipo para que la producción del año, con el mismo modelo
+    de la simulación, iguale el consumo anual (potencia en kWh/mes × 12).
+    """
+    energia_kwp = energia_anual_por_kwp(ubicacion)
+    return {
+        f"Número de paneles de {round(potencia_panel * 1000)}W": math.ceil(potencia * 12 / (energia_kwp * potencia_panel))
+        for potencia_panel in POTENCIAS_PANEL
+    }
+
+
+def simular_proyecto(ubicacion, potencia, costo, bateria_kwh=0.0):
+    """
+    Simula hora a hora el sistema de paneles de 400W e inversores de 3.500W
+    que dimensiona dimensionar_paneles para el consumo mensual, y calcula el
+    ahorro anual con la energía que realmente se autoconsume.
+    """
+    paneles_400 = dimensionar_paneles(ubicacion, potencia)["Número de paneles de 400W"]
+    potencia_kwp = paneles_400 * 0.400
+    potencia_inversor_kw = math.ceil(paneles_400 * 400 / 3500) * 3.5
+
+    resultado = simular_anio(ubicacion, potencia_kwp, potencia, potencia_inversor_kw, bateria_kwh)
+    resultado["potencia_kwp"] = round(potencia_kwp, 3)
+    resultado["ahorro_anual_simulado"] = int(resultado["autoconsumo_kwh"] * costo)
+    return resultado
+
+
+def _dinero(valor):
+    signo = '-' if valor < 0 else ''
+    return f'{signo}${int(abs(valor)):,}'.replace(",", ".")
+
+
+def _recuperacion(anios):
+    if anios is None:
+        return f"más de {ANIOS_PROYECCION} años"
+    return f"{anios:.1f} años"
+
+
+def calcular_proyecto_horario(ubicacion, potencia, costo):
+    """
+    Proyecto con la misma estructura de calcular_proyecto, pero con los
+    paneles dimensionados por dimensionar_paneles y el ahorro, las baterías
+    y el impacto ambiental de la simulación hora a hora. El ahorro es la
+    energía que se autoconsume más los excedentes que se entregan a la red
+    hasta la energía que se toma de ella (se cruzan 1 a 1 en la factura).
+    Las baterías cubren el déficit nocturno del 90% de los días. Agrega la
+    sección "Simulación Horaria" con los totales del año y la "Proyección
+    Financiera" de la inversión con ese ahorro.
+    """
+    paneles = dimensionar_paneles(ubicacion, potencia)
+    simulacion = simular_proyecto(ubicacion, potencia, costo)
+    energia_cruzada = min(simulacion["excedentes_kwh"], simulacion["energia_red_kwh"])
+    energia_solar = simulacion["autoconsumo_kwh"] + energia_cruzada
+    ahorro_anual = energia_solar * costo
+    consumo_anual = simulacion["consumo_anual_kwh"]
+    porcentaje_solar = 100 * energia_solar / consumo_anual if consumo_anual else 0
+    proyecto = armar_proyecto(paneles, potencia, costo, porcentaje_solar)
+
+    gel = simulacion["capacidad_bateria_gel_ah"]
+    litio = simulacion["capacidad_bateria_litio_ah"]
+    equipos = dict(proyecto["Equipos Necesarios:"])
+    equipos["Baterias gel"] = {
+        f"Número de Baterías Gel {ah}Ah": math.ceil(gel / ah) for ah in (100, 150, 200, 250)
+    }
+    equipos["Baterias Litio"] = {
+        f"Número de Baterías litio {ah}Ah": math.ceil(litio / ah) for ah in (60, 100, 120, 150)
+    }
+    equipos["Baterias Litio"]["Número de Baterías litio 2000Ah"] = math.ceil(litio / 200)
+
+    inversion = COSTO_KWP * proyecto["Equipos Necesarios:"]["Paneles"]["Número de paneles de 400W"]
+    financiera = proyeccion_financiera(inversion, ahorro_anual)
+
+    return {
+        "Resultados Generales": {**proyecto["Resultados Generales"], "Ahorro Anual": _dinero(ahorro_anual)},
+        "Equipos Necesarios:": equipos,
+        "Simulación Horaria": {
+            "Energía producida al año": f'{simulacion["energia_producida_kwh"]:,.0f} kWh'.replace(",", "."),
+            "Energía autoconsumida al año": f'{simulacion["autoconsumo_kwh"]:,.0f} kWh'.replace(",", "."),
+            "Excedentes entregados a la red": f'{simulacion["excedentes_kwh"]:,.0f} kWh'.replace(",", "."),
+            "Fracción solar del consumo": f'{simulacion["fraccion_solar"] * 100:.1f}%',
+            "Batería sugerida": f'{simulacion["bateria_sugerida_kwh"]} kWh',
+        },
+        "Proyección Financiera": {
+            "Horizonte": f"{ANIOS_PROYECCION} años",
+            "Ahorro neto acumulado": _dinero(financiera["Ahorro acumulado"]),
+            "Valor presente neto": _dinero(financiera["VPN"]),
+            "Tasa interna de retorno": "no aplica" if financiera["TIR"] is None else f'{financiera["TIR"] * 100:.1f}%',
+            "Recuperación de la inversión": _recuperacion(financiera["Recuperación (años)"]),
+        },
+    }
+
+
+if __name__ == '__main__':
+    import time
+
+    perfiles_irradiancia()
+    for bateria in (0.0, 10.0):
+        inicio = time.perf_counter()
+        repeticiones = 200
+        for _ in range(repeticiones):
+            resultado = simular_anio("Región Andina", 5.0, 500, 5.0, bateria)
+        milisegundos = (time.perf_counter() - inicio) * 1000 / repeticiones
+        print(f"Batería {bateria} kWh: {milisegundos:.2f} ms por año simulado")
+        print(resultado)
@@ -0,0 +1,122 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import random
+import threading
+import time
+
+from modules.parser_facturas import analizar_texto_factura
+
+
+# Bytes que se mandan en cada parte cuando el stub responde a goteo
+PARTE_GOTEO = 64
+
+
+class ServidorStub(ThreadingHTTPServer):
+    """
+    Servidor local con la forma de la API de chat de OpenAI, para pruebas y
+    cargas sin salir a internet. Responde el JSON que pide el prompt de
+    facturas con los datos que encuentra el parser local en el mensaje,
+    después de `latencia_ms`; una fracción `fallos` de las consultas recibe 503.
+    Con modo_json=False rechaza response_format como los modelos sin modo JSON.
+    Con `goteo_ms` el cuerpo sale de a PARTE_GOTEO bytes con esa pausa entre
+    partes, como un servicio lento que nunca llega a agotar el timeout de socket.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, direccion, latencia_ms=0.0, fallos=0.0, modo_json=True, goteo_ms=0.0):
+        super().__init__(direccion, ManejadorStub)
+        self.latencia_ms = latencia_ms
+        self.fallos = fallos
+        self.modo_json = modo_json
+        self.goteo_ms = goteo_ms
+        self.conexiones = 0
+        self.consultas = 0
+        self._lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.conexiones += 1
+        super().process_request(request, client_address)
+
+
+class ManejadorStub(BaseHTTPRequestHandler):
+    # HTTP/1.1 para que el cliente pueda reutilizar la conexión
+    protocol_version = 'HTTP/1.1'
+
+    def _responder(self, estado, cuerpo):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        try:
+            if not self.server.goteo_ms:
+                self.wfile.write(datos)
+                return
+            for inicio in range(0, len(datos), PARTE_GOTEO):
+                self.wfile.write(datos[inicio:inicio + PARTE_GOTEO])
+                self.wfile.flush()
+                time.sleep(self.server.goteo_ms / 1000)
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente se rindió antes (plazo agotado): no hay a quién responder
+            self.close_connection = True
+
+    def do_POST(self):
+        cuerpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with self.server._lock:
+            self.server.consultas += 1
+        time.sleep(self.server.latencia_ms / 1000)
+
+        if not self.path.endswith('/chat/completions'):
+            self._responder(404, {"error": {"message": f"Ruta desconocida: {self.path}"}})
+            return
+        if 'response_format' in cuerpo and not self.server.modo_json:
+            self._responder(400, {"error": {
+                "message": "Invalid parameter: 'response_format' of type 'json_object' is not supported with this model.",
+                "param": "response_format",
+            }})
+            return
+        if random.random() < self.server.fallos:
+            self._responder(503, {"error": {"message": "Falla simulada"}})
+            return
+
+        texto = cuerpo.get("messages", [{}])[-1].get("content", "")
+        analisis = analizar_texto_factura(texto)
+        contenido = json.dumps({
+            "ciudad": analisis["ciudad"],
+            "departamento": analisis["departamento"],
+            "zona": analisis["zona"],
+            "consumo_kwh": analisis["consumo_kwh"],
+            "costo_kwh": analisis["costo_kwh"],
+        }, ensure_ascii=False)
+        self._responder(200, {
+            "object": "chat.completion",
+            "model": cuerpo.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": contenido}, "finish_reason": "stop"}],
+        })
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def iniciar_stub(puerto=0, latencia_ms=0.0, fallos=0.0, modo_json=True, goteo_ms=0.0):
+    """ Levanta el stub en un hilo (puerto 0 = uno libre) y lo devuelve; se detiene con shutdown(). """
+    servidor = ServidorStub(('127.0.0.1', puerto), latencia_ms, fallos, modo_json, goteo_ms)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stub local de la API de chat de OpenAI.")
+    parser.add_argument('--puerto', type=int, default=8089)
+    parser.add_argument('--latencia-ms', type=float, default=0)
+    parser.add_argument('--fallos', type=float, default=0)
+    parser.add_argument('--sin-modo-json', action='store_true', help="rechazar response_format como gpt-4")
+    parser.add_argument('--goteo-ms', type=float, default=0, help=f"pausa entre cada {PARTE_GOTEO} bytes del cuerpo")
+    args = parser.parse_args()
+
+    servidor = ServidorStub(('127.0.0.1', args.puerto), args.latencia_ms, args.fallos, not args.sin_modo_json, args.goteo_ms)
+    print(f"Stub en http://127.0.0.1:{args.puerto}/v1 (usar OPENAI_BASE_URL con esa dirección)")
+    servidor.serve_forever()
@@ -0,0 +1,184 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+
+# Carpeta compartida por todos los workers con el estado y resultado de cada trabajo
+TRABAJOS_FOLDER = os.getenv('TRABAJOS_FOLDER', 'trabajos')
+
+# Procesos que atienden los trabajos y máximo de trabajos pendientes por worker
+TRABAJADORES = int(os.getenv('TRABAJADORES', str(os.cpu_count() or 1)))
+MAX_TRABAJOS_EN_COLA = int(os.getenv('MAX_TRABAJOS_EN_COLA', '32'))
+
+# Tiempo que se conservan los resultados antes de borrarlos (segundos)
+RETENCION_TRABAJOS = int(os.getenv('RETENCION_TRABAJOS', '3600'))
+
+_ID_VALIDO = re.compile(r'^[0-9a-f]{32}$')
+
+_pool = None
+_pid = None
+_pendientes = 0
+_ultima_limpieza = 0
+_lock = threading.Lock()
+
+
+class ColaLlena(Exception):
+    """ La cola de trabajos de este worker alcanzó MAX_TRABAJOS_EN_COLA. """
+
+
+def _ruta(trabajo_id, extension):
+    return os.path.join(TRABAJOS_FOLDER, f"{trabajo_id}.{extension}")
+
+
+def _guardar_estado(trabajo_id, **cambios):
+    estado = leer_estado(trabajo_id) or {}
+    estado.update(cambios)
+    temporal = _ruta(trabajo_id, 'json.tmp')
+    with open(temporal, 'w', encoding='utf-8') as file:
+        json.dump(estado, file, ensure_ascii=False)
+    os.replace(temporal, _ruta(trabajo_id, 'json'))
+
+
+def _ejecutar(trabajo_id, funcion, args):
+    """ Corre en el proceso del pool: ejecuta el trabajo y guarda su resultado. """
+    _guardar_estado(trabajo_id, estado='procesando', inicio=time.time())
+    try:
+        resultado = funcion(*args)
+        if isinstance(resultado, bytes):
+            with open(_ruta(trabajo_id, 'resultado'), 'wb') as file:
+                file.write(resultado)
+            resultado = None
+        _guardar_estado(trabajo_id, estado='terminado', fin=time.time(), resultado=resultado)
+    except Exception as e:
+        _guardar_estado(trabajo_id, estado='error', fin=time.time(), error=str(e))
+
+
+def _obtener_pool():
+    global _pool, _pid, _pendientes
+    if _pid != os.getpid():
+        # Proceso nuevo (fork de gunicorn): el pool y la cuenta heredados son del padre
+        _pool, _pid, _pendientes = None, os.getpid(), 0
+    if _pool is None:
+        # 'spawn' evita heredar hilos y conexiones del worker de gunicorn
+        _pool = ProcessPoolExecutor(max_workers=TRABAJADORES, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _descartar_pool(pool):
+    """ Olvida el pool roto (murió uno de sus procesos) para que el siguiente trabajo cree otro. """
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+
+
+def _enviar(trabajo_id, funcion, args):
+    """ Envía el trabajo al pool; si el pool quedó roto, lo reemplaza y lo intenta una vez más. """
+    for intento in range(2):
+        with _lock:
+            pool = _obtener_pool()
+        try:
+            return pool, pool.submit(_ejecutar, trabajo_id, funcion, args)
+        except BrokenProcessPool:
+            _descartar_pool(pool)
+            if intento:
+                raise
+
+
+def _al_terminar(trabajo_id, pool, futuro):
+    global _pendientes
+    with _lock:
+        _pendientes -= 1
+
+    # _ejecutar guarda sus propios errores: una excepción aquí es que el proceso murió con el trabajo
+    error = None if futuro.cancelled() else futuro.exception()
+    if isinstance(error, BrokenProcessPool):
+        _descartar_pool(pool)
+    if error is not None or futuro.cancelled():
+        _guardar_estado(trabajo_id, estado='error', fin=time.time(), error=f"El trabajo se interrumpió: {error or 'cancelado'}")
+
+
+def _limpiar_vencidos():
+    """ Borra los archivos de trabajos más antiguos que RETENCION_TRABAJOS. """
+    global _ultima_limpieza
+    ahora = time.time()
+    if ahora - _ultima_limpieza < 300:
+        return
+    _ultima_limpieza = ahora
+
+    for nombre in os.listdir(TRABAJOS_FOLDER):
+        ruta = os.path.join(TRABAJOS_FOLDER, nombre)
+        try:
+            if ahora - os.path.getmtime(ruta) > RETENCION_TRABAJOS:
+                os.remove(ruta)
+        except OSError:
+            pass
+
+
+def encolar(tipo, funcion, *args, datos=None):
+    """
+    Encola funcion(*args) en el pool de procesos y devuelve el id del trabajo.
+    'datos' se guarda con el estado para usarlo al descargar el resultado.
+    Lanza ColaLlena si este worker ya tiene MAX_TRABAJOS_EN_COLA pendientes.
+    Si un proceso del pool murió, el pool se reemplaza y los trabajos que
+    tenía quedan en estado 'error'.
+    """
+    global _pendientes
+    os.makedirs(TRABAJOS_FOLDER, exist_ok=True)
+
+    with _lock:
+        # En un proceso nuevo esto reinicia también la cuenta de pendientes
+        _obtener_pool()
+        if _pendientes >= MAX_TRABAJOS_EN_COLA:
+            raise ColaLlena()
+        _pendientes += 1
+        _limpiar_vencidos()
+
+    trabajo_id = uuid.uuid4().hex
+    _guardar_estado(trabajo_id, id=trabajo_id, tipo=tipo, estado='en_cola', creado=time.time(), datos=datos)
+
+    try:
+        pool, futuro = _enviar(trabajo_id, funcion, args)
+    except Exception as e:
+        with _lock:
+            _pendientes -= 1
+        _guardar_estado(trabajo_id, estado='error', fin=time.time(), error=str(e))
+        raise
+    futuro.add_done_callback(partial(_al_terminar, trabajo_id, pool))
+    return trabajo_id
+
+
+def leer_estado(trabajo_id):
+    """ Devuelve el estado guardado del trabajo o None si no existe. """
+    if not _ID_VALIDO.match(trabajo_id):
+        return None
+    try:
+        with open(_ruta(trabajo_id, 'json'), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def ruta_resultado(trabajo_id):
+    """ Ruta del resultado binario (PDF) del trabajo, o None si no existe. """
+    if not _ID_VALIDO.match(trabajo_id):
+        return None
+    ruta = _ruta(trabajo_id, 'resultado')
+    return ruta if os.path.exists(ruta) else None
+
+
+def profundidad_cola():
+    """ Estado de la cola de este worker, para dimensionar los trabajadores con la carga real. """
+    with _lock:
+        return {
+            "pid": os.getpid(),
+            "pendientes": _pendientes,
+            "capacidad": MAX_TRABAJOS_EN_COLA,
+            "trabajadores": TRABAJADORES,
+        }
@@ -0,0 +1,8 @@
+from modules.capacidades import LIMITE_ARRANQUE_MS, medir_arranque
+
+
+def test_arranque_rapido_y_sin_paquetes_pesados():
+    """ Importar app.py en un proceso nuevo no carga numpy, OCR ni requests y no pasa del límite. """
+    milisegundos, pesados = medir_arranque()
+    assert pesados == []
+    assert milisegundos <= LIMITE_ARRANQUE_MS
@@ -0,0 +1,38 @@
+import copy
+import pickle
+
+import pytest
+
+from modules.calculos_solar import calcular_proyecto, estadisticas_cache_proyectos
+
+
+@pytest.mark.parametrize('modificar', [
+    lambda resultado: resultado.__setitem__("Nuevo", 1),
+    lambda resultado: resultado.pop("Resultados Generales"),
+    lambda resultado: resultado.update({"Resultados Generales": {}}),
+    lambda resultado: resultado["Resultados Generales"].__setitem__("Ahorro Anual", "$0"),
+    lambda resultado: resultado["Resultados Generales"]["Impacto Ambiental"].clear(),
+])
+def test_resultado_cacheado_es_de_solo_lectura(modificar):
+    """ Nadie puede cambiar el resultado que otras peticiones reciben desde la caché. """
+    resultado = calcular_proyecto("Región Andina", 500, 800)
+    antes = copy.deepcopy(dict(resultado))
+    with pytest.raises(TypeError):
+        modificar(resultado)
+    assert calcular_proyecto("Región Andina", 500, 800) == antes
+
+
+def test_resultado_se_puede_serializar():
+    """ Los trabajos en segundo plano devuelven el resultado entre procesos. """
+    resultado = calcular_proyecto("Región Andina", 500, 800)
+    assert pickle.loads(pickle.dumps(resultado)) == resultado
+
+
+def test_estadisticas_cuentan_aciertos():
+    calcular_proyecto.cache_clear()
+    calcular_proyecto("Costa Caribe", 321, 777)
+    calcular_proyecto("Costa Caribe", 321, 777)
+    calcular_proyecto("Costa Caribe", 321, 777)
+    estadisticas = estadisticas_cache_proyectos()
+    assert (estadisticas["fallos"], estadisticas["aciertos"], estadisticas["tamano"]) == (1, 2, 1)
+    assert calcular_proyecto("Costa Caribe", 321, 777) is calcular_proyecto("Costa Caribe", 321, 777)
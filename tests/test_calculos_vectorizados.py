@@ -0,0 +1,35 @@
+import pytest
+
+from modules.calculos_solar import calcular_proyecto
+from modules.calculos_vectorizados import ZONAS, calcular_proyecto_lote, fila_como_proyecto
+
+POTENCIAS = [1, 37.5, 150, 333.3, 500, 1234, 4800, 25000]
+COSTOS = [650.0, 812.37, 1023.5]
+
+
+@pytest.mark.parametrize('zona', ZONAS)
+def test_lote_coincide_con_calcular_proyecto(zona):
+    """
+    calcular_proyecto_lote da lo mismo que calcular_proyecto para cada caso.
+    La reducción de CO2 se compara con tolerancia de 0.01 porque np.round y
+    round() pueden diferir en el último decimal en casos límite.
+    """
+    casos = [(zona, potencia, costo) for potencia in POTENCIAS for costo in COSTOS]
+    ubicaciones, potencias, costos = zip(*casos)
+    columnas = calcular_proyecto_lote(ubicaciones, potencias, costos)
+
+    for i, caso in enumerate(casos):
+        esperado = calcular_proyecto(*caso)
+        obtenido = fila_como_proyecto(columnas, i)
+
+        impacto_esperado = esperado["Resultados Generales"]["Impacto Ambiental"]
+        impacto_obtenido = obtenido["Resultados Generales"]["Impacto Ambiental"]
+        assert impacto_obtenido["reduccion_CO2_toneladas"] == pytest.approx(impacto_esperado["reduccion_CO2_toneladas"], abs=0.01)
+        impacto_obtenido["reduccion_CO2_toneladas"] = impacto_esperado["reduccion_CO2_toneladas"]
+
+        assert obtenido == esperado, caso
+
+
+def test_ubicacion_desconocida():
+    with pytest.raises(ValueError):
+        calcular_proyecto_lote(["Marte"], [100], [800])
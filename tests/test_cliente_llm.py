@@ -0,0 +1,96 @@
+import json
+import time
+
+import pytest
+
+from modules.cliente_llm import BackendHTTP, Circuito, CircuitoAbierto, ClienteLLM, ErrorLLM, ErrorTransitorio
+from modules.stub_llm import iniciar_stub
+
+MENSAJES = [{"role": "user", "content": "Medellín - Antioquia\nEnergía feb-24 40 888,470 $35.538,80"}]
+
+
+@pytest.fixture
+def stub():
+    servidor = iniciar_stub()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _cliente(servidor, plazo=5, umbral=2, pausa=0.3):
+    cliente = ClienteLLM(BackendHTTP(f"http://127.0.0.1:{servidor.server_port}/v1", api_key='stub'), plazo=plazo, reintentos=0)
+    cliente.circuito = Circuito(umbral=umbral, pausa=pausa)
+    return cliente
+
+
+def test_respuesta_del_stub(stub):
+    contenido = json.loads(_cliente(stub).completar(MENSAJES, response_format={"type": "json_object"}))
+    assert set(contenido) == {"ciudad", "departamento", "zona", "consumo_kwh", "costo_kwh"}
+    assert contenido["departamento"] == "Antioquia"
+
+
+def test_fallos_abren_el_circuito_y_la_prueba_lo_cierra(stub):
+    cliente = _cliente(stub)
+    stub.fallos = 1.0
+    for _ in range(2):
+        with pytest.raises(ErrorTransitorio):
+            cliente.completar(MENSAJES)
+    assert cliente.circuito.estado() == 'abierto'
+
+    # Abierto: se rechaza sin consultar al servicio y se dice cuánto esperar
+    consultas = stub.consultas
+    with pytest.raises(CircuitoAbierto) as error:
+        cliente.completar(MENSAJES)
+    assert stub.consultas == consultas
+    assert error.value.reintentar_en >= 1
+
+    # Pasada la pausa deja pasar una consulta de prueba; si sale bien se cierra
+    time.sleep(0.35)
+    assert cliente.circuito.estado() == 'semiabierto'
+    stub.fallos = 0.0
+    cliente.completar(MENSAJES)
+    assert cliente.circuito.estado() == 'cerrado'
+
+
+def test_prueba_fallida_vuelve_a_abrir(stub):
+    cliente = _cliente(stub)
+    stub.fallos = 1.0
+    for _ in range(2):
+        with pytest.raises(ErrorTransitorio):
+            cliente.completar(MENSAJES)
+
+    time.sleep(0.35)
+    with pytest.raises(ErrorTransitorio):
+        cliente.completar(MENSAJES)
+    assert cliente.circuito.estado() == 'abierto'
+
+
+def test_tiempo_agotado_cuenta_como_fallo(stub):
+    cliente = _cliente(stub, plazo=0.2, umbral=1)
+    stub.latencia_ms = 1000
+
+    inicio = time.monotonic()
+    with pytest.raises(ErrorTransitorio):
+        cliente.completar(MENSAJES)
+    assert time.monotonic() - inicio < 0.9
+    assert cliente.circuito.estado() == 'abierto'
+    assert cliente.estadisticas()["fallidas"] == 1
+
+
+def test_respuesta_a_goteo_respeta_el_plazo_total(stub):
+    """ Cada parte llega antes del timeout de socket, pero la respuesta completa tardaría más que el plazo. """
+    stub.goteo_ms = 50
+    backend = BackendHTTP(f"http://127.0.0.1:{stub.server_port}/v1", api_key='stub')
+
+    inicio = time.monotonic()
+    with pytest.raises(ErrorTransitorio):
+        backend.completar(MENSAJES, timeout=0.2)
+    assert time.monotonic() - inicio < 0.35
+
+    # Con plazo suficiente la misma respuesta llega completa
+    assert json.loads(backend.completar(MENSAJES, timeout=5))["departamento"] == "Antioquia"
+
+
+def test_los_errores_del_modelo_no_son_valueerror():
+    # Las rutas responden 503 a ErrorLLM y 400 a ValueError: no deben mezclarse
+    assert not issubclass(ErrorLLM, ValueError)
@@ -0,0 +1,21 @@
+import re
+
+import pytest
+
+from modules.calculos_solar import calcular_proyecto
+from modules.cotizacion_pdf import TEMAS_COMPILADOS, generar_cotizacion_pdf
+
+
+def _paginas(marca, usar_fragmento):
+    datos = generar_cotizacion_pdf(
+        marca, 1, "18/10/2026", "Cliente de prueba", "Proyecto", "3000000000", "asesor@ferragro.com",
+        "cliente@correo.com", "Medellín", 5, 800, 30, calcular_proyecto("Región Andina", 500, 800),
+        usar_fragmento=usar_fragmento
+    )
+    return len(re.findall(rb'/Type /Page\b', datos))
+
+
+@pytest.mark.parametrize('marca', sorted(TEMAS_COMPILADOS))
+def test_fragmento_da_las_mismas_paginas(marca):
+    """ Insertar las secciones fijas desde el fragmento no agrega páginas. """
+    assert _paginas(marca, usar_fragmento=True) == _paginas(marca, usar_fragmento=False)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from modules.finanzas import periodo_recuperacion, proyeccion_financiera, tir, vpn
+
+FLUJOS = np.array([
+    [-100.0, 110.0, 0.0, 0.0],
+    [-1000.0, 500.0, 500.0, 500.0],
+    [-1000.0, 400.0, 400.0, 400.0],
+    [-1000.0, 100.0, 100.0, 100.0],
+    [-100.0, -10.0, -10.0, -10.0],
+])
+
+
+def test_vpn():
+    assert vpn(FLUJOS[:2], 0.10) == pytest.approx([0.0, 243.4260], abs=1e-4)
+    assert vpn(FLUJOS[1:2], 0.0) == pytest.approx([500.0])
+
+
+def test_tir():
+    """ Todas las filas a la vez; sin cambio de signo en el flujo no hay TIR. """
+    resultado = tir(FLUJOS)
+    assert resultado[:3] == pytest.approx([0.10, 0.2337519, 0.0970102], abs=1e-6)
+    assert vpn(FLUJOS[:3], resultado[:3]) == pytest.approx([0.0, 0.0, 0.0], abs=1e-6)
+    assert resultado[3] < 0
+    assert np.isnan(resultado[4])
+
+
+def test_periodo_recuperacion():
+    """ Se interpola dentro del año en que se recupera; NaN si nunca se recupera. """
+    resultado = periodo_recuperacion(FLUJOS)
+    assert resultado[:3] == pytest.approx([0.9090909, 2.0, 2.5])
+    assert np.isnan(resultado[3])
+    assert np.isnan(resultado[4])
+
+
+def test_proyeccion_sin_recuperacion():
+    """ Si el ahorro no cubre el mantenimiento la TIR y la recuperación quedan en None. """
+    proyeccion = proyeccion_financiera(1000000, -5000000)
+    assert proyeccion["TIR"] is None
+    assert proyeccion["Recuperación (años)"] is None
+    assert proyeccion["VPN"] < 0
+
+
+def test_proyeccion_financiera():
+    proyeccion = proyeccion_financiera(10000000, 4000000, anios=10, escalamiento=0.0, degradacion=0.0, ipc=0.0,
+                                       tasa_renta=0.0, mantenimiento=0)
+    assert proyeccion["Recuperación (años)"] == 2.5
+    assert proyeccion["Ahorro acumulado"] == 40000000
+    assert proyeccion["TIR"] == pytest.approx(0.3845, abs=1e-4)
@@ -0,0 +1,40 @@
+import pytest
+
+from modules.municipios import UbicacionAmbigua, buscar_municipio, resolver_zona
+from modules.parser_facturas import analizar_texto_factura
+
+LIQUIDACION = "Energía feb-24 40 888,470 $35.538,80"
+
+
+def test_nombre_ambiguo_pide_el_departamento():
+    with pytest.raises(UbicacionAmbigua) as error:
+        resolver_zona("Rionegro")
+    assert error.value.opciones == ["Rionegro (Antioquia)", "Rionegro (Santander)"]
+
+
+@pytest.mark.parametrize('departamento', ["Antioquia", "Santander"])
+def test_nombre_ambiguo_con_departamento(departamento):
+    assert buscar_municipio("Rionegro", departamento)["departamento"] == departamento
+    assert resolver_zona(f"Rionegro - {departamento}")["departamento"] == departamento
+
+
+def test_bogota_fuera_de_cundinamarca():
+    """ Bogotá es su propio departamento, aunque la factura diga Cundinamarca. """
+    assert buscar_municipio("Bogotá", "Cundinamarca") is None
+    assert resolver_zona("Bogota - Cundinamarca") == {"zona": "Región Andina", "municipio": "Bogotá", "departamento": "Bogotá"}
+    analisis = analizar_texto_factura(f"Bogota - Cundinamarca\n{LIQUIDACION}", "epm")
+    assert analisis["ciudad"] == "Bogotá"
+
+
+def test_parser_usa_el_departamento_del_formulario():
+    texto = f"Rionegro - Antioquia\n{LIQUIDACION}"
+    assert analizar_texto_factura(texto, "epm")["departamento"] == "Antioquia"
+
+    analisis = analizar_texto_factura(texto, "epm", "Santander")
+    assert (analisis["ciudad"], analisis["departamento"], analisis["zona"]) == ("Rionegro", "Santander", "Región Andina")
+
+
+def test_parser_usa_el_departamento_del_formulario_sin_ubicacion_en_el_texto():
+    assert analizar_texto_factura(LIQUIDACION, "epm")["zona"] is None
+    analisis = analizar_texto_factura(LIQUIDACION, "epm", "La Guajira")
+    assert (analisis["departamento"], analisis["zona"]) == ("La Guajira", "Desierto de la Guajira")
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from modules.parser_facturas import analizar_texto_factura, candidatos_numero, es_confiable, evaluar_corpus
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'corpus_facturas')
+
+
+def test_corpus_sin_errores():
+    resultados = evaluar_corpus(CORPUS)
+    assert resultados
+    for resultado in resultados:
+        assert resultado["errores"] == {}, resultado["archivo"]
+        assert resultado["confiable"], resultado["archivo"]
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ("1.234,56", [1234.56]),
+    ("888,470", [888470.0, 888.47]),
+    ("1.234.567", [1234567.0]),
+    ("4.556,650", [4556.65]),
+    ("$35.538,80", [35538.8]),
+    ("40", [40.0]),
+    ("kwh", []),
+])
+def test_candidatos_numero(texto, esperado):
+    assert candidatos_numero(texto) == esperado
+
+
+def test_perfil_generico_no_basta_para_evitar_el_modelo():
+    """ Con los tres campos leídos por los patrones genéricos la factura va al modelo. """
+    analisis = analizar_texto_factura("Cali - Valle del Cauca\nConsumo promedio 250 kWh\nValor unitario kWh 780,50")
+    assert (analisis["zona"], analisis["consumo_kwh"], analisis["costo_kwh"]) == ("Región Pacífica", 250.0, 780.5)
+    assert not es_confiable(analisis)
@@ -0,0 +1,40 @@
+from io import BytesIO
+import json
+
+import pytest
+
+import app as aplicacion
+from modules.errores_llm import CircuitoAbierto
+
+
+def _formulario():
+    return {
+        "cliente": "Cliente de prueba",
+        "factura_frontal": (BytesIO(b"frontal"), "frontal.png"),
+        "factura_atras": (BytesIO(b"atras"), "atras.png"),
+    }
+
+
+@pytest.fixture
+def modelo_caido(monkeypatch):
+    def analizar_factura(*args, **kwargs):
+        raise CircuitoAbierto("El servicio del modelo está fallando.", 7)
+
+    monkeypatch.setattr(aplicacion, 'analizador_facturas', lambda: analizar_factura)
+    monkeypatch.setattr(aplicacion, 'modo_asincrono', lambda: False)
+    return aplicacion.app.test_client()
+
+
+def test_modelo_caido_responde_503_con_retry_after(modelo_caido):
+    respuesta = modelo_caido.post('/procesar_factura', data=_formulario(), content_type='multipart/form-data')
+    assert respuesta.status_code == 503
+    assert respuesta.headers["Retry-After"] == "7"
+    assert "error" in respuesta.get_json()
+
+
+def test_modelo_caido_en_eventos_manda_error_con_reintento(modelo_caido):
+    respuesta = modelo_caido.post('/procesar_factura/eventos', data=_formulario(), content_type='multipart/form-data')
+    bloques = [bloque for bloque in respuesta.get_data(as_text=True).split('\n\n') if bloque.startswith('event: error')]
+    assert len(bloques) == 1
+    datos = json.loads(bloques[0].split('data: ', 1)[1])
+    assert datos["reintentar_en"] == 7
@@ -0,0 +1,26 @@
+import pytest
+
+from app import app
+from modules.sensibilidad import analizar_sensibilidad
+from modules.simulacion_horaria import calcular_proyecto_horario
+
+
+def test_mediana_coincide_con_la_cotizacion():
+    """ Sin incertidumbre, el Monte Carlo da el mismo ahorro que la cotización. """
+    cero = {"irradiancia": 0.0, "consumo": 0.0, "escalamiento_tarifa": 0.0}
+    resultado = analizar_sensibilidad("Región Andina", 500, 800, escenarios=100, incertidumbre=cero, semilla=0)
+    cotizacion = calcular_proyecto_horario("Región Andina", 500, 800)
+
+    ahorro_cotizado = int(cotizacion["Resultados Generales"]["Ahorro Anual"].strip('$').replace('.', ''))
+    assert resultado["ahorro_primer_anio"]["p50"] == pytest.approx(ahorro_cotizado, rel=0.001)
+
+
+@pytest.mark.parametrize('cambio', [
+    {"potencia": 0}, {"costo": -800}, {"potencia": "inf"}, {"costo": "nan"},
+    {"ubicacion": ["Región Andina"]}, {"ubicacion": "Marte"}, {"escenarios": 10 ** 9}, {"escenarios": [1]},
+])
+def test_rechaza_datos_invalidos(cambio):
+    datos = {"ubicacion": "Región Andina", "potencia": 500, "costo": 800, **cambio}
+    respuesta = app.test_client().post('/sensibilidad', json=datos)
+    assert respuesta.status_code == 400
+    assert "error" in respuesta.get_json()
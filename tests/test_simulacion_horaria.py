@@ -0,0 +1,37 @@
+import pytest
+
+from modules.simulacion_horaria import (
+    ZONAS, calcular_proyecto_horario, dimensionar_paneles, energia_anual_por_kwp, simular_proyecto
+)
+
+
+@pytest.mark.parametrize('zona', ZONAS)
+def test_el_sistema_dimensionado_cubre_el_consumo(zona):
+    """ La producción simulada del sistema dimensionado alcanza el consumo anual sin pasarse de un panel. """
+    consumo_mensual = 500
+    simulacion = simular_proyecto(zona, consumo_mensual, 800)
+    energia_panel = energia_anual_por_kwp(zona) * 0.400
+
+    assert simulacion["energia_producida_kwh"] >= consumo_mensual * 12 * 0.99
+    assert simulacion["energia_producida_kwh"] < consumo_mensual * 12 + energia_panel * 1.01
+
+
+def test_paneles_de_mayor_potencia_son_menos():
+    paneles = dimensionar_paneles("Región Andina", 500)
+    assert paneles["Número de paneles de 400W"] >= paneles["Número de paneles de 585W"] >= paneles["Número de paneles de 605W"] > 0
+
+
+def test_ahorro_impacto_y_baterias_salen_de_la_simulacion():
+    proyecto = calcular_proyecto_horario("Región Andina", 500, 800)
+    generales = proyecto["Resultados Generales"]
+    baterias = proyecto["Equipos Necesarios:"]["Baterias gel"]
+
+    # Con los excedentes cruzados 1 a 1, un sistema que produce el consumo del año ahorra toda la factura
+    assert generales["Ahorro Anual"] == "$4.800.000"
+    assert generales["Impacto Ambiental"]["reduccion_CO2_toneladas"] == pytest.approx(500 * 12 * 0.0007, abs=0.01)
+    assert baterias["Número de Baterías Gel 100Ah"] > 0
+
+
+def test_zona_desconocida():
+    with pytest.raises(ValueError):
+        calcular_proyecto_horario("Marte", 500, 800)
@@ -0,0 +1,57 @@
+import os
+import signal
+import time
+
+import pytest
+
+from modules import trabajos
+
+
+@pytest.fixture
+def carpeta_trabajos(tmp_path, monkeypatch):
+    # Los procesos del pool (spawn) vuelven a importar el módulo y leen la carpeta del entorno
+    monkeypatch.setenv('TRABAJOS_FOLDER', str(tmp_path))
+    monkeypatch.setattr(trabajos, 'TRABAJOS_FOLDER', str(tmp_path))
+    monkeypatch.setattr(trabajos, 'TRABAJADORES', 1)
+    yield tmp_path
+    if trabajos._pool is not None:
+        trabajos._pool.shutdown(cancel_futures=True)
+        trabajos._pool = None
+
+
+def _esperar_estado(trabajo_id, estados, segundos=60):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        estado = trabajos.leer_estado(trabajo_id)
+        if estado and estado['estado'] in estados:
+            return estado
+        time.sleep(0.05)
+    raise AssertionError(f"El trabajo {trabajo_id} no llegó a {estados}: {trabajos.leer_estado(trabajo_id)}")
+
+
+def test_proceso_muerto_deja_el_trabajo_en_error_y_el_pool_se_reemplaza(carpeta_trabajos):
+    trabajo_id = trabajos.encolar('prueba', time.sleep, 60)
+    _esperar_estado(trabajo_id, {'procesando'})
+
+    pool = trabajos._pool
+    for proceso in list(pool._processes.values()):
+        os.kill(proceso.pid, signal.SIGKILL)
+
+    estado = _esperar_estado(trabajo_id, {'error', 'terminado'})
+    assert estado['estado'] == 'error'
+    assert trabajos.profundidad_cola()['pendientes'] == 0
+
+    # El siguiente trabajo corre en un pool nuevo en lugar de fallar con BrokenProcessPool
+    siguiente = trabajos.encolar('prueba', time.sleep, 0)
+    assert _esperar_estado(siguiente, {'error', 'terminado'})['estado'] == 'terminado'
+    assert trabajos._pool is not pool
+
+
+def test_descarga_sin_resultado_responde_410(carpeta_trabajos):
+    from app import app
+
+    trabajo_id = 'a' * 32
+    trabajos._guardar_estado(trabajo_id, id=trabajo_id, tipo='cotizacion', estado='terminado', datos={"archivo": "c.pdf"})
+
+    respuesta = app.test_client().get(f'/trabajos/{trabajo_id}/descarga')
+    assert respuesta.status_code == 410